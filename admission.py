@@ -0,0 +1,171 @@
+import os
+import sys
+import math
+import time
+import resource
+import threading
+from collections import deque
+from contextlib import contextmanager
+from typing import Iterator, Optional
+from metrics import Counter, Gauge, Histogram
+
+# Time spent waiting for admission, in seconds
+WAIT_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# Bounds of the Retry-After estimate, in seconds
+MIN_RETRY_AFTER = 1
+MAX_RETRY_AFTER = 60
+
+
+class Overloaded(Exception):
+    """Raised when a request cannot be admitted; retry_after is in whole seconds"""
+
+    def __init__(self, message: str, retry_after: int):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+def resident_memory_bytes() -> int:
+    """Current resident set size of this process (peak RSS where /proc is unavailable)"""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        # ru_maxrss is in kilobytes on Linux and bytes on macOS
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == 'darwin' else peak * 1024
+
+
+class AdmissionController:
+    """Bounds the HTML bytes being analyzed at once in this process
+
+    Requests are weighted by their body size. A request starts when its
+    weight fits in the remaining byte budget, or when nothing else is
+    running so that a single oversized document still gets analyzed alone.
+    Otherwise it waits its turn in a first-in first-out queue of at most
+    max_queue requests. Requests that find the queue full, or that wait
+    longer than timeout seconds, are refused with Overloaded. Its
+    retry_after is an estimate of how long the work ahead of them takes to
+    drain, so bursts turn into client back-off instead of memory spikes.
+    """
+
+    def __init__(self, max_bytes: int, max_queue: int = 16, timeout: float = 30.0, prefix: str = 'seo_analyzer'):
+        """
+        Args:
+            max_bytes: Byte budget of concurrently analyzed request bodies
+            max_queue: Maximum number of requests waiting for the budget
+            timeout: Longest time in seconds a request waits before it is refused
+            prefix: Metric name prefix
+        """
+        self.max_bytes = max_bytes
+        self.max_queue = max_queue
+        self.timeout = timeout
+
+        self._condition = threading.Condition()
+        self._waiting: deque = deque()
+        self.queued_bytes = 0
+        self.inflight = 0
+        self.inflight_bytes = 0
+
+        # Moving average of analysis seconds per request byte, for Retry-After
+        self._seconds_per_byte: Optional[float] = None
+
+        self.admitted = Counter(f"{prefix}_admitted_requests_total", "Requests admitted for analysis")
+        self.rejected = Counter(f"{prefix}_rejected_requests_total", "Requests refused with 429", ('reason',))
+        self.wait = Histogram(f"{prefix}_queue_wait_seconds", "Time admitted requests waited for the byte budget", WAIT_BUCKETS)
+        self.gauges = {
+            'queue_depth': Gauge(f"{prefix}_queue_depth", "Requests waiting for the byte budget"),
+            'queued_bytes': Gauge(f"{prefix}_queued_bytes", "Body bytes of the requests waiting for the byte budget"),
+            'inflight': Gauge(f"{prefix}_inflight_requests", "Requests being analyzed"),
+            'inflight_bytes': Gauge(f"{prefix}_inflight_bytes", "Body bytes of the requests being analyzed"),
+            'max_bytes': Gauge(f"{prefix}_inflight_bytes_limit", "Byte budget of requests analyzed at once"),
+            'rss': Gauge(f"{prefix}_resident_memory_bytes", "Resident memory of this worker process"),
+        }
+
+    @contextmanager
+    def admit(self, weight: int) -> Iterator[float]:
+        """Hold weight bytes of the budget for the duration of the block, yielding the seconds waited"""
+        waited = self.acquire(weight)
+        started = time.perf_counter()
+        try:
+            yield waited
+        finally:
+            self.release(weight, time.perf_counter() - started)
+
+    def acquire(self, weight: int) -> float:
+        """Wait for weight bytes of the budget and return the seconds waited (see release)"""
+        weight = max(0, weight)
+        started = time.perf_counter()
+        with self._condition:
+            if not self._waiting and self._fits(weight):
+                self._start(weight, 0.0)
+                return 0.0
+
+            if len(self._waiting) >= self.max_queue:
+                self.rejected.inc(1, 'queue_full')
+                raise Overloaded("Analysis queue is full", self._retry_after(weight))
+
+            ticket = object()
+            self._waiting.append(ticket)
+            self.queued_bytes += weight
+            try:
+                while self._waiting[0] is not ticket or not self._fits(weight):
+                    remaining = started + self.timeout - time.perf_counter()
+                    if remaining <= 0:
+                        self.rejected.inc(1, 'timeout')
+                        raise Overloaded("Timed out waiting for analysis capacity", self._retry_after(weight))
+                    self._condition.wait(remaining)
+            finally:
+                self._waiting.remove(ticket)
+                self.queued_bytes -= weight
+                # The next request in line may fit now
+                self._condition.notify_all()
+
+            waited = time.perf_counter() - started
+            self._start(weight, waited)
+            return waited
+
+    def release(self, weight: int, seconds: float):
+        """Return weight bytes to the budget after an analysis that took seconds"""
+        weight = max(0, weight)
+        with self._condition:
+            self.inflight -= 1
+            self.inflight_bytes -= weight
+            if weight:
+                sample = seconds / weight
+                if self._seconds_per_byte is None:
+                    self._seconds_per_byte = sample
+                else:
+                    self._seconds_per_byte = 0.8 * self._seconds_per_byte + 0.2 * sample
+            self._condition.notify_all()
+
+    def render(self) -> str:
+        """Prometheus text exposition format"""
+        with self._condition:
+            self.gauges['queue_depth'].set(len(self._waiting))
+            self.gauges['queued_bytes'].set(self.queued_bytes)
+            self.gauges['inflight'].set(self.inflight)
+            self.gauges['inflight_bytes'].set(self.inflight_bytes)
+            self.gauges['max_bytes'].set(self.max_bytes)
+            self.gauges['rss'].set(resident_memory_bytes())
+
+            lines = []
+            for metric in [self.admitted, self.rejected, self.wait, *self.gauges.values()]:
+                lines.extend(metric.render())
+            return '\n'.join(lines) + '\n'
+
+    def _fits(self, weight: int) -> bool:
+        return self.inflight == 0 or self.inflight_bytes + weight <= self.max_bytes
+
+    def _start(self, weight: int, waited: float):
+        self.inflight += 1
+        self.inflight_bytes += weight
+        self.admitted.inc()
+        self.wait.observe(waited)
+
+    def _retry_after(self, weight: int) -> int:
+        """Seconds until the work ahead of a request of this weight has likely drained"""
+        if self._seconds_per_byte is None:
+            return MIN_RETRY_AFTER
+        backlog = self.inflight_bytes + self.queued_bytes + weight
+        return min(MAX_RETRY_AFTER, max(MIN_RETRY_AFTER, math.ceil(backlog * self._seconds_per_byte)))
@@ -0,0 +1,44 @@
+import os
+import sys
+import argparse
+import logging
+from batch_analyzer import BatchAnalyzer
+from seo_analyzer import SEOAnalyzer
+
+
+def main():
+    """Stream NDJSON analysis from stdin (or files) to stdout"""
+    parser = argparse.ArgumentParser(
+        description="Analyze newline-delimited JSON records of {html, url, primaryKeyword, relatedKeywords}, "
+                    "writing one JSON result line per record in input order"
+    )
+    parser.add_argument('inputs', nargs='*', help="NDJSON files to read (defaults to stdin)")
+    parser.add_argument('--workers', type=int, default=int(os.environ.get("ANALYZER_BATCH_WORKERS", 0)) or os.cpu_count(),
+                        help="Number of analyzer processes (defaults to ANALYZER_BATCH_WORKERS, or the CPU count)")
+    parser.add_argument('--backend', default=os.environ.get("ANALYZER_BACKEND", "bs4"), choices=SEOAnalyzer.BACKENDS,
+                        help="Parsing backend")
+    parser.add_argument('--window', type=int, default=None,
+                        help="Maximum number of records in flight (defaults to twice the worker count)")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, stream=sys.stderr)
+
+    def read_lines():
+        if not args.inputs:
+            yield from sys.stdin.buffer
+            return
+        for path in args.inputs:
+            with open(path, 'rb') as f:
+                yield from f
+
+    batch_analyzer = BatchAnalyzer(max_workers=args.workers, backend=args.backend)
+    try:
+        for line in batch_analyzer.analyze_ndjson(read_lines(), window=args.window):
+            sys.stdout.write(line + '\n')
+            sys.stdout.flush()
+    finally:
+        batch_analyzer.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,21 +1,199 @@
 import os
+import json
 import logging
-from flask import Flask, render_template, request, jsonify
+import functools
+import time
+from flask import Flask, Response, render_template, request, jsonify, stream_with_context
 from flask_cors import CORS
 from seo_analyzer import SEOAnalyzer
+from batch_analyzer import BatchAnalyzer
+from result_cache import ResultCache
+from metrics import AnalysisMetrics
+from input_limits import AnalysisLimits, DocumentTooLarge
+from incremental import IncrementalAnalyzer, BlockStore
+from corpus_stats import CorpusStatistics
+from admission import AdmissionController, Overloaded
+from serialization import JSON_TYPE, COLUMNAR_TYPE, MIN_COMPRESS_BYTES, response_types, response_encodings, encode, compress
 
-# Configure logging
-logging.basicConfig(level=logging.DEBUG)
+# Configure logging (LOG_LEVEL=debug for development)
+logging.basicConfig(level=os.environ.get("LOG_LEVEL", "INFO").upper())
 
 # Create Flask app
 app = Flask(__name__)
 app.secret_key = os.environ.get("SESSION_SECRET", "dev-secret-key")
 
+# Reject request bodies over this many bytes with 413 before reading them
+app.config['MAX_CONTENT_LENGTH'] = int(os.environ.get("ANALYZER_MAX_BODY_BYTES", 0)) or None
+
 # Enable CORS for n8n integration
 CORS(app)
 
-# Initialize SEO analyzer
-seo_analyzer = SEOAnalyzer()
+# Cache of analysis results (in-memory LRU, plus an optional sqlite file shared by workers)
+result_cache = ResultCache(
+    max_entries=int(os.environ.get("ANALYZER_CACHE_SIZE", 256)),
+    path=os.environ.get("ANALYZER_CACHE_PATH") or None
+)
+
+# Cache of parsed documents, so the same HTML with other keywords skips parsing
+document_cache = ResultCache(
+    max_entries=int(os.environ.get("ANALYZER_DOCUMENT_CACHE_SIZE", 64)),
+    path=os.environ.get("ANALYZER_DOCUMENT_CACHE_PATH") or None
+)
+
+# Document size limits; in bounded mode oversized documents are truncated
+# (and marked) instead of rejected
+analysis_limits = AnalysisLimits(
+    max_html_length=int(os.environ.get("ANALYZER_MAX_HTML_LENGTH", 0)),
+    max_nodes=int(os.environ.get("ANALYZER_MAX_NODES", 0)),
+    max_text_length=int(os.environ.get("ANALYZER_MAX_TEXT_LENGTH", 0)),
+    bounded=os.environ.get("ANALYZER_BOUNDED", "").lower() in ("1", "true", "yes")
+)
+if not (analysis_limits.max_html_length or analysis_limits.max_nodes or analysis_limits.max_text_length or analysis_limits.bounded):
+    analysis_limits = None
+
+# Profile every analysis for /metrics (clients can also ask per request)
+PROFILE_ALL = os.environ.get("ANALYZER_PROFILE", "").lower() in ("1", "true", "yes")
+
+# Aggregated stage timings of profiled analyses, exported at /metrics
+analysis_metrics = AnalysisMetrics()
+
+# Initialize SEO analyzer ("bs4" or "lxml" parsing backend)
+seo_analyzer = SEOAnalyzer(
+    backend=os.environ.get("ANALYZER_BACKEND", "bs4"),
+    cache=result_cache,
+    document_cache=document_cache,
+    profile=PROFILE_ALL,
+    limits=analysis_limits,
+    stage_workers=int(os.environ.get("ANALYZER_STAGE_WORKERS", 0)),
+    sample_length=int(os.environ.get("ANALYZER_SAMPLE_LENGTH", 500)),
+    body_samples=os.environ.get("ANALYZER_BODY_SAMPLES", "").lower() in ("1", "true", "yes")
+)
+
+# Per-URL block fingerprints for incremental re-analysis ("incremental": true)
+incremental_analyzer = None
+if os.environ.get("ANALYZER_INCREMENTAL_PATH"):
+    incremental_analyzer = IncrementalAnalyzer(seo_analyzer, BlockStore(os.environ["ANALYZER_INCREMENTAL_PATH"]))
+
+# Process pool for batch analysis (ANALYZER_BATCH_WORKERS processes, a
+# small fixed number by default since every server worker owns a pool)
+batch_analyzer = BatchAnalyzer(
+    backend=seo_analyzer.backend,
+    cache_size=result_cache.max_entries,
+    cache_path=result_cache.path,
+    profile=PROFILE_ALL,
+    limits=analysis_limits,
+    sample_length=seo_analyzer.body_sampler.max_length,
+    body_samples=seo_analyzer.body_samples
+)
+
+# Bytes of request bodies analyzed at once per worker process; requests
+# over the budget queue, and get 429 with Retry-After when the queue is full
+# or they wait too long (ANALYZER_MAX_INFLIGHT_BYTES=0 disables this)
+MAX_INFLIGHT_BYTES = int(os.environ.get("ANALYZER_MAX_INFLIGHT_BYTES", 32 * 1024 * 1024))
+
+# Each waiting request holds one of the worker's request threads, so the
+# queue must leave threads free for the requests it refuses: by default at
+# most half of them wait
+WORKER_THREADS = int(os.environ.get("ANALYZER_WORKER_THREADS", 4))
+MAX_QUEUE = int(os.environ.get("ANALYZER_MAX_QUEUE", 0)) or max(1, WORKER_THREADS // 2)
+
+admission = None
+if MAX_INFLIGHT_BYTES:
+    if MAX_QUEUE >= WORKER_THREADS - 1:
+        logging.warning(f"ANALYZER_MAX_QUEUE={MAX_QUEUE} cannot fill up with {WORKER_THREADS} worker threads; "
+                        "bursts will wait for a thread instead of getting 429")
+    admission = AdmissionController(
+        max_bytes=MAX_INFLIGHT_BYTES,
+        max_queue=MAX_QUEUE,
+        timeout=float(os.environ.get("ANALYZER_QUEUE_TIMEOUT", 30))
+    )
+
+def admitted(view):
+    """Run an analysis view within the worker's in-flight byte budget
+
+    Streamed responses are analyzed while they are sent, so they hold the
+    budget until the response is closed rather than until the view returns.
+    """
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        if admission is None:
+            return view(*args, **kwargs)
+        
+        # Weighted by body size, which must be known before the body is read
+        weight = request.content_length
+        if weight is None:
+            return jsonify({"error": "Content-Length is required"}), 411
+        try:
+            admission.acquire(weight)
+        except Overloaded as e:
+            response = jsonify({"error": str(e), "retryAfter": e.retry_after})
+            response.status_code = 429
+            response.headers['Retry-After'] = str(e.retry_after)
+            return response
+        
+        started = time.perf_counter()
+        
+        def release():
+            admission.release(weight, time.perf_counter() - started)
+        
+        try:
+            response = view(*args, **kwargs)
+        except BaseException:
+            release()
+            raise
+        if isinstance(response, Response) and response.is_streamed:
+            response.call_on_close(release)
+        else:
+            release()
+        return response
+    return wrapper
+
+def wants_timings(data) -> bool:
+    """Whether the client asked for `_timings` with ?profile=1 or "profile": true"""
+    if request.args.get('profile', '').lower() in ('1', 'true', 'yes'):
+        return True
+    return isinstance(data, dict) and bool(data.get('profile'))
+
+def record_timings(result, keep: bool):
+    """Feed a result's `_timings` to /metrics, removing them unless requested"""
+    if not isinstance(result, dict) or '_timings' not in result:
+        return result
+    analysis_metrics.observe(result['_timings'])
+    if not keep:
+        del result['_timings']
+    return result
+
+def respond(payload, rows: bool = True):
+    """Encode an analysis response in the format and compression the client accepts
+
+    JSON by default; MessagePack or the columnar format via the Accept header
+    (or ?format=columnar), compressed with zstd or gzip per Accept-Encoding.
+    Payloads that are not analysis results (rows=False) have no columnar
+    form: ?format=columnar gets 406 and Accept negotiation skips it.
+    """
+    types = response_types() if rows else [media_type for media_type in response_types() if media_type != COLUMNAR_TYPE]
+    media_type = request.accept_mimetypes.best_match(types, default=JSON_TYPE)
+    if request.args.get('format') == 'columnar':
+        if not rows:
+            return jsonify({"error": "This endpoint has no columnar format", "formats": types}), 406
+        media_type = COLUMNAR_TYPE
+    body = encode(payload, media_type)
+    
+    response = Response(body, mimetype=media_type)
+    encoding = request.accept_encodings.best_match(response_encodings()) if 'Accept-Encoding' in request.headers else None
+    if encoding is not None and len(body) >= MIN_COMPRESS_BYTES:
+        response.set_data(compress(body, encoding))
+        response.headers['Content-Encoding'] = encoding
+    response.vary.add('Accept')
+    response.vary.add('Accept-Encoding')
+    return response
+
+@app.before_request
+def check_body_size():
+    """Reject bodies over ANALYZER_MAX_BODY_BYTES before any route reads them"""
+    max_bytes = app.config['MAX_CONTENT_LENGTH']
+    if max_bytes is not None and request.content_length is not None and request.content_length > max_bytes:
+        return jsonify({"error": f"Request body is larger than {max_bytes} bytes"}), 413
 
 @app.route('/')
 def index():
@@ -23,6 +201,7 @@ def index():
     return render_template('index.html')
 
 @app.route('/api/analyze', methods=['POST'])
+@admitted
 def analyze_api():
     """API endpoint for n8n workflow integration"""
     try:
@@ -41,20 +220,175 @@ def analyze_api():
         if not html_content:
             return jsonify({"error": "HTML content is required"}), 400
         
+        # Re-crawled URLs can reuse their previous analysis
+        if data.get('incremental') and url and incremental_analyzer is not None:
+            return respond(incremental_analyzer.analyze(html_content, url, primary_keyword, related_keywords))
+        
         # Analyze HTML content
+        profile = wants_timings(data)
         result = seo_analyzer.analyze(
             html_content=html_content,
             url=url,
             primary_keyword=primary_keyword,
-            related_keywords=related_keywords
+            related_keywords=related_keywords,
+            profile=PROFILE_ALL or profile
         )
         
-        return jsonify(result)
+        return respond(record_timings(result, keep=profile))
         
+    except DocumentTooLarge as e:
+        return jsonify({"error": str(e)}), 413
     except Exception as e:
         logging.error(f"Error in API analysis: {str(e)}")
         return jsonify({"error": f"Analysis failed: {str(e)}"}), 500
 
+@app.route('/api/analyze/batch', methods=['POST'])
+@admitted
+def analyze_batch_api():
+    """Batch API endpoint: analyze many documents in one request"""
+    try:
+        # Accept either a bare array of items or {"items": [...]}
+        data = request.get_json()
+        profile = wants_timings(data)
+        
+        if isinstance(data, dict):
+            data = data.get('items')
+        
+        if not isinstance(data, list) or not data:
+            return jsonify({"error": "A non-empty array of items is required"}), 400
+        
+        # A request-level flag profiles every item
+        if profile:
+            data = [dict(item, profile=True) if isinstance(item, dict) else item for item in data]
+        
+        # Per-item results (or per-item errors) in input order
+        results = batch_analyzer.analyze_many(data)
+        results = [record_timings(result, keep=wants_timings(item)) for result, item in zip(results, data)]
+        
+        return respond({"results": results})
+        
+    except Exception as e:
+        logging.error(f"Error in batch API analysis: {str(e)}")
+        return jsonify({"error": f"Batch analysis failed: {str(e)}"}), 500
+
+@app.route('/api/analyze/site', methods=['POST'])
+@admitted
+def analyze_site_api():
+    """Site batch endpoint: learn each site's template blocks from its pages and strip them from every page"""
+    try:
+        data = request.get_json()
+        
+        if not isinstance(data, dict) or not isinstance(data.get('items'), list) or not data['items']:
+            return jsonify({"error": "A non-empty items array is required"}), 400
+        
+        try:
+            min_pages = int(data.get('minPages', 2))
+            min_share = float(data.get('minShare', 0.6))
+            sample_pages = int(data.get('samplePages', 20))
+        except (TypeError, ValueError):
+            return jsonify({"error": "minPages, minShare and samplePages must be numbers"}), 400
+        
+        # Per-item results in input order, plus what was learned per site
+        return respond(batch_analyzer.analyze_sites(data['items'], max(min_pages, 2), min_share, max(sample_pages, 1)))
+        
+    except Exception as e:
+        logging.error(f"Error in site API analysis: {str(e)}")
+        return jsonify({"error": f"Site analysis failed: {str(e)}"}), 500
+
+@app.route('/api/analyze/stream', methods=['POST'])
+@admitted
+def analyze_stream_api():
+    """Streaming API endpoint: NDJSON records in, one NDJSON result line out per record"""
+    def generate():
+        # Read the request body line by line instead of loading it whole
+        try:
+            for line in batch_analyzer.analyze_ndjson(request.stream):
+                yield line + '\n'
+        except Exception as e:
+            logging.error(f"Error in streaming API analysis: {str(e)}")
+            yield json.dumps({"error": f"Analysis failed: {str(e)}"}) + '\n'
+    
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
+@app.route('/api/analyze/keyword-sets', methods=['POST'])
+@admitted
+def analyze_keyword_sets_api():
+    """API endpoint: analyze one HTML document against several keyword sets"""
+    try:
+        # Get JSON data from request
+        data = request.get_json()
+        
+        if not data:
+            return jsonify({"error": "No JSON data provided"}), 400
+        
+        html_content = data.get('html')
+        url = data.get('url', '')
+        keyword_sets = data.get('keywordSets')
+        
+        if not html_content:
+            return jsonify({"error": "HTML content is required"}), 400
+        
+        if not isinstance(keyword_sets, list) or not keyword_sets or not all(isinstance(keyword_set, dict) for keyword_set in keyword_sets):
+            return jsonify({"error": "keywordSets must be a non-empty array of objects"}), 400
+        
+        # The document is parsed once and every keyword set reuses it
+        results = seo_analyzer.analyze_keyword_sets(html_content, url, keyword_sets)
+        
+        return respond({"results": results})
+        
+    except DocumentTooLarge as e:
+        return jsonify({"error": str(e)}), 413
+    except Exception as e:
+        logging.error(f"Error in keyword sets API analysis: {str(e)}")
+        return jsonify({"error": f"Analysis failed: {str(e)}"}), 500
+
+@app.route('/api/corpus', methods=['POST'])
+@admitted
+def corpus_api():
+    """Corpus statistics: sparse keyword counts, word counts and paragraph histograms for many documents"""
+    try:
+        data = request.get_json()
+        
+        if not isinstance(data, dict) or not isinstance(data.get('items'), list) or not data['items']:
+            return jsonify({"error": "A non-empty items array is required"}), 400
+        items = data['items']
+        
+        # Keywords given for the corpus, or every item's keywords in first-seen order
+        keywords = data.get('keywords')
+        if keywords is None:
+            keywords = [keyword for item in items if isinstance(item, dict)
+                        for keyword in [item.get('primaryKeyword', ''), *(item.get('relatedKeywords') or [])]]
+        if not isinstance(keywords, list):
+            return jsonify({"error": "keywords must be an array"}), 400
+        keywords = list(dict.fromkeys(keyword for keyword in keywords if keyword))
+        
+        statistics = CorpusStatistics.from_measurements(keywords, batch_analyzer.measure_many(items, keywords))
+        
+        # NumPy archive for ?format=npz, columnar JSON otherwise
+        if request.args.get('format') == 'npz':
+            return Response(statistics.to_npz(), mimetype='application/octet-stream',
+                            headers={"Content-Disposition": "attachment; filename=corpus.npz"})
+        return respond(statistics.to_columns(), rows=False)
+        
+    except Exception as e:
+        logging.error(f"Error in corpus API analysis: {str(e)}")
+        return jsonify({"error": f"Corpus analysis failed: {str(e)}"}), 500
+
+@app.route('/api/cache/stats', methods=['GET'])
+def cache_stats_api():
+    """Result and document cache hit/miss counters for this worker process"""
+    stats = result_cache.stats()
+    stats["documents"] = document_cache.stats()
+    return jsonify(stats)
+
+@app.route('/metrics', methods=['GET'])
+def metrics_api():
+    """Prometheus-style histograms of profiled analyses, and admission queue metrics, in this worker process"""
+    body = analysis_metrics.render()
+    if admission is not None:
+        body += admission.render()
+    return Response(body, mimetype='text/plain; version=0.0.4')
+
 @app.route('/analyze', methods=['POST'])
 def analyze_web():
     """Web interface analysis endpoint"""
@@ -79,11 +413,12 @@ def analyze_web():
             related_keywords=related_keywords
         )
         
-        return render_template('index.html', result=result)
+        return render_template('index.html', result=record_timings(result, keep=False))
         
     except Exception as e:
         logging.error(f"Error in web analysis: {str(e)}")
         return render_template('index.html', error=f"Analysis failed: {str(e)}")
 
 if __name__ == "__main__":
-    app.run(debug=True, host="0.0.0.0", port=5000)
+    # Debug mode (reloader and debugger) only with FLASK_DEBUG=1
+    app.run(host="0.0.0.0", port=5000)
@@ -0,0 +1,14 @@
+import os
+from a2wsgi import WSGIMiddleware
+from app import app as wsgi_app, seo_analyzer
+from warmup import warm_up
+
+# Requests analyzed at once by this process; further requests wait for a
+# free thread
+WORKER_THREADS = int(os.environ.get("ANALYZER_WORKER_THREADS", 4))
+
+# Pay parser and pattern start-up costs before the first request
+warm_up(seo_analyzer)
+
+# ASGI adapter for async callers and servers (uvicorn asgi:app)
+app = WSGIMiddleware(wsgi_app, workers=WORKER_THREADS)
@@ -0,0 +1,308 @@
+import os
+import json
+import logging
+from functools import partial
+from collections import deque
+from concurrent.futures import Executor, BrokenExecutor
+from typing import Dict, List, Any, Optional, Callable, Iterable, Iterator, Set, Union
+from seo_analyzer import SEOAnalyzer
+from site_template import SiteTemplate, Block, site_key
+from keyword_index import compile_keyword_index, normalize_keyword
+from result_cache import ResultCache
+from input_limits import AnalysisLimits
+
+# Worker processes when neither max_workers nor ANALYZER_BATCH_WORKERS is
+# given: every web server process owns a pool, so one per CPU would start
+# CPU-squared processes under a multi-worker server
+DEFAULT_MAX_WORKERS = 2
+
+# Analyzer owned by each pool worker process
+_worker_analyzer: Optional[SEOAnalyzer] = None
+
+
+def _init_worker(backend: str, cache_size: int, cache_path: Optional[str], profile: bool = False,
+                 limits: Optional[AnalysisLimits] = None, sample_length: int = 500, body_samples: bool = False):
+    """Create the analyzer once per worker process"""
+    global _worker_analyzer
+    _worker_analyzer = SEOAnalyzer(backend=backend, cache=ResultCache(max_entries=cache_size, path=cache_path), profile=profile,
+                                   limits=limits, sample_length=sample_length, body_samples=body_samples)
+
+
+def analyze_item(item: Any, analyzer: SEOAnalyzer = None, template: SiteTemplate = None) -> Dict[str, Any]:
+    """
+    Analyze one batch item in the API's JSON shape
+
+    Args:
+        item: Dictionary with html, url, primaryKeyword, relatedKeywords and
+            an optional profile flag
+        analyzer: Analyzer to use, defaults to the worker process analyzer
+        template: Optional template of the item's site
+
+    Returns:
+        Analysis result, or a dictionary with an error message
+    """
+    if analyzer is None:
+        analyzer = _worker_analyzer
+
+    if not isinstance(item, dict):
+        return {"error": "Item must be a JSON object"}
+
+    html_content = item.get('html')
+    url = item.get('url', '')
+    if not html_content:
+        return {"url": url, "error": "HTML content is required"}
+
+    try:
+        return analyzer.analyze(
+            html_content=html_content,
+            url=url,
+            primary_keyword=item.get('primaryKeyword', ''),
+            related_keywords=item.get('relatedKeywords', []),
+            profile=analyzer.profile or bool(item.get('profile')),
+            template=template
+        )
+    except Exception as e:
+        return {"url": url, "error": f"Analysis failed: {str(e)}"}
+
+
+def analyze_site_item(item: Any, template: Optional[SiteTemplate], analyzer: SEOAnalyzer = None) -> Dict[str, Any]:
+    """analyze_item with the template of the item's site"""
+    return analyze_item(item, analyzer, template)
+
+
+def item_blocks(item: Any, analyzer: SEOAnalyzer = None) -> Optional[Set[Block]]:
+    """Candidate site template blocks of one batch item, or None if it cannot be parsed"""
+    if analyzer is None:
+        analyzer = _worker_analyzer
+
+    if not isinstance(item, dict) or not item.get('html'):
+        return None
+
+    try:
+        return analyzer.page_blocks(item['html'])
+    except Exception:
+        return None
+
+
+def measure_item(item: Any, keywords: List[str], analyzer: SEOAnalyzer = None) -> Dict[str, Any]:
+    """
+    Measure one batch item for corpus statistics
+
+    Args:
+        item: Dictionary with html and url
+        keywords: Keywords to count, the same for every item
+        analyzer: Analyzer to use, defaults to the worker process analyzer
+
+    Returns:
+        url, keywordCounts (aligned with keywords), wordCount and
+        paragraphLengths, or a dictionary with an error message
+    """
+    if analyzer is None:
+        analyzer = _worker_analyzer
+
+    if not isinstance(item, dict):
+        return {"error": "Item must be a JSON object"}
+
+    html_content = item.get('html')
+    url = item.get('url', '')
+    if not html_content:
+        return {"url": url, "error": "HTML content is required"}
+
+    try:
+        document = analyzer.parse(html_content)
+        keyword_counts = compile_keyword_index(tuple(keywords)).count(document.clean_text)
+    except Exception as e:
+        return {"url": url, "error": f"Analysis failed: {str(e)}"}
+
+    return {
+        "url": url,
+        "keywordCounts": [keyword_counts[normalize_keyword(keyword)] for keyword in keywords],
+        "wordCount": document.word_count,
+        "paragraphLengths": document.paragraph_lengths
+    }
+
+
+def analyze_ndjson_line(line: Union[str, bytes], analyzer: SEOAnalyzer = None) -> str:
+    """Decode one NDJSON record, analyze it and encode the result as one JSON line"""
+    try:
+        item = json.loads(line)
+    except ValueError as e:
+        result = {"error": f"Invalid JSON: {str(e)}"}
+    else:
+        result = analyze_item(item, analyzer)
+    return json.dumps(result)
+
+
+class BatchAnalyzer:
+    """Fans batches of documents out over a pool of analyzer processes"""
+
+    def __init__(self, max_workers: int = None, backend: str = 'bs4', cache_size: int = 0, cache_path: str = None,
+                 profile: bool = False, limits: AnalysisLimits = None, sample_length: int = 500, body_samples: bool = False):
+        """
+        Args:
+            max_workers: Number of worker processes, defaults to
+                ANALYZER_BATCH_WORKERS or DEFAULT_MAX_WORKERS (at most the CPU count)
+            backend: Parsing backend for the worker analyzers
+            cache_size: In-memory result cache size of each worker
+            cache_path: Optional sqlite result cache shared by the workers
+            profile: Attach per-stage `_timings` to every result
+            limits: Optional document size limits for the worker analyzers
+            sample_length: Maximum length of the clean body samples
+            body_samples: Also sample the middle and end of each text
+        """
+        self.logger = logging.getLogger(__name__)
+        self.max_workers = (max_workers or int(os.environ.get("ANALYZER_BATCH_WORKERS", 0))
+                            or min(DEFAULT_MAX_WORKERS, os.cpu_count() or 1))
+        self.backend = backend
+        self.cache_size = cache_size
+        self.cache_path = cache_path
+        self.profile = profile
+        self.limits = limits
+        self.sample_length = sample_length
+        self.body_samples = body_samples
+
+        # Used for batches that are not worth a round trip to the pool
+        self.analyzer = SEOAnalyzer(backend=backend, cache=ResultCache(max_entries=cache_size, path=cache_path), profile=profile,
+                                    limits=limits, sample_length=sample_length, body_samples=body_samples)
+
+        # Started on first use so that forking servers create it per worker
+        self._executor: Optional[Executor] = None
+
+    def analyze_many(self, items: List[Any]) -> List[Dict[str, Any]]:
+        """Analyze items in parallel and return per-item results in input order"""
+        return self._map(analyze_item, items)
+
+    def measure_many(self, items: List[Any], keywords: List[str]) -> List[Dict[str, Any]]:
+        """Measure items for corpus statistics in parallel, in input order (see measure_item)"""
+        return self._map(partial(measure_item, keywords=keywords), items)
+
+    def analyze_sites(self, items: List[Any], min_pages: int = 2, min_share: float = 0.6,
+                      sample_pages: int = 20) -> Dict[str, Any]:
+        """
+        Analyze pages grouped by site, stripping the template blocks each site repeats
+
+        Items are grouped by the network location of their url. For every
+        site with at least min_pages pages, the candidate blocks of its first
+        sample_pages pages are collected in parallel and the blocks found on
+        enough of them become the site's template (see SiteTemplate.learn).
+        Every page is then analyzed with its site's template, so learning is
+        paid once per site however many pages it has. Pages without a url,
+        and sites too small or sharing no blocks, get the per-page rules.
+
+        Returns:
+            results, in input order, and sites: per site the number of pages,
+            the distinct pages its template was learned from and the number
+            of template blocks
+        """
+        sites: Dict[str, List[int]] = {}
+        for index, item in enumerate(items):
+            url = item.get('url') if isinstance(item, dict) else None
+            site = site_key(url) if isinstance(url, str) else ''
+            if site:
+                sites.setdefault(site, []).append(index)
+
+        samples = [index for indices in sites.values() if len(indices) >= min_pages for index in indices[:sample_pages]]
+        blocks = dict(zip(samples, self._map(item_blocks, [items[index] for index in samples])))
+
+        templates: List[Optional[SiteTemplate]] = [None] * len(items)
+        summary = {}
+        for site, indices in sites.items():
+            template = SiteTemplate.learn(site, [blocks[index] for index in indices if index in blocks], min_pages, min_share)
+            summary[site] = {"pages": len(indices), "learnedFrom": template.pages, "templateBlocks": len(template)}
+            if len(template):
+                for index in indices:
+                    templates[index] = template
+
+        return {"results": self._map(analyze_site_item, items, templates), "sites": summary}
+
+    def analyze_ndjson(self, lines: Iterable[Union[str, bytes]], window: int = None) -> Iterator[str]:
+        """
+        Analyze a stream of NDJSON records, yielding one JSON result line per record
+
+        Records are decoded, analyzed and encoded in the worker processes. At
+        most `window` records are in flight at once and results are yielded in
+        input order as soon as they are ready, so memory stays bounded however
+        long the stream is. Blank lines are skipped.
+        """
+        records = (line for line in lines if line.strip())
+        return self._ordered_map(analyze_ndjson_line, records, window)
+
+    @property
+    def executor(self) -> Executor:
+        """The worker pool, for callers that schedule analyze_item themselves"""
+        return self._get_executor()
+
+    def shutdown(self):
+        """Stop the worker processes"""
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+    def _map(self, func: Callable, items: List[Any], *arguments: List[Any]) -> List[Any]:
+        """Call func on every item (and its matching arguments) in parallel, returning results in input order
+
+        func must accept the analyzer as an `analyzer` keyword, which is
+        passed when the call runs in this process.
+        """
+        if len(items) <= 1 or self.max_workers <= 1:
+            return [func(*call, analyzer=self.analyzer) for call in zip(items, *arguments)]
+
+        # Hand out a few chunks per worker to balance load without paying
+        # inter-process overhead for every document
+        chunksize = max(1, len(items) // (self.max_workers * 4))
+        try:
+            return list(self._get_executor().map(func, items, *arguments, chunksize=chunksize))
+        except BrokenExecutor:
+            self.logger.error("Analyzer process pool died, restarting it on next batch")
+            self._executor = None
+            raise
+
+    def _ordered_map(self, func: Callable, items: Iterable[Any], window: int = None) -> Iterator[Any]:
+        """Lazily map func over items with a bounded number of pending tasks"""
+        if self.max_workers <= 1:
+            for item in items:
+                yield func(item, self.analyzer)
+            return
+
+        window = window or self.max_workers * 2
+        executor = self._get_executor()
+        pending = deque()
+        try:
+            for item in items:
+                pending.append(executor.submit(func, item))
+                if len(pending) >= window:
+                    yield pending.popleft().result()
+            while pending:
+                yield pending.popleft().result()
+        except BrokenExecutor:
+            self.logger.error("Analyzer process pool died, restarting it on next batch")
+            self._executor = None
+            raise
+        finally:
+            # Drop queued work if the consumer stops early
+            for future in pending:
+                future.cancel()
+
+    def _get_executor(self) -> Executor:
+        if self._executor is None:
+            # Imported here: multiprocessing is slow to load and single-page
+            # callers never start the pool
+            import multiprocessing
+            from concurrent.futures import ProcessPoolExecutor
+
+            # Forking a threaded server process can copy held locks into the
+            # workers; start them from a clean server process (with the
+            # analyzer modules preloaded) or fresh interpreters instead
+            if 'forkserver' in multiprocessing.get_all_start_methods():
+                context = multiprocessing.get_context('forkserver')
+                context.set_forkserver_preload([__name__])
+            else:
+                context = multiprocessing.get_context('spawn')
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                mp_context=context,
+                initializer=_init_worker,
+                initargs=(self.backend, self.cache_size, self.cache_path, self.profile, self.limits,
+                          self.sample_length, self.body_samples)
+            )
+        return self._executor
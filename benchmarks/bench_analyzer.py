@@ -0,0 +1,251 @@
+"""Benchmark harness and golden-output check for SEOAnalyzer
+
+Runs SEOAnalyzer.analyze and each of its stages over the generated corpus in
+benchmarks/corpus.py and reports latency percentiles, throughput and peak
+Python memory per case as JSON. Every result is compared with the stored
+output in benchmarks/golden/, so a faster change that alters results fails.
+Everything runs offline. Run from the repository root:
+
+    python benchmarks/bench_analyzer.py --output bench.json
+    python benchmarks/bench_analyzer.py --backend lxml --compare bench.json
+    python benchmarks/bench_analyzer.py --update-golden
+
+The process exits with status 1 if any result differs from its golden file.
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import subprocess
+import tracemalloc
+from typing import Dict, List, Any, Callable, Optional
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT_DIR = os.path.dirname(BENCH_DIR)
+GOLDEN_DIR = os.path.join(BENCH_DIR, 'golden')
+
+sys.path.insert(0, ROOT_DIR)
+
+from seo_analyzer import SEOAnalyzer  # noqa: E402
+from keyword_index import KeywordIndex  # noqa: E402
+from text_model import TextModel  # noqa: E402
+from corpus import CASES, build_case  # noqa: E402
+
+
+def percentiles(samples: List[float]) -> Dict[str, float]:
+    """Nearest-rank latency summary in milliseconds"""
+    ordered = sorted(samples)
+
+    def rank(p: float) -> float:
+        index = max(0, min(len(ordered) - 1, int(round(p / 100 * len(ordered) + 0.5)) - 1))
+        return round(ordered[index] * 1000, 3)
+
+    return {
+        "p50": rank(50),
+        "p90": rank(90),
+        "p99": rank(99),
+        "min": round(ordered[0] * 1000, 3),
+        "max": round(ordered[-1] * 1000, 3),
+        "mean": round(sum(ordered) / len(ordered) * 1000, 3),
+    }
+
+
+def time_stages(analyzer: SEOAnalyzer, case: Dict[str, Any]) -> Dict[str, float]:
+    """Run the analysis pipeline stage by stage, returning seconds per stage"""
+    timings: Dict[str, float] = {}
+    keywords = [case['primaryKeyword'], *case['relatedKeywords']]
+
+    def timed(name: str, func: Callable, *args):
+        start = time.perf_counter()
+        value = func(*args)
+        timings[name] = time.perf_counter() - start
+        return value
+
+    # Keyword-independent stage, in the order SEOAnalyzer.parse runs it
+    scan = timed('_scan', analyzer._scan, case['html'])
+    title = timed('_extract_title', analyzer._extract_title, scan)
+    timed('_determine_content_type', analyzer._determine_content_type, scan, title)
+    clean_text = timed('_extract_clean_text', analyzer._extract_clean_text, scan)
+    timed('_count_words', analyzer._count_words, clean_text)
+    headings = timed('_extract_headings', analyzer._extract_headings, scan)
+    timed('_detect_media', analyzer._detect_media, scan)
+    timed('_detect_cta', analyzer._detect_cta, scan, clean_text)
+    timed('_generate_clean_body_sample', analyzer._generate_clean_body_sample, clean_text)
+    paragraph_lengths = timed('_measure_paragraphs', analyzer._measure_paragraphs, scan)
+    timed('_analyze_paragraph_style', analyzer._analyze_paragraph_style, scan, paragraph_lengths)
+
+    # Keyword stage; the index is built fresh so its compile time is included
+    text_model = timed('text_model', TextModel, title, headings, clean_text)
+    keyword_counts = timed('keyword_index', lambda: KeywordIndex(keywords).count_lowered(text_model.body))
+    timed('_count_keyword_frequency', analyzer._count_keyword_frequency, keyword_counts, case['primaryKeyword'])
+    timed('_count_related_keywords', analyzer._count_related_keywords, keyword_counts, case['relatedKeywords'])
+    timed('_analyze_keyword_placement', analyzer._analyze_keyword_placement, case['primaryKeyword'], text_model)
+
+    return timings
+
+
+def analyze(analyzer: SEOAnalyzer, case: Dict[str, Any]) -> Dict[str, Any]:
+    return analyzer.analyze(case['html'], case['url'], case['primaryKeyword'], case['relatedKeywords'])
+
+
+def peak_memory(analyzer: SEOAnalyzer, case: Dict[str, Any]) -> float:
+    """Peak Python heap growth during one analysis, in MB
+
+    tracemalloc only sees allocations made through Python's allocator, so
+    memory owned by libxml2 (the lxml tree) is not included.
+    """
+    tracemalloc.start()
+    try:
+        analyze(analyzer, case)
+        return round(tracemalloc.get_traced_memory()[1] / (1024 * 1024), 2)
+    finally:
+        tracemalloc.stop()
+
+
+def golden_path(name: str) -> str:
+    return os.path.join(GOLDEN_DIR, name + '.json')
+
+
+def check_golden(name: str, result: Dict[str, Any]) -> Dict[str, Any]:
+    """Compare a result with its golden file"""
+    path = golden_path(name)
+    if not os.path.exists(path):
+        return {"status": "missing"}
+
+    with open(path, encoding='utf-8') as f:
+        expected = json.load(f)
+    actual = json.loads(json.dumps(result))
+    if actual == expected:
+        return {"status": "ok"}
+
+    differing = sorted(key for key in set(expected) | set(actual) if expected.get(key) != actual.get(key))
+    return {"status": "mismatch", "keys": differing}
+
+
+def write_golden(name: str, result: Dict[str, Any]):
+    os.makedirs(GOLDEN_DIR, exist_ok=True)
+    with open(golden_path(name), 'w', encoding='utf-8') as f:
+        json.dump(result, f, indent=1, sort_keys=True, ensure_ascii=False)
+        f.write('\n')
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT_DIR, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def bench_case(backend: str, name: str, repeat: int, warmup: int, update_golden: bool) -> Dict[str, Any]:
+    case = build_case(name)
+    size = len(case['html'].encode('utf-8'))
+
+    # No caches, every run parses from scratch
+    analyzer = SEOAnalyzer(backend=backend)
+
+    result = analyze(analyzer, case)
+    if update_golden:
+        write_golden(name, result)
+    golden = check_golden(name, result)
+
+    for _ in range(warmup):
+        analyze(analyzer, case)
+
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        analyze(analyzer, case)
+        samples.append(time.perf_counter() - start)
+
+    stage_samples: Dict[str, List[float]] = {}
+    for _ in range(repeat):
+        for stage, seconds in time_stages(analyzer, case).items():
+            stage_samples.setdefault(stage, []).append(seconds)
+
+    total = sum(samples)
+    return {
+        "case": name,
+        "backend": backend,
+        "bytes": size,
+        "analyze": percentiles(samples),
+        "throughputMBps": round(size * repeat / total / (1024 * 1024), 3) if total else None,
+        "docsPerSecond": round(repeat / total, 3) if total else None,
+        "peakMemoryMB": peak_memory(analyzer, case),
+        "stages": {stage: percentiles(values) for stage, values in stage_samples.items()},
+        "golden": golden,
+    }
+
+
+def compare(runs: List[Dict[str, Any]], baseline: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Ratio of p50 latencies against an earlier report (below 1 is faster)"""
+    previous = {(run['backend'], run['case']): run for run in baseline.get('runs', [])}
+    comparison = []
+    for run in runs:
+        old = previous.get((run['backend'], run['case']))
+        if old is None:
+            continue
+        stages = {
+            stage: round(summary['p50'] / old['stages'][stage]['p50'], 3)
+            for stage, summary in run['stages'].items()
+            if old['stages'].get(stage, {}).get('p50')
+        }
+        comparison.append({
+            "case": run['case'],
+            "backend": run['backend'],
+            "analyzeP50Ratio": round(run['analyze']['p50'] / old['analyze']['p50'], 3) if old['analyze']['p50'] else None,
+            "peakMemoryRatio": round(run['peakMemoryMB'] / old['peakMemoryMB'], 3) if old['peakMemoryMB'] else None,
+            "stageP50Ratios": stages,
+        })
+    return comparison
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--backend', action='append', choices=SEOAnalyzer.BACKENDS,
+                        help='Parsing backend, may be repeated (default: bs4)')
+    parser.add_argument('--case', action='append', choices=list(CASES), help='Corpus case, may be repeated (default: all)')
+    parser.add_argument('--repeat', type=int, default=5, help='Timed runs per case and stage')
+    parser.add_argument('--warmup', type=int, default=1, help='Untimed runs before timing')
+    parser.add_argument('--output', help='Write the JSON report here instead of stdout')
+    parser.add_argument('--compare', help='Earlier JSON report to compare p50 latencies with')
+    parser.add_argument('--update-golden', action='store_true', help='Overwrite the golden files with current results')
+    args = parser.parse_args()
+
+    runs = []
+    for backend in args.backend or ['bs4']:
+        for name in args.case or list(CASES):
+            print(f"{backend} {name}...", file=sys.stderr)
+            runs.append(bench_case(backend, name, args.repeat, args.warmup, args.update_golden))
+
+    report = {
+        "meta": {
+            "commit": git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "repeat": args.repeat,
+            "timestamp": time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+        },
+        "runs": runs,
+    }
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            report["comparison"] = compare(runs, json.load(f))
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(output + '\n')
+    else:
+        print(output)
+
+    failures = [f"{run['backend']}/{run['case']}" for run in runs if run['golden']['status'] == 'mismatch']
+    if failures:
+        print(f"Golden output mismatch: {', '.join(failures)}", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
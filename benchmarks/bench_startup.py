@@ -0,0 +1,206 @@
+"""Start-up benchmark: import cost and time to first result in fresh processes
+
+Every sample is a new interpreter, as on a cold actor run or worker start:
+
+- imports: `python -X importtime -c "import <module>"` for each module,
+  reporting the median cumulative import time, the modules with the largest
+  self time and which heavy optional modules got loaded
+- firstResult: wall time of a process that imports the analyzer and analyzes
+  one small page with each backend
+- actor: wall time of a one-page `python main.py` run against local storage
+  (skipped when apify is not installed)
+
+Run from the repository root:
+
+    python benchmarks/bench_startup.py --output startup.json
+    python benchmarks/bench_startup.py --compare startup.json
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import tempfile
+import subprocess
+import importlib.util
+from statistics import median
+from typing import Dict, List, Any, Optional
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT_DIR = os.path.dirname(BENCH_DIR)
+
+DEFAULT_MODULES = ['seo_analyzer', 'batch_analyzer', 'app', 'main']
+BACKENDS = ['bs4', 'lxml', 'stream']
+
+# Reported when an import pulls them in
+HEAVY_MODULES = ['bs4', 'lxml.html', 'numpy', 'multiprocessing', 'sqlite3', 'apify']
+
+FIRST_RESULT_SCRIPT = """
+import sys
+from seo_analyzer import SEOAnalyzer
+from warmup import WARMUP_HTML
+SEOAnalyzer(backend=sys.argv[1]).analyze(WARMUP_HTML, 'https://example.com/', 'warm-up', ['article'])
+"""
+
+ACTOR_INPUT = {
+    "url": "https://example.com/",
+    "primaryKeyword": "warm-up",
+    "relatedKeywords": ["article"],
+}
+
+
+def run(args: List[str], env: Dict[str, str] = None) -> subprocess.CompletedProcess:
+    return subprocess.run([sys.executable, *args], cwd=ROOT_DIR, capture_output=True, text=True, env=env)
+
+
+def timed(args: List[str], env: Dict[str, str] = None) -> float:
+    """Wall time of one process in milliseconds"""
+    start = time.perf_counter()
+    completed = run(args, env)
+    elapsed = (time.perf_counter() - start) * 1000
+    if completed.returncode != 0:
+        raise RuntimeError(f"{' '.join(args)} failed:\n{completed.stderr[-2000:]}")
+    return elapsed
+
+
+def parse_importtime(stderr: str) -> Dict[str, Dict[str, int]]:
+    """Self and cumulative microseconds per module from -X importtime output"""
+    modules = {}
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        modules[name.strip()] = {"self": int(self_us), "cumulative": int(cumulative_us)}
+    return modules
+
+
+def bench_import(module: str, repeat: int, top: int) -> Dict[str, Any]:
+    cumulative = []
+    self_times: Dict[str, List[int]] = {}
+    loaded = set()
+    for _ in range(repeat):
+        completed = run(['-X', 'importtime', '-c', f'import {module}'])
+        if completed.returncode != 0:
+            return {"module": module, "error": completed.stderr.strip().splitlines()[-1]}
+        modules = parse_importtime(completed.stderr)
+        cumulative.append(modules[module]["cumulative"])
+        for name, times in modules.items():
+            self_times.setdefault(name, []).append(times["self"])
+        loaded.update(modules)
+
+    slowest = sorted(((median(times), name) for name, times in self_times.items()), reverse=True)[:top]
+    return {
+        "module": module,
+        "importMs": round(median(cumulative) / 1000, 3),
+        "slowestSelfMs": {name: round(us / 1000, 3) for us, name in slowest},
+        "heavyModules": [name for name in HEAVY_MODULES if name in loaded],
+    }
+
+
+def bench_first_result(backend: str, repeat: int) -> Dict[str, Any]:
+    samples = [timed(['-c', FIRST_RESULT_SCRIPT, backend]) for _ in range(repeat)]
+    return {"backend": backend, "wallMs": round(median(samples), 3), "minMs": round(min(samples), 3)}
+
+
+def bench_actor(repeat: int) -> Optional[Dict[str, Any]]:
+    """One-page actor run on local storage, from process start to exit"""
+    if importlib.util.find_spec('apify') is None:
+        return None
+
+    from warmup import WARMUP_HTML
+
+    samples = []
+    for _ in range(repeat):
+        with tempfile.TemporaryDirectory() as storage:
+            input_dir = os.path.join(storage, 'key_value_stores', 'default')
+            os.makedirs(input_dir)
+            with open(os.path.join(input_dir, 'INPUT.json'), 'w', encoding='utf-8') as f:
+                json.dump({**ACTOR_INPUT, "html": WARMUP_HTML}, f)
+            env = {**os.environ, "APIFY_LOCAL_STORAGE_DIR": storage, "CRAWLEE_STORAGE_DIR": storage}
+            samples.append(timed(['main.py'], env))
+    return {"wallMs": round(median(samples), 3), "minMs": round(min(samples), 3)}
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT_DIR, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(report: Dict[str, Any], baseline: Dict[str, Any]) -> Dict[str, Any]:
+    """Ratio of median times against an earlier report (below 1 is faster)"""
+    def ratio(new: Optional[float], old: Optional[float]) -> Optional[float]:
+        return round(new / old, 3) if new is not None and old else None
+
+    old_imports = {entry['module']: entry for entry in baseline.get('imports', [])}
+    old_first = {entry['backend']: entry for entry in baseline.get('firstResult', [])}
+    return {
+        "importMsRatio": {
+            entry['module']: ratio(entry.get('importMs'), old_imports.get(entry['module'], {}).get('importMs'))
+            for entry in report['imports']
+        },
+        "firstResultRatio": {
+            entry['backend']: ratio(entry['wallMs'], old_first.get(entry['backend'], {}).get('wallMs'))
+            for entry in report['firstResult']
+        },
+        "actorRatio": ratio((report.get('actor') or {}).get('wallMs'), (baseline.get('actor') or {}).get('wallMs')),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--module', action='append', help=f'Module to import, may be repeated (default: {DEFAULT_MODULES})')
+    parser.add_argument('--backend', action='append', choices=BACKENDS, help='Backend for the first result (default: all)')
+    parser.add_argument('--repeat', type=int, default=7, help='Fresh processes per measurement')
+    parser.add_argument('--top', type=int, default=10, help='Modules listed by self import time')
+    parser.add_argument('--no-actor', action='store_true', help='Skip the actor run')
+    parser.add_argument('--output', help='Write the JSON report here instead of stdout')
+    parser.add_argument('--compare', help='Earlier JSON report to compare median times with')
+    args = parser.parse_args()
+
+    sys.path.insert(0, ROOT_DIR)
+
+    print("interpreter...", file=sys.stderr)
+    report: Dict[str, Any] = {
+        "meta": {
+            "commit": git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "repeat": args.repeat,
+            "timestamp": time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+            # Bare interpreter start-up, included in every wall time below
+            "interpreterMs": round(median(timed(['-c', 'pass']) for _ in range(args.repeat)), 3),
+        },
+        "imports": [],
+        "firstResult": [],
+    }
+
+    for module in args.module or DEFAULT_MODULES:
+        print(f"import {module}...", file=sys.stderr)
+        report["imports"].append(bench_import(module, args.repeat, args.top))
+
+    for backend in args.backend or BACKENDS:
+        print(f"first result {backend}...", file=sys.stderr)
+        report["firstResult"].append(bench_first_result(backend, args.repeat))
+
+    if not args.no_actor:
+        print("actor run...", file=sys.stderr)
+        report["actor"] = bench_actor(args.repeat)
+
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            report["comparison"] = compare(report, json.load(f))
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(output + '\n')
+    else:
+        print(output)
+
+
+if __name__ == '__main__':
+    main()
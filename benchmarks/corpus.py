@@ -0,0 +1,212 @@
+"""Deterministic HTML corpus for the analyzer benchmarks
+
+Every page is generated from a fixed seed, so the corpus is identical on
+every machine and needs no network access. Cases cover realistic article
+pages from 10 KB to 5 MB plus the shapes that stress particular stages:
+navigation-heavy pages, link farms and pages with thousands of headings.
+"""
+import random
+from typing import Dict, List, Any
+
+KB = 1024
+MB = 1024 * KB
+
+# Keywords used for every case, covering single words, phrases and a
+# keyword that falls back to its own regex
+PRIMARY_KEYWORD = "running shoes"
+RELATED_KEYWORDS = ["trail running", "cushioning", "shoes", "best running shoes for beginners", "c++", "marathon"]
+
+WORDS = (
+    "running shoes trail road marathon cushioning stability support heel toe drop foam outsole "
+    "upper mesh fit size runner training race pace mile comfort durability weight grip terrain "
+    "the a and of to in for with on is are that this it as by from at your you we our can will "
+    "best guide review how choose new light fast long easy daily tempo recovery injury stride"
+).split()
+
+NAV_LABELS = ["Home", "Men", "Women", "Kids", "Sale", "Brands", "Running", "Trail", "Road", "Accessories",
+              "Apparel", "Gift Cards", "Stores", "Help", "Returns", "Blog", "About", "Careers"]
+
+
+def _sentence(rng: random.Random, min_words: int = 6, max_words: int = 24) -> str:
+    words = [rng.choice(WORDS) for _ in range(rng.randint(min_words, max_words))]
+    return ' '.join(words).capitalize() + rng.choice(['.', '.', '.', '!', '?'])
+
+
+def _paragraph(rng: random.Random) -> str:
+    return '<p>' + ' '.join(_sentence(rng) for _ in range(rng.randint(2, 7))) + '</p>'
+
+
+def _nav(rng: random.Random, items: int) -> str:
+    links = ''.join(f'<li><a href="/{label.lower()}/{i}">{label}</a></li>'
+                    for i, label in ((i, rng.choice(NAV_LABELS)) for i in range(items)))
+    return f'<nav class="main-nav"><ul class="menu">{links}</ul></nav>'
+
+
+def _head(title: str) -> str:
+    return (
+        '<head><meta charset="utf-8"><title>' + title + '</title>'
+        '<meta name="description" content="Guide to running shoes">'
+        '<link rel="stylesheet" href="/static/site.css">'
+        '<style>.hero{background:#000}.menu li{display:inline}</style>'
+        '<script>window.dataLayer = window.dataLayer || []; var tpl = "<p>not text</p>";</script>'
+        '</head>'
+    )
+
+
+def _article_section(rng: random.Random, index: int) -> str:
+    parts = [f'<h2>Section {index}: {_sentence(rng, 3, 8)}</h2>']
+    for _ in range(rng.randint(2, 5)):
+        roll = rng.random()
+        if roll < 0.6:
+            parts.append(_paragraph(rng))
+        elif roll < 0.75:
+            parts.append(f'<h3>{_sentence(rng, 3, 8)}</h3>')
+        elif roll < 0.9:
+            items = ''.join(f'<li>{_sentence(rng, 3, 10)}</li>' for _ in range(rng.randint(3, 8)))
+            parts.append(f'<ul>{items}</ul>')
+        else:
+            parts.append(f'<figure class="image"><img src="/img/{index}.jpg" alt="shoe"><figcaption>{_sentence(rng, 3, 8)}</figcaption></figure>')
+    if rng.random() < 0.2:
+        parts.append('<div class="share-buttons"><a href="#">Share on Twitter</a><a href="#">Share on Facebook</a></div>')
+    return '<section>' + ''.join(parts) + '</section>'
+
+
+def article_page(target_size: int, seed: int) -> str:
+    """Realistic blog article with site chrome, grown to about target_size bytes"""
+    rng = random.Random(seed)
+    sections = []
+    size = 0
+    while size < target_size:
+        section = _article_section(rng, len(sections) + 1)
+        sections.append(section)
+        size += len(section)
+    return (
+        '<!DOCTYPE html><html lang="en">' + _head('The Best Running Shoes of the Year | Shoe Guide') + '<body>'
+        '<header class="site-header">' + _nav(rng, 12) + '</header>'
+        '<div class="breadcrumb"><a href="/">Home</a> &gt; <a href="/blog">Blog</a></div>'
+        '<main><article class="post"><h1>The Best Running Shoes of the Year</h1>'
+        '<p class="meta">Posted by Jamie on <time>2024-03-01</time></p>'
+        + ''.join(sections) +
+        '<a class="button" href="/shop">Shop now</a>'
+        '</article></main>'
+        '<aside class="sidebar"><h3>Related posts</h3><ul><li><a href="/a">Trail picks</a></li></ul></aside>'
+        '<footer class="site-footer"><p>Copyright Shoe Guide</p><form><input type="email"><input type="submit"></form></footer>'
+        '<script>console.log("analytics")</script>'
+        '</body></html>'
+    )
+
+
+def nav_heavy_page(target_size: int, seed: int) -> str:
+    """Store page whose markup is mostly mega menus, sidebars and footers"""
+    rng = random.Random(seed)
+    menus = []
+    size = 0
+    while size < target_size:
+        columns = ''.join(
+            f'<div class="menu-column"><h4>{rng.choice(NAV_LABELS)}</h4>{_nav(rng, rng.randint(10, 30))}</div>'
+            for _ in range(rng.randint(3, 6))
+        )
+        menu = f'<div class="mega-menu" style="display: none">{columns}</div>'
+        menus.append(menu)
+        size += len(menu)
+    return (
+        '<!DOCTYPE html><html>' + _head('Running Shoes Store - Shop Trail and Road Shoes') + '<body>'
+        '<header>' + ''.join(menus[:len(menus) // 2]) + '</header>'
+        '<div id="content"><h1>Running shoes</h1>' + ''.join(_paragraph(rng) for _ in range(5)) + '</div>'
+        '<div class="sidebar">' + ''.join(menus[len(menus) // 2:]) + '</div>'
+        '<footer>' + _nav(rng, 60) + '</footer>'
+        '</body></html>'
+    )
+
+
+def link_farm_page(links: int, seed: int) -> str:
+    """Page of thousands of plain links with no call-to-action text"""
+    rng = random.Random(seed)
+    anchors = ''.join(
+        f'<a href="https://example{rng.randint(1, 999)}.com/{i}">{_sentence(rng, 2, 6)}</a> '
+        for i in range(links)
+    )
+    return (
+        '<html><head><title>Useful running resources directory</title></head><body>'
+        '<div class="directory"><p>Directory of running resources.</p>' + anchors + '</div>'
+        '</body></html>'
+    )
+
+
+def heading_heavy_page(headings: int, seed: int) -> str:
+    """Page with thousands of headings of every level interleaved with short text"""
+    rng = random.Random(seed)
+    parts = []
+    for _ in range(headings):
+        level = rng.randint(1, 6)
+        parts.append(f'<h{level}>{_sentence(rng, 2, 8)}</h{level}>')
+        if rng.random() < 0.3:
+            parts.append(f'<p>{_sentence(rng)}</p>')
+    return '<html><head><title>Shoe index</title></head><body><main>' + ''.join(parts) + '</main></body></html>'
+
+
+def classed_body_page(target_size: int, seed: int) -> str:
+    """Post whose only article and media markers are the classes on <body>, as WordPress themes emit"""
+    rng = random.Random(seed)
+    paragraphs = []
+    size = 0
+    while size < target_size:
+        paragraph = _paragraph(rng)
+        paragraphs.append(paragraph)
+        size += len(paragraph)
+    return (
+        '<!DOCTYPE html><html>' + _head('Trail running notes') + '<body class="single single-post postid-1 gallery-layout">'
+        '<div class="site-nav">' + _nav(rng, 8) + '</div>'
+        '<div id="content"><h1>Trail running notes</h1>' + ''.join(paragraphs) + '</div>'
+        '</body></html>'
+    )
+
+
+def template_content_page(target_size: int, seed: int) -> str:
+    """Post whose first content container is a <template>, so its text is TemplateStrings"""
+    rng = random.Random(seed)
+    paragraphs = []
+    size = 0
+    while size < target_size:
+        paragraph = _paragraph(rng)
+        paragraphs.append(paragraph)
+        size += len(paragraph)
+    return (
+        '<!DOCTYPE html><html>' + _head('Trail running notes') + '<body>'
+        '<div class="site-nav">' + _nav(rng, 8) + '</div>'
+        '<template class="content"><h1>Trail running notes</h1>'
+        '<p><ruby>Trail<rp>(</rp><rt>toreiru</rt><rp>)</rp></ruby> notes from the week.</p>' + ''.join(paragraphs) + '</template>'
+        '<p>Comments are closed.</p>'
+        '</body></html>'
+    )
+
+
+# Case name -> (generator, size or count argument, seed)
+CASES: Dict[str, tuple] = {
+    'article_10kb': (article_page, 10 * KB, 1),
+    'article_100kb': (article_page, 100 * KB, 2),
+    'article_1mb': (article_page, 1 * MB, 3),
+    'article_5mb': (article_page, 5 * MB, 4),
+    'nav_heavy_500kb': (nav_heavy_page, 500 * KB, 5),
+    'link_farm_5000': (link_farm_page, 5000, 6),
+    'headings_5000': (heading_heavy_page, 5000, 7),
+    'classed_body_10kb': (classed_body_page, 10 * KB, 8),
+    'template_content_10kb': (template_content_page, 10 * KB, 9),
+}
+
+
+def build_case(name: str) -> Dict[str, Any]:
+    """Generate one corpus case as an /api/analyze style request"""
+    generator, argument, seed = CASES[name]
+    return {
+        'name': name,
+        'html': generator(argument, seed),
+        'url': f'https://bench.example/{name}',
+        'primaryKeyword': PRIMARY_KEYWORD,
+        'relatedKeywords': list(RELATED_KEYWORDS),
+    }
+
+
+def build_corpus(names: List[str] = None) -> List[Dict[str, Any]]:
+    """Generate the named cases, or all of them"""
+    return [build_case(name) for name in (names or CASES)]
@@ -0,0 +1,113 @@
+"""Microbenchmark of the precompiled rule table against per-call regexes
+
+Times CTA detection and clean body sampling on a generated link-heavy page,
+once the way the analyzer used to do it (pattern strings passed to re.search
+for every link and sentence) and once with the merged patterns of
+DEFAULT_RULES. Run from the repository root:
+
+    python benchmarks/rules_microbench.py --links 500 --repeat 200
+"""
+import os
+import re
+import sys
+import json
+import argparse
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from rules import DEFAULT_RULES, DEFAULT_SKIP_PATTERNS  # noqa: E402
+
+# The two CTA pattern strings the analyzer used before the rule table
+LEGACY_CTA_PATTERNS = [
+    r'\b(buy\s+now|purchase|order\s+now|get\s+started|sign\s+up|subscribe|download|learn\s+more|contact\s+us|call\s+now|book\s+now|try\s+free|free\s+trial|get\s+quote)\b',
+    r'\b(click\s+here|read\s+more|view\s+more|see\s+more|shop\s+now|add\s+to\s+cart|checkout|register|join\s+now|apply\s+now)\b'
+]
+
+
+def make_page(links: int):
+    """Link texts and body text of a page without any CTA, the worst case"""
+    link_texts = [f"Category {i} archive page" for i in range(links)]
+    text = ' '.join(f"Sentence number {i} talks about gardening tools and soil." for i in range(links))
+    return link_texts, text
+
+
+def legacy_cta(link_texts, text):
+    for link_text in link_texts:
+        link_text = link_text.strip().lower()
+        for pattern in LEGACY_CTA_PATTERNS:
+            if re.search(pattern, link_text, re.IGNORECASE):
+                return True
+    for pattern in LEGACY_CTA_PATTERNS:
+        if re.search(pattern, text, re.IGNORECASE):
+            return True
+    return False
+
+
+def table_cta(link_texts, text):
+    cta_pattern = DEFAULT_RULES.cta_pattern
+    for link_text in link_texts:
+        if cta_pattern.search(link_text.strip().lower()):
+            return True
+    return cta_pattern.search(text) is not None
+
+
+def legacy_skip(text):
+    kept = 0
+    for sentence in text.split('.'):
+        sentence = sentence.strip()
+        if len(sentence) < 15:
+            continue
+        skip_patterns = list(DEFAULT_SKIP_PATTERNS)
+        sentence_lower = sentence.lower()
+        if not any(re.search(pattern, sentence_lower) for pattern in skip_patterns):
+            kept += 1
+    return kept
+
+
+def table_skip(text):
+    kept = 0
+    skip_pattern = DEFAULT_RULES.skip_pattern
+    for sentence in text.split('.'):
+        sentence = sentence.strip()
+        if len(sentence) < 15:
+            continue
+        if not skip_pattern.search(sentence.lower()):
+            kept += 1
+    return kept
+
+
+def best_of(func, args, repeat: int) -> float:
+    """Best per-call time in milliseconds"""
+    return min(timeit.repeat(lambda: func(*args), number=1, repeat=repeat)) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--links', type=int, default=500, help='Links (and sentences) on the generated page')
+    parser.add_argument('--repeat', type=int, default=100, help='Timed runs per case, the best is reported')
+    args = parser.parse_args()
+
+    link_texts, text = make_page(args.links)
+    assert legacy_cta(link_texts, text) == table_cta(link_texts, text)
+    assert legacy_skip(text) == table_skip(text)
+
+    results = {}
+    for name, legacy, table, call_args in [
+        ('ctaLinks', legacy_cta, table_cta, (link_texts, '')),
+        ('ctaText', legacy_cta, table_cta, ([], text)),
+        ('cleanBodySample', legacy_skip, table_skip, (text,)),
+    ]:
+        legacy_ms = best_of(legacy, call_args, args.repeat)
+        table_ms = best_of(table, call_args, args.repeat)
+        results[name] = {
+            "legacyMs": round(legacy_ms, 3),
+            "ruleTableMs": round(table_ms, 3),
+            "speedup": round(legacy_ms / table_ms, 2) if table_ms else None
+        }
+
+    print(json.dumps({"links": args.links, "results": results}, indent=2))
+
+
+if __name__ == '__main__':
+    main()
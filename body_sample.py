@@ -0,0 +1,144 @@
+from typing import Dict, Iterator, Pattern
+from rules import WHITESPACE_PATTERN
+
+# Sentences shorter than this are navigation or metadata
+MIN_SENTENCE_LENGTH = 15
+
+# A truncated sample ends at a sentence end found past this share of its
+# length, otherwise at the last word that fits
+SENTENCE_BREAK_RATIO = 0.7
+
+
+class BodySampler:
+    """Clean body samples that only read as much text as they return
+
+    The text is split on '.' lazily, so whitespace normalization and the
+    skip rules only run on the sentences before the sample is full, and a
+    50k-word page costs about as much as a 500-word one. Splitting before
+    normalizing gives the same sentences as normalizing first, because '.'
+    is not whitespace. The sample itself is the accepted sentences joined
+    with '. ', truncated at a sentence end or word boundary.
+    """
+
+    def __init__(self, skip_pattern: Pattern, max_length: int = 500):
+        """
+        Args:
+            skip_pattern: Matches lowercased sentences left out of samples
+            max_length: Maximum sample length in characters (plus "...")
+        """
+        if max_length < 1:
+            raise ValueError("max_length must be positive")
+        self.skip_pattern = skip_pattern
+        self.max_length = max_length
+
+    def intro(self, text: str) -> str:
+        """Sample from the start of the text"""
+        return self._sample_from(text, 0)
+
+    def middle(self, text: str) -> str:
+        """Sample from the sentence that contains the middle of the text"""
+        return self._sample_from(text, text.rfind('.', 0, len(text) // 2) + 1)
+
+    def end(self, text: str) -> str:
+        """The last accepted sentences that fit in the sample, in text order"""
+        accepted = []
+        # Length of '. '.join(accepted) + '.'
+        length = -1
+        for sentence in self._accepted(self._sentences_backward(text)):
+            if accepted and length + len(sentence) + 2 > self.max_length:
+                break
+            accepted.append(sentence)
+            length += len(sentence) + 2
+            if length >= self.max_length:
+                break
+
+        if accepted:
+            accepted.reverse()
+            return self._truncate('. '.join(accepted) + '.')
+
+        # Nothing passed the filters: keep the words at the end of the text
+        text = WHITESPACE_PATTERN.sub(' ', text).strip()
+        if len(text) <= self.max_length:
+            return text
+        tail = text[-self.max_length:]
+        first_space = tail.find(' ')
+        return "..." + (tail[first_space + 1:] if first_space >= 0 else tail)
+
+    def samples(self, text: str, intro: str = None) -> Dict[str, str]:
+        """Intro, middle and end samples (intro can be passed in when already sampled)"""
+        return {
+            'intro': self.intro(text) if intro is None else intro,
+            'middle': self.middle(text),
+            'end': self.end(text)
+        }
+
+    def _sample_from(self, text: str, start: int) -> str:
+        accepted = []
+        # Length of '. '.join(accepted) + '.'
+        length = -1
+        for sentence in self._accepted(self._sentences_forward(text, start)):
+            accepted.append(sentence)
+            length += len(sentence) + 2
+            # Later sentences only extend the part truncation cuts off
+            if length > self.max_length:
+                break
+
+        if accepted:
+            return self._truncate('. '.join(accepted) + '.')
+
+        # Nothing passed the filters: sample the text as it is
+        return self._truncate(WHITESPACE_PATTERN.sub(' ', text[start:]).strip())
+
+    def _accepted(self, sentences: Iterator[str]) -> Iterator[str]:
+        """Whitespace-normalized sentences that pass the length and skip rules"""
+        skip_pattern = self.skip_pattern
+        for sentence in sentences:
+            # Normalizing never makes a sentence longer
+            if len(sentence) < MIN_SENTENCE_LENGTH:
+                continue
+            sentence = WHITESPACE_PATTERN.sub(' ', sentence).strip()
+            if len(sentence) < MIN_SENTENCE_LENGTH:
+                continue
+            if not skip_pattern.search(sentence.lower()):
+                yield sentence
+
+    @staticmethod
+    def _sentences_forward(text: str, start: int) -> Iterator[str]:
+        while True:
+            end = text.find('.', start)
+            if end < 0:
+                yield text[start:]
+                return
+            yield text[start:end]
+            start = end + 1
+
+    @staticmethod
+    def _sentences_backward(text: str) -> Iterator[str]:
+        end = len(text)
+        while True:
+            start = text.rfind('.', 0, end)
+            if start < 0:
+                yield text[:end]
+                return
+            yield text[start + 1:end]
+            end = start
+
+    def _truncate(self, text: str) -> str:
+        """Cut a sample over max_length at a sentence end or word boundary"""
+        max_length = self.max_length
+        if len(text) <= max_length:
+            return text
+
+        truncated = text[:max_length]
+
+        # Try to break at sentence end
+        best_break = max(truncated.rfind('.'), truncated.rfind('!'), truncated.rfind('?'))
+        if best_break > max_length * SENTENCE_BREAK_RATIO:
+            return truncated[:best_break + 1].strip()
+
+        # Otherwise, break at last space and add ellipsis
+        last_space = truncated.rfind(' ')
+        if last_space > 0:
+            return truncated[:last_space].strip() + "..."
+
+        return truncated + "..."
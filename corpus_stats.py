@@ -0,0 +1,195 @@
+import io
+import numpy as np
+from typing import Dict, List, Any, Sequence
+
+# Paragraph length bins in words, as in paragraphStyle:
+# short < 20 <= medium < 50 <= long
+PARAGRAPH_BINS = (20, 50)
+
+DEFAULT_PERCENTILES = (50, 90, 99)
+
+
+class CorpusStatistics:
+    """Keyword and readability statistics of many pages, held as NumPy arrays
+
+    Keyword counts are a sparse pages x keywords matrix in CSR form
+    (count_indptr, count_indices, count_data), since most pages contain few
+    of the requested keywords. The paragraph lengths of all pages are one
+    flat array split by paragraph_indptr. Every statistic is computed with
+    array operations over the whole corpus instead of per-page dict loops.
+    """
+
+    def __init__(self, keywords: List[str], urls: List[str], item_indices: np.ndarray, word_counts: np.ndarray,
+                 count_indptr: np.ndarray, count_indices: np.ndarray, count_data: np.ndarray, paragraph_indptr: np.ndarray,
+                 paragraph_lengths: np.ndarray, errors: List[Dict[str, Any]] = None):
+        self.keywords = list(keywords)
+        self.urls = list(urls)
+        # Position of each page (row) in the input, since failed items have no row
+        self.item_indices = item_indices
+        self.word_counts = word_counts
+        self.count_indptr = count_indptr
+        self.count_indices = count_indices
+        self.count_data = count_data
+        self.paragraph_indptr = paragraph_indptr
+        self.paragraph_lengths = paragraph_lengths
+        # Items that could not be analyzed: index (into the input), url and error
+        self.errors = errors or []
+
+    @classmethod
+    def from_measurements(cls, keywords: List[str], measurements: Sequence[Dict[str, Any]]) -> 'CorpusStatistics':
+        """Build the arrays from BatchAnalyzer.measure_many results"""
+        urls = []
+        item_indices = []
+        word_counts = []
+        count_indptr = [0]
+        count_indices = []
+        count_data = []
+        paragraph_indptr = [0]
+        paragraph_lengths = []
+        errors = []
+
+        for index, measurement in enumerate(measurements):
+            if "error" in measurement:
+                errors.append({"index": index, "url": measurement.get("url", ""), "error": measurement["error"]})
+                continue
+
+            urls.append(measurement["url"])
+            item_indices.append(index)
+            word_counts.append(measurement["wordCount"])
+            for column, count in enumerate(measurement["keywordCounts"]):
+                if count:
+                    count_indices.append(column)
+                    count_data.append(count)
+            count_indptr.append(len(count_indices))
+            paragraph_lengths.extend(measurement["paragraphLengths"])
+            paragraph_indptr.append(len(paragraph_lengths))
+
+        return cls(
+            keywords=keywords,
+            urls=urls,
+            item_indices=np.array(item_indices, dtype=np.int64),
+            word_counts=np.array(word_counts, dtype=np.int64),
+            count_indptr=np.array(count_indptr, dtype=np.int64),
+            count_indices=np.array(count_indices, dtype=np.int32),
+            count_data=np.array(count_data, dtype=np.int64),
+            paragraph_indptr=np.array(paragraph_indptr, dtype=np.int64),
+            paragraph_lengths=np.array(paragraph_lengths, dtype=np.int64),
+            errors=errors
+        )
+
+    @property
+    def page_count(self) -> int:
+        return len(self.urls)
+
+    def count_matrix(self) -> np.ndarray:
+        """Dense pages x keywords count matrix"""
+        matrix = np.zeros((self.page_count, len(self.keywords)), dtype=np.int64)
+        rows = np.repeat(np.arange(self.page_count), np.diff(self.count_indptr))
+        matrix[rows, self.count_indices] = self.count_data
+        return matrix
+
+    def density(self) -> np.ndarray:
+        """Keyword occurrences per 100 words, pages x keywords (0 for empty pages)"""
+        words = self.word_counts.astype(np.float64)[:, None]
+        return np.divide(self.count_matrix() * 100.0, words, out=np.zeros((self.page_count, len(self.keywords))), where=words > 0)
+
+    def document_frequency(self) -> np.ndarray:
+        """Number of pages containing each keyword"""
+        return np.bincount(self.count_indices, minlength=len(self.keywords))
+
+    def tf_idf(self) -> np.ndarray:
+        """TF-IDF of each keyword on each page, pages x keywords
+
+        Term frequency is relative to the page's word count; the inverse
+        document frequency is smoothed, log((1 + pages) / (1 + df)) + 1, so
+        keywords found on every page still count.
+        """
+        idf = np.log((1.0 + self.page_count) / (1.0 + self.document_frequency())) + 1.0
+        return self.density() / 100.0 * idf
+
+    def paragraph_counts(self) -> np.ndarray:
+        """Number of non-empty paragraphs per page"""
+        return np.diff(self.paragraph_indptr)
+
+    def average_paragraph_length(self) -> np.ndarray:
+        """Mean words per paragraph on each page (0 without paragraphs)"""
+        counts = self.paragraph_counts()
+        pages = np.repeat(np.arange(self.page_count), counts)
+        totals = np.bincount(pages, weights=self.paragraph_lengths, minlength=self.page_count)
+        return np.divide(totals, counts, out=np.zeros(self.page_count), where=counts > 0)
+
+    def paragraph_histograms(self, bins: Sequence[int] = PARAGRAPH_BINS) -> np.ndarray:
+        """Paragraphs per length bin on each page, pages x (len(bins) + 1)
+
+        With the default bins the columns are the short, medium and long
+        paragraph counts of paragraphStyle.
+        """
+        columns = len(bins) + 1
+        pages = np.repeat(np.arange(self.page_count), self.paragraph_counts())
+        slots = pages * columns + np.searchsorted(np.asarray(bins), self.paragraph_lengths, side='right')
+        return np.bincount(slots, minlength=self.page_count * columns).reshape(self.page_count, columns)
+
+    def percentiles(self, q: Sequence[float] = DEFAULT_PERCENTILES) -> Dict[str, Any]:
+        """Cross-page percentiles of word count, paragraph length and keyword density"""
+        if not self.page_count:
+            return {}
+        q = list(q)
+        density = np.percentile(self.density(), q, axis=0)
+        return {
+            "q": q,
+            "wordCount": np.percentile(self.word_counts, q).tolist(),
+            "avgParagraphLength": np.percentile(self.average_paragraph_length(), q).tolist(),
+            "density": {keyword: density[:, column].tolist() for column, keyword in enumerate(self.keywords)}
+        }
+
+    def to_columns(self) -> Dict[str, Any]:
+        """Columnar JSON: one array per statistic instead of one object per page
+
+        Only sparse keyword statistics are included, since dense pages x
+        keywords arrays grow with both. Clients derive density (count * 100
+        / wordCount) and TF-IDF (count / wordCount * (log((1 + pageCount) /
+        (1 + documentFrequency)) + 1)) from the counts; to_npz has both as
+        arrays.
+        """
+        return {
+            "keywords": self.keywords,
+            "urls": self.urls,
+            "index": self.item_indices.tolist(),
+            "pageCount": self.page_count,
+            "wordCount": self.word_counts.tolist(),
+            "keywordCounts": {
+                "indptr": self.count_indptr.tolist(),
+                "indices": self.count_indices.tolist(),
+                "data": self.count_data.tolist()
+            },
+            "documentFrequency": self.document_frequency().tolist(),
+            "paragraphCount": self.paragraph_counts().tolist(),
+            "avgParagraphLength": np.round(self.average_paragraph_length(), 1).tolist(),
+            "paragraphHistogram": self.paragraph_histograms().tolist(),
+            "percentiles": self.percentiles(),
+            "errors": self.errors
+        }
+
+    def to_npz(self) -> bytes:
+        """Compressed NumPy archive of the raw and derived arrays
+
+        Loads with np.load(..., allow_pickle=False); urls and keywords are
+        stored as unicode arrays.
+        """
+        buffer = io.BytesIO()
+        np.savez_compressed(
+            buffer,
+            keywords=np.array(self.keywords, dtype=str),
+            urls=np.array(self.urls, dtype=str),
+            item_indices=self.item_indices,
+            word_counts=self.word_counts,
+            count_indptr=self.count_indptr,
+            count_indices=self.count_indices,
+            count_data=self.count_data,
+            paragraph_indptr=self.paragraph_indptr,
+            paragraph_lengths=self.paragraph_lengths,
+            density=self.density(),
+            tf_idf=self.tf_idf(),
+            paragraph_histogram=self.paragraph_histograms()
+        )
+        return buffer.getvalue()
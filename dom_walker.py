@@ -0,0 +1,284 @@
+from bs4 import BeautifulSoup, NavigableString, CData, Tag
+from typing import List, Any, Optional, Tuple
+from rules import RuleTable, DEFAULT_RULES
+from page_scan import PageScan, HEADING_LEVELS
+
+# String types returned by Tag.get_text() on ordinary tags
+TEXT_STRING_TYPES = (NavigableString, CData)
+
+_EXIT = object()
+
+
+class _WalkState:
+    """Mutable bookkeeping for one DOMWalker.walk call"""
+
+    def __init__(self):
+        self.scan = PageScan()
+        # Text of every string that survives boilerplate removal, in document order
+        self.strings: List[str] = []
+        # [start, end) ranges into strings, filled in when an element is left
+        self.headings: List[Tuple[int, List[int]]] = []
+        self.links: List[Tuple[str, List[int]]] = []
+        self.paragraphs: List[List[int]] = []
+        self.main: Optional[List[int]] = None
+        self.article: Optional[List[int]] = None
+        self.content_class: Optional[List[int]] = None
+        self.content_id: Optional[List[int]] = None
+        # Content containers that are string containers (e.g. <template>),
+        # whose get_text() yields their own string type instead
+        self.string_containers: List[Tuple[List[int], Tag]] = []
+
+
+class DOMWalker:
+    """Visitor-based engine that gathers every analyzer input in one tree traversal
+
+    Boilerplate (scripts, navigation, hidden and ad-like elements inside the
+    body) is never removed from the tree. Instead the walker marks those
+    subtrees as excluded while it descends, which yields the same text, headings,
+    media, CTA and paragraph data as decomposing them first, without mutating
+    the soup.
+    """
+
+    def __init__(self, rules: RuleTable = None):
+        self.rules = rules or DEFAULT_RULES
+        self.media_tags = frozenset(self.rules.media_tags)
+
+        # Visitors for elements that survive boilerplate removal
+        self._visitors = {
+            'form': self._visit_form,
+            'button': self._visit_button,
+            'input': self._visit_input,
+            'a': self._visit_link,
+        }
+        for name in HEADING_LEVELS:
+            self._visitors[name] = self._visit_heading
+
+        # Visitors for surviving elements inside the body
+        self._body_visitors = {
+            'p': self._visit_paragraph,
+            'ul': self._visit_list,
+            'ol': self._visit_list,
+            'li': self._visit_list_item,
+            'main': self._visit_main,
+            'article': self._visit_article,
+        }
+
+    def scan(self, html_content: str) -> PageScan:
+        """Parse HTML with BeautifulSoup and walk it once"""
+        return self.walk(BeautifulSoup(html_content, 'lxml'))
+
+    def walk(self, soup: BeautifulSoup) -> PageScan:
+        """Traverse the document once and return the collected observations"""
+        state = _WalkState()
+        scan = state.scan
+        strings = state.strings
+
+        # Boilerplate removal applies to descendants of <body>, or to the
+        # whole document when there is no body
+        body = soup.find('body')
+        body_range = [0, 0]
+
+        # Stack entries are (node, removed, in_body); exit markers carry the
+        # string ranges to close in place of the removed flag
+        stack: List[Tuple[Any, Any, bool]] = [(child, False, body is None) for child in reversed(soup.contents)]
+        while stack:
+            node, removed, in_body = stack.pop()
+
+            if node is _EXIT:
+                end = len(strings)
+                for rng in removed:
+                    rng[1] = end
+                continue
+
+            if not isinstance(node, Tag):
+                if not removed and type(node) in TEXT_STRING_TYPES:
+                    strings.append(node)
+                continue
+
+            self._visit_unfiltered(node, scan)
+
+            if not removed and in_body and self._is_boilerplate(node):
+                removed = True
+
+            ranges: List[List[int]] = []
+            if not removed:
+                visitor = self._visitors.get(node.name)
+                if visitor is not None:
+                    visitor(node, state, ranges)
+                if in_body:
+                    visitor = self._body_visitors.get(node.name)
+                    if visitor is not None:
+                        visitor(node, state, ranges)
+                    self._visit_content_container(node, state, ranges)
+                if not scan.has_media:
+                    scan.has_media = self._is_media(node)
+
+            if node is body:
+                ranges.append(body_range)
+                in_body = True
+
+            if ranges:
+                start = len(strings)
+                for rng in ranges:
+                    rng[0] = start
+                stack.append((_EXIT, ranges, False))
+            for child in reversed(node.contents):
+                stack.append((child, removed, in_body))
+
+        self._resolve(state, body_range if body is not None else [0, len(strings)])
+        return scan
+
+    def _visit_unfiltered(self, tag: Tag, scan: PageScan):
+        """Record observations taken before boilerplate removal"""
+        name = tag.name
+        if name == 'title':
+            if scan.title_text is None:
+                scan.title_text = tag.get_text()
+        elif name == 'h1':
+            if scan.h1_text is None:
+                scan.h1_text = tag.get_text()
+        elif name == 'article' or name == 'time':
+            scan.has_article_markup = True
+        elif name == 'form':
+            scan.has_form_markup = True
+
+        if not scan.has_article_markup:
+            classes = self._classes(tag)
+            if classes and self.rules.article_class_pattern.search(classes):
+                scan.has_article_markup = True
+
+    def _is_boilerplate(self, tag: Tag) -> bool:
+        """Check whether an element would be stripped as non-content"""
+        if tag.name in self.rules.boilerplate_tags:
+            return True
+
+        style = tag.get('style')
+        if style and self.rules.hidden_style_pattern.search(style):
+            return True
+
+        classes = self._classes(tag)
+        if classes and self.rules.boilerplate_pattern.search(classes):
+            return True
+
+        element_id = tag.get('id')
+        if element_id and self.rules.boilerplate_pattern.search(element_id):
+            return True
+
+        return False
+
+    def _is_media(self, tag: Tag) -> bool:
+        """Check whether an element is a media tag or media container"""
+        if tag.name in self.media_tags:
+            return True
+
+        classes = self._classes(tag)
+        return bool(classes and self.rules.media_class_pattern.search(classes))
+
+    def _visit_heading(self, tag: Tag, state: _WalkState, ranges: List[List[int]]):
+        rng = [0, 0]
+        state.headings.append((HEADING_LEVELS[tag.name], rng))
+        ranges.append(rng)
+
+    def _visit_form(self, tag: Tag, state: _WalkState, ranges: List[List[int]]):
+        state.scan.has_form = True
+
+    def _visit_button(self, tag: Tag, state: _WalkState, ranges: List[List[int]]):
+        state.scan.has_button = True
+
+    def _visit_input(self, tag: Tag, state: _WalkState, ranges: List[List[int]]):
+        if tag.get('type') in ['submit', 'button']:
+            state.scan.has_button = True
+
+    def _visit_link(self, tag: Tag, state: _WalkState, ranges: List[List[int]]):
+        rng = [0, 0]
+        state.links.append((tag.get('href', ''), rng))
+        ranges.append(rng)
+
+    def _visit_paragraph(self, tag: Tag, state: _WalkState, ranges: List[List[int]]):
+        rng = [0, 0]
+        state.paragraphs.append(rng)
+        ranges.append(rng)
+
+    def _visit_list(self, tag: Tag, state: _WalkState, ranges: List[List[int]]):
+        state.scan.list_count += 1
+
+    def _visit_list_item(self, tag: Tag, state: _WalkState, ranges: List[List[int]]):
+        state.scan.list_item_count += 1
+
+    def _visit_main(self, tag: Tag, state: _WalkState, ranges: List[List[int]]):
+        if state.main is None:
+            state.main = [0, 0]
+            ranges.append(state.main)
+
+    def _visit_article(self, tag: Tag, state: _WalkState, ranges: List[List[int]]):
+        if state.article is None:
+            state.article = [0, 0]
+            ranges.append(state.article)
+
+    def _visit_content_container(self, tag: Tag, state: _WalkState, ranges: List[List[int]]):
+        """Remember the first elements whose class or id names a content container"""
+        if state.content_class is None:
+            classes = self._classes(tag)
+            if classes and self.rules.content_container_pattern.search(classes):
+                state.content_class = [0, 0]
+                ranges.append(state.content_class)
+                self._visit_string_container(tag, state, state.content_class)
+        if state.content_id is None:
+            element_id = tag.get('id')
+            if element_id and self.rules.content_container_pattern.search(element_id):
+                state.content_id = [0, 0]
+                ranges.append(state.content_id)
+                self._visit_string_container(tag, state, state.content_id)
+
+    @staticmethod
+    def _visit_string_container(tag: Tag, state: _WalkState, rng: List[int]):
+        if NavigableString not in tag.interesting_string_types:
+            state.string_containers.append((rng, tag))
+
+    def _resolve(self, state: _WalkState, body_range: List[int]):
+        """Turn the recorded string ranges into text on the scan"""
+        scan = state.scan
+        strings = state.strings
+
+        def joined(rng: List[int]) -> str:
+            return ''.join(strings[rng[0]:rng[1]])
+
+        # Main content falls back from <main> to <article> to content containers to the body
+        main = state.main or state.article or state.content_class or state.content_id or body_range
+        main_strings = strings[main[0]:main[1]]
+        for rng, tag in state.string_containers:
+            if rng is main:
+                main_strings = self._container_strings(tag)
+        scan.main_text = ' '.join(s for s in (string.strip() for string in main_strings) if s)
+
+        scan.headings = [(level, joined(rng)) for level, rng in state.headings]
+        scan.links = [(joined(rng), href) for href, rng in state.links]
+        scan.paragraphs = [joined(rng) for rng in state.paragraphs]
+
+    def _container_strings(self, tag: Tag) -> List[str]:
+        """Strings Tag.get_text() yields on a string container, outside boilerplate
+
+        Those are the strings of the tag's own type (e.g. TemplateString),
+        which the walk leaves out of the document text.
+        """
+        types = tag.interesting_string_types
+        strings = []
+        stack = list(reversed(tag.contents))
+        while stack:
+            node = stack.pop()
+            if isinstance(node, Tag):
+                if not self._is_boilerplate(node):
+                    stack.extend(reversed(node.contents))
+            elif type(node) in types:
+                strings.append(node)
+        return strings
+
+    @staticmethod
+    def _classes(tag: Tag) -> str:
+        """Return the class attribute as a single space-separated string"""
+        classes = tag.get('class')
+        if not classes:
+            return ''
+        if isinstance(classes, str):
+            return classes
+        return ' '.join(classes)
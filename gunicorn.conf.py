@@ -0,0 +1,65 @@
+# Production serving profile:
+#   gunicorn --config gunicorn.conf.py app:app
+# or, for async callers, the ASGI adapter (the `asgi` extra):
+#   gunicorn --config gunicorn.conf.py --worker-class uvicorn_worker.UvicornWorker asgi:app
+import os
+import logging
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '5000')}"
+workers = int(os.environ.get("WEB_CONCURRENCY", 0)) or os.cpu_count() or 1
+
+# Each worker analyzes at most this many requests at once; further
+# connections wait in the listen backlog instead of competing for the CPU.
+# The app's admission queue defaults to half of these threads, so requests
+# arriving while it is full still find a thread and get 429.
+worker_class = "gthread"
+threads = int(os.environ.get("ANALYZER_WORKER_THREADS", 4))
+backlog = int(os.environ.get("GUNICORN_BACKLOG", 2048))
+timeout = int(os.environ.get("GUNICORN_TIMEOUT", 120))
+keepalive = 5
+
+# Import the app, parsers and rule tables once in the master so that
+# workers share those pages copy-on-write instead of loading their own
+preload_app = True
+
+# A worker whose resident memory is above this many MB after a request
+# finishes its in-flight requests and exits, and the master starts a fresh
+# one (0 disables). Per-worker concurrency is bounded separately by the
+# app's byte budget (ANALYZER_MAX_INFLIGHT_BYTES).
+MAX_WORKER_RSS_MB = int(os.environ.get("ANALYZER_MAX_WORKER_RSS_MB", 1024))
+
+loglevel = os.environ.get("LOG_LEVEL", "info").lower()
+accesslog = os.environ.get("GUNICORN_ACCESS_LOG") or None
+
+
+def when_ready(server):
+    """Warm the preloaded app in the master, then freeze it for forking"""
+    if not server.cfg.preload_app:
+        return
+
+    import app
+    from warmup import warm_up, freeze_for_fork
+
+    server.log.info(f"Warmed up analyzer in master: {warm_up(app.seo_analyzer)}")
+    freeze_for_fork()
+
+
+def post_worker_init(worker):
+    """Run one dummy analysis per worker before it accepts requests"""
+    import app
+    from warmup import warm_up
+
+    logging.getLogger(__name__).info(f"Warmed up analyzer in worker {worker.pid}: {warm_up(app.seo_analyzer)}")
+
+
+def post_request(worker, req, environ, resp):
+    """Recycle the worker once its memory passes ANALYZER_MAX_WORKER_RSS_MB"""
+    if not MAX_WORKER_RSS_MB or not worker.alive:
+        return
+
+    from admission import resident_memory_bytes
+
+    rss = resident_memory_bytes()
+    if rss > MAX_WORKER_RSS_MB * 1024 * 1024:
+        worker.log.warning(f"Worker {worker.pid} uses {rss // (1024 * 1024)} MB, recycling it")
+        worker.alive = False
@@ -0,0 +1,249 @@
+import os
+import re
+import json
+import zlib
+import sqlite3
+import hashlib
+import logging
+import threading
+from collections import Counter
+from typing import Dict, List, Any, Optional, Tuple
+from seo_analyzer import SEOAnalyzer
+from keyword_index import compile_keyword_index
+from page_scan import PageScan
+from pipeline import Pipeline, Stage
+from rules import WHITESPACE_PATTERN
+from text_model import TextModel
+from result_cache import ResultCache
+
+# Candidate block boundaries in the main text: the whitespace after a full stop
+BLOCK_BOUNDARY_PATTERN = re.compile(r'\.\s+(?=\S)')
+
+# A candidate becomes a boundary when the hash of the text before it has
+# these low bits clear (about one in 16 sentence ends)
+BOUNDARY_MASK = 0xF
+
+# Characters hashed to decide a boundary, and the smallest block cut
+BOUNDARY_WINDOW = 32
+MIN_BLOCK_LENGTH = 512
+
+# Layout of stored block records; records of another layout are not reused
+RECORD_FORMAT = 2
+
+# A block of the main text: fingerprint, record (normalized text, word
+# count and, once counted, keyword counts) and whether it was reused
+TextBlock = Tuple[str, Dict[str, Any], bool]
+
+
+def split_blocks(text: str) -> List[str]:
+    """Split the main text of a page into content-defined blocks
+
+    Boundaries are picked from the text around them rather than from
+    offsets, so an edit only changes the blocks it touches and every other
+    block keeps its fingerprint. Blocks end after a full stop and the whole
+    whitespace run that follows it, so whitespace normalization, word
+    counts and keyword counts are additive across blocks (see
+    IncrementalAnalyzer).
+    """
+    blocks = []
+    start = 0
+    for match in BLOCK_BOUNDARY_PATTERN.finditer(text):
+        end = match.end()
+        if end - start < MIN_BLOCK_LENGTH:
+            continue
+        window = text[end - BOUNDARY_WINDOW:end].encode('utf-8', 'surrogatepass')
+        if zlib.crc32(window) & BOUNDARY_MASK == 0:
+            blocks.append(text[start:end])
+            start = end
+    blocks.append(text[start:])
+    return blocks
+
+
+def fingerprint(block: str) -> str:
+    return hashlib.blake2b(block.encode('utf-8', 'surrogatepass'), digest_size=12).hexdigest()
+
+
+class BlockStore:
+    """sqlite store of the last analysis of each URL
+
+    Each record holds the request key of the stored result and, keyed by
+    block fingerprint, the normalized text, word count and keyword counts
+    of every main text block.
+    """
+
+    def __init__(self, path: str):
+        """
+        Args:
+            path: sqlite file, can be shared by worker processes on one host
+        """
+        self.logger = logging.getLogger(__name__)
+        self.path = path
+        self._lock = threading.Lock()
+        self._connection: Optional[sqlite3.Connection] = None
+        self._connection_pid: Optional[int] = None
+
+    def get(self, url: str) -> Optional[Dict[str, Any]]:
+        """Return the stored record for url, or None"""
+        with self._lock:
+            try:
+                row = self._get_connection().execute("SELECT value FROM pages WHERE url = ?", (url,)).fetchone()
+            except sqlite3.Error as e:
+                self.logger.warning(f"Block store read failed: {str(e)}")
+                return None
+        return json.loads(row[0]) if row else None
+
+    def put(self, url: str, record: Dict[str, Any]):
+        """Replace the stored record for url"""
+        value = json.dumps(record)
+        with self._lock:
+            try:
+                connection = self._get_connection()
+                with connection:
+                    connection.execute("INSERT OR REPLACE INTO pages (url, value) VALUES (?, ?)", (url, value))
+            except sqlite3.Error as e:
+                self.logger.warning(f"Block store write failed: {str(e)}")
+
+    def _get_connection(self) -> sqlite3.Connection:
+        """Open the database lazily, once per process"""
+        # Connections must not cross a fork
+        if self._connection is None or self._connection_pid != os.getpid():
+            connection = sqlite3.connect(self.path, timeout=5, check_same_thread=False)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            connection.execute("CREATE TABLE IF NOT EXISTS pages (url TEXT PRIMARY KEY, value TEXT NOT NULL)")
+            self._connection = connection
+            self._connection_pid = os.getpid()
+        return self._connection
+
+
+class IncrementalAnalyzer:
+    """Re-analyzes URLs reusing the stored results of their previous analysis
+
+    - When the HTML, URL and keywords are unchanged, the stored result is
+      returned after hashing the request, without parsing.
+    - Otherwise the page is parsed again (the scan, title, headings, media,
+      CTA and paragraph statistics are recomputed) and its main text split
+      into content-defined blocks. Blocks whose fingerprint was stored last
+      time reuse their normalized text and word count, and their keyword
+      counts when the keywords are the same; only new blocks are
+      normalized and counted. The clean text, word count and keyword
+      counts are then summed from the blocks.
+
+    Reused counts are exact: blocks end after a full stop and whitespace,
+    and no keyword match can cross such a boundary unless the keyword
+    itself contains ". ", in which case the whole text is counted again
+    (as it is when size limits cut the text short).
+    """
+
+    def __init__(self, analyzer: SEOAnalyzer, store: BlockStore):
+        self.analyzer = analyzer
+        self.store = store
+
+        # The analyzer's document stages, with the clean text and word count
+        # summed from the blocks
+        stages = [Stage('text_blocks', self._text_blocks, ('scan', 'previous_blocks'), 'text_blocks')]
+        for stage in analyzer.document_pipeline.stages:
+            if stage.name == '_extract_clean_text':
+                stage = Stage(stage.name, self._join_blocks, ('text_blocks',), stage.output)
+            elif stage.name == '_count_words' and analyzer.limits is None:
+                stage = Stage(stage.name, self._sum_words, ('text_blocks',), stage.output)
+            stages.append(stage)
+        self.document_pipeline = Pipeline(stages)
+
+    def analyze(self, html_content: str, url: str = '', primary_keyword: str = '', related_keywords: List[str] = None) -> Dict[str, Any]:
+        """
+        Analyze a page, reusing work from the last analysis of the same url
+
+        Returns:
+            The same result as SEOAnalyzer.analyze, plus an `incremental`
+            summary of what was reused
+        """
+        if related_keywords is None:
+            related_keywords = []
+        keywords = (primary_keyword, *related_keywords)
+
+        request_key = ResultCache.make_key(html_content, url, primary_keyword, related_keywords, self.analyzer.cache_version)
+        previous = self.store.get(url) if url else None
+        if previous is not None and previous.get("format") != RECORD_FORMAT:
+            previous = None
+
+        # Same page, same keywords: nothing to recompute
+        if previous is not None and request_key is not None and previous["requestKey"] == request_key:
+            result = previous["result"]
+            result["relatedKWfreq"] = {keyword: result["relatedKWfreq"][keyword] for keyword in related_keywords if keyword}
+            result["incremental"] = {"unchanged": True, "blocks": previous["blockCount"], "reusedBlocks": previous["blockCount"]}
+            return result
+
+        keyword_index = compile_keyword_index(keywords)
+        keyword_key = sorted(keyword_index.keys)
+
+        # Blocks are only comparable for the same analyzer, and their counts
+        # for the same keywords
+        previous_blocks = {}
+        same_keywords = False
+        if previous is not None and previous["version"] == self.analyzer.cache_version:
+            previous_blocks = previous["blocks"]
+            same_keywords = previous["keywords"] == keyword_key
+
+        document, values = self.analyzer.parse_values(html_content, pipeline=self.document_pipeline,
+                                                      inputs={'previous_blocks': previous_blocks})
+        text_blocks = values['text_blocks']
+
+        blocks = {}
+        text_model = None
+        if any('. ' in key for key in keyword_key) or "maxTextLength" in (document.truncated or ()):
+            text_model = TextModel(document.title, document.headings, document.clean_text)
+            keyword_counts = keyword_index.count_lowered(text_model.body)
+            for digest, record, _ in text_blocks:
+                blocks[digest] = {"text": record["text"], "words": record["words"]}
+            counted_keywords = None
+        else:
+            totals = Counter()
+            for digest, record, reused in text_blocks:
+                counts = record.get("counts") if reused and same_keywords else None
+                if counts is None:
+                    counts = {key: count for key, count in keyword_index.count(record["text"]).items() if count}
+                blocks[digest] = {"text": record["text"], "words": record["words"], "counts": counts}
+                totals.update(counts)
+            keyword_counts = {key: totals[key] for key in keyword_index.keys}
+            counted_keywords = keyword_key
+
+        result = self.analyzer.analyze_document(document, url, primary_keyword, related_keywords, keyword_counts=keyword_counts,
+                                                text_model=text_model)
+
+        if url and request_key is not None:
+            self.store.put(url, {
+                "format": RECORD_FORMAT,
+                "version": self.analyzer.cache_version,
+                "requestKey": request_key,
+                "keywords": counted_keywords,
+                "blockCount": len(text_blocks),
+                "blocks": blocks,
+                "result": result
+            })
+
+        result = dict(result)
+        reused = sum(1 for _, _, block_reused in text_blocks if block_reused)
+        result["incremental"] = {"unchanged": False, "blocks": len(text_blocks), "reusedBlocks": reused}
+        return result
+
+    def _text_blocks(self, scan: PageScan, previous_blocks: Dict[str, Dict[str, Any]]) -> List[TextBlock]:
+        """Split the main text into blocks, normalizing only the new ones"""
+        text_blocks = []
+        for block in split_blocks(scan.main_text):
+            digest = fingerprint(block)
+            record = previous_blocks.get(digest)
+            if record is None:
+                text = WHITESPACE_PATTERN.sub(' ', block)
+                text_blocks.append((digest, {"text": text, "words": len(text.split())}, False))
+            else:
+                text_blocks.append((digest, record, True))
+        return text_blocks
+
+    def _join_blocks(self, text_blocks: List[TextBlock]) -> str:
+        """The clean text (as SEOAnalyzer._extract_clean_text) from the blocks"""
+        return ''.join(record["text"] for _, record, _ in text_blocks).strip()
+
+    def _sum_words(self, text_blocks: List[TextBlock]) -> int:
+        """The word count (as SEOAnalyzer._count_words) from the blocks"""
+        return sum(record["words"] for _, record, _ in text_blocks)
@@ -0,0 +1,151 @@
+import re
+import json
+import hashlib
+from typing import List, Tuple
+
+# Script and style elements whose contents are dropped before parsing
+RAW_TEXT_START_PATTERN = re.compile(r'<(script|style)\b[^>]*>', re.I)
+RAW_TEXT_END_PATTERNS = {
+    'script': re.compile(r'</script\s*>', re.I),
+    'style': re.compile(r'</style\s*>', re.I),
+}
+
+# Long data: URIs (inlined images, fonts) in attribute values and url()
+DATA_URI_PATTERN = re.compile(r'(?<=["\'(=])data:[^"\'\s>)]{256,}')
+
+# Start of an element, a script/style element (whose contents are skipped)
+# or a comment; counting the start tags approximates the parsed node count
+START_TAG_PATTERN = re.compile(r'<!--|<(script|style)\b[^>]*>|<[A-Za-z]', re.I)
+COMMENT_END_PATTERN = re.compile(r'-->')
+
+
+class DocumentTooLarge(ValueError):
+    """Raised when a document exceeds a limit and bounded mode is off"""
+
+
+class AnalysisLimits:
+    """Size limits applied to documents before and after parsing
+
+    In strict mode a document over any limit is rejected with
+    DocumentTooLarge. In bounded mode script/style contents and long data:
+    URIs are stripped from the raw HTML first (none of them reach the
+    analysis), and anything still over a limit is cut off: the HTML after
+    the last allowed start tag or character is never handed to the parser,
+    and the clean text is shortened. Truncated results are marked, so
+    latency and memory have a ceiling per request.
+    """
+
+    def __init__(self, max_html_length: int = None, max_nodes: int = None, max_text_length: int = None,
+                 bounded: bool = False):
+        """
+        Args:
+            max_html_length: Maximum characters of HTML that are parsed
+            max_nodes: Maximum number of elements (start tags) that are parsed
+            max_text_length: Maximum characters of clean text that are analyzed
+            bounded: Truncate instead of rejecting, and pre-strip payloads
+        """
+        self.max_html_length = max_html_length or None
+        self.max_nodes = max_nodes or None
+        self.max_text_length = max_text_length or None
+        self.bounded = bounded
+
+        config = [self.max_html_length, self.max_nodes, self.max_text_length, self.bounded]
+        self.fingerprint = hashlib.blake2b(json.dumps(config).encode('utf-8'), digest_size=8).hexdigest()
+
+    def limit_html(self, html_content: str) -> Tuple[str, List[str]]:
+        """Apply the HTML limits, returning the HTML to parse and what was truncated"""
+        truncated = []
+        if not isinstance(html_content, str):
+            return html_content, truncated
+
+        if self.bounded:
+            html_content = strip_payloads(html_content)
+
+        if self.max_html_length is not None and len(html_content) > self.max_html_length:
+            if not self.bounded:
+                raise DocumentTooLarge(f"HTML is longer than {self.max_html_length} characters")
+            html_content = html_content[:self.max_html_length]
+            truncated.append("maxHtmlLength")
+
+        if self.max_nodes is not None:
+            cut = _nth_start_tag(html_content, self.max_nodes)
+            if cut is not None:
+                if not self.bounded:
+                    raise DocumentTooLarge(f"HTML has more than {self.max_nodes} elements")
+                html_content = html_content[:cut]
+                truncated.append("maxNodes")
+
+        return html_content, truncated
+
+    def limit_text(self, text: str) -> str:
+        """Apply the clean text limit; a truncated text is always shorter"""
+        if self.max_text_length is None or len(text) <= self.max_text_length:
+            return text
+        if not self.bounded:
+            raise DocumentTooLarge(f"Text is longer than {self.max_text_length} characters")
+
+        text = text[:self.max_text_length]
+
+        # Don't leave half a word at the end
+        last_space = text.rfind(' ')
+        if last_space > 0:
+            text = text[:last_space]
+        return text
+
+
+def strip_payloads(html_content: str) -> str:
+    """Empty script/style elements and shorten data: URIs without parsing
+
+    Scans for each opening tag and the matching closing tag, so the work is
+    linear in the document size. An element that is never closed is left as
+    it is, since the parser treats the rest of the document as its text
+    anyway.
+    """
+    parts = []
+    position = 0
+    while True:
+        start = RAW_TEXT_START_PATTERN.search(html_content, position)
+        if start is None:
+            break
+        end = RAW_TEXT_END_PATTERNS[start.group(1).lower()].search(html_content, start.end())
+        if end is None:
+            break
+        parts.append(html_content[position:start.end()])
+        position = end.start()
+    parts.append(html_content[position:])
+    html_content = ''.join(parts)
+
+    return DATA_URI_PATTERN.sub('data:,', html_content)
+
+
+def _nth_start_tag(html_content: str, count: int):
+    """Offset of the start tag after the first count start tags, or None
+
+    Tags inside comments and script/style contents (inline code, JSON
+    data) are not elements, so they are not counted. An unclosed comment
+    or script runs to the end of the document, as it does for the parser.
+    """
+    seen = 0
+    position = 0
+    while True:
+        match = START_TAG_PATTERN.search(html_content, position)
+        if match is None:
+            return None
+        if match.group() == '<!--':
+            end = COMMENT_END_PATTERN.search(html_content, match.end())
+            if end is None:
+                return None
+            position = end.end()
+            continue
+
+        if seen == count:
+            return match.start()
+        seen += 1
+        position = match.end()
+
+        raw_text = match.group(1)
+        if raw_text is not None:
+            end = RAW_TEXT_END_PATTERNS[raw_text.lower()].search(html_content, position)
+            if end is None:
+                return None
+            position = end.end()
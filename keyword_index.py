@@ -0,0 +1,118 @@
+import re
+from collections import Counter
+from functools import lru_cache
+from typing import Dict, List, Iterable, Tuple
+
+# Runs of word characters; a single-word keyword made of word characters
+# matches r'\bkeyword\b' exactly where it equals one of these runs
+WORD_PATTERN = re.compile(r'\w+')
+
+
+def normalize_keyword(keyword: str) -> str:
+    """Normalize a keyword the way it is matched against lowercased text"""
+    return keyword.strip().lower()
+
+
+def _trie_pattern(phrases: Iterable[str]) -> str:
+    """Build a regex alternation factored by common prefixes"""
+    trie: Dict[str, dict] = {}
+    for phrase in phrases:
+        node = trie
+        for char in phrase:
+            node = node.setdefault(char, {})
+        node[''] = {}
+
+    def build(node: Dict[str, dict]) -> str:
+        if '' in node and len(node) == 1:
+            return ''
+        branches = [re.escape(char) + build(child) for char, child in sorted(node.items()) if char]
+        pattern = branches[0] if len(branches) == 1 else '(?:' + '|'.join(branches) + ')'
+        if '' in node:
+            pattern = '(?:' + pattern + ')?'
+        return pattern
+
+    return build(trie)
+
+
+class KeywordIndex:
+    """Counts many keywords in one pass over lowercased text
+
+    Keywords are matched like SEOAnalyzer always has: case-insensitively,
+    multi-word keywords as plain substrings and single words on word
+    boundaries, each counted without overlapping itself.
+
+    - Single words made of word characters are counted from one tokenization
+      of the text into runs of word characters.
+    - Multi-word phrases are compiled into one prefix-factored lookahead regex
+      that finds every position where some phrase starts; the phrases sharing
+      that first word are then checked at the position.
+    - Anything else (e.g. "c++") falls back to its own boundary regex.
+    """
+
+    def __init__(self, keywords: Iterable[str]):
+        # Normalized keywords in first-seen order
+        self.keys: List[str] = []
+        self.words: List[str] = []
+        self.phrases: Dict[str, List[str]] = {}
+        self.patterns: Dict[str, re.Pattern] = {}
+
+        seen = set()
+        for keyword in keywords:
+            if not keyword:
+                continue
+            key = normalize_keyword(keyword)
+            if key in seen:
+                continue
+            seen.add(key)
+            self.keys.append(key)
+            if ' ' in key:
+                self.phrases.setdefault(key[:key.index(' ')], []).append(key)
+            elif WORD_PATTERN.fullmatch(key):
+                self.words.append(key)
+            else:
+                self.patterns[key] = re.compile(r'\b' + re.escape(key) + r'\b')
+
+        self.phrase_starts = None
+        if self.phrases:
+            phrases = [phrase for bucket in self.phrases.values() for phrase in bucket]
+            self.phrase_starts = re.compile('(?=' + _trie_pattern(phrases) + ')')
+
+    def count(self, text: str) -> Dict[str, int]:
+        """Count every keyword in text, keyed by normalized keyword"""
+        return self.count_lowered(text.lower())
+
+    def count_lowered(self, text: str) -> Dict[str, int]:
+        """Count every keyword in already lowercased text (e.g. TextModel.body)"""
+        counts: Dict[str, int] = {}
+
+        if self.words:
+            tokens = Counter(WORD_PATTERN.findall(text))
+            for word in self.words:
+                counts[word] = tokens[word]
+
+        if self.phrase_starts is not None:
+            # End of the last counted occurrence, so a phrase never overlaps itself
+            counted_until: Dict[str, int] = {}
+            for phrase in (phrase for bucket in self.phrases.values() for phrase in bucket):
+                counts[phrase] = 0
+                counted_until[phrase] = 0
+            for match in self.phrase_starts.finditer(text):
+                start = match.start()
+                space = text.find(' ', start)
+                if space < 0:
+                    break
+                for phrase in self.phrases.get(text[start:space], ()):
+                    if start >= counted_until[phrase] and text.startswith(phrase, start):
+                        counts[phrase] += 1
+                        counted_until[phrase] = start + len(phrase)
+
+        for key, pattern in self.patterns.items():
+            counts[key] = len(pattern.findall(text))
+
+        return counts
+
+
+@lru_cache(maxsize=256)
+def compile_keyword_index(keywords: Tuple[str, ...]) -> KeywordIndex:
+    """Return a KeywordIndex for keywords, reusing it for repeated keyword sets"""
+    return KeywordIndex(keywords)
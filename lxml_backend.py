@@ -0,0 +1,238 @@
+from lxml import etree
+from typing import Iterable, List, Optional, Set
+from page_scan import PageScan, HEADING_LEVELS
+from rules import RuleTable, DEFAULT_RULES
+from site_template import SiteTemplate
+
+# Strings inside these tags are not NavigableStrings in BeautifulSoup, so
+# Tag.get_text() leaves them out (except on the container itself)
+STRING_CONTAINER_TAGS = frozenset(['script', 'style', 'template', 'rt', 'rp'])
+
+# Whitespace-only strings inside these tags are kept verbatim by BeautifulSoup
+PRESERVE_WHITESPACE_TAGS = frozenset(['pre', 'textarea'])
+
+ASCII_SPACES = '\x20\x0a\x09\x0c\x0d'
+
+
+class LXMLScanner:
+    """lxml-native scanner that builds a PageScan without BeautifulSoup
+
+    Tag rules use lxml's C-level tag filters (iter() with tag names) and
+    attribute rules run compiled XPath selectors to pick out the elements
+    carrying class, id, style or type attributes. The class, id and style
+    values are then matched with the RuleTable's precompiled patterns, which
+    is cheaper than calling back into Python from EXSLT regular expressions
+    for every element. Text is assembled with the rules
+    BeautifulSoup applies when it builds strings from lxml's parser events
+    (whitespace-only strings collapse to a single space or newline,
+    script/style/template/ruby text is skipped), so the resulting scan matches
+    DOMWalker on the same markup.
+    """
+
+    def __init__(self, rules: RuleTable = None):
+        self.rules = rules or DEFAULT_RULES
+        self.media_tags = tuple(self.rules.media_tags)
+        self.heading_tags = tuple(HEADING_LEVELS)
+        self.boilerplate_tags = tuple(sorted(self.rules.boilerplate_tags))
+
+        self.button_xpath = etree.XPath("descendant-or-self::*[self::button or (self::input and (@type = 'submit' or @type = 'button'))]")
+        self.attributed_xpath = etree.XPath("descendant::*[@class or @id or @style]")
+        # <body> itself counts as outside: its class marks articles and
+        # media, but it is never removed as boilerplate
+        self.outside_body_attributed_xpath = etree.XPath(
+            "descendant-or-self::*[@class or @id or @style][not(ancestor::body)]"
+        )
+
+    def parse(self, html_content: str) -> Optional[etree._Element]:
+        """Parse HTML the way BeautifulSoup's lxml tree builder does"""
+        # BeautifulSoup drops a leading byte order mark from text input
+        if isinstance(html_content, str) and html_content[:1] == '\ufeff':
+            html_content = html_content[1:]
+
+        parser = etree.HTMLParser(recover=True)
+        parser.feed(html_content)
+        return parser.close()
+
+    def scan(self, html_content: str, template: SiteTemplate = None) -> PageScan:
+        """Parse HTML and collect the observations used by the analyzer
+
+        With a site template, its blocks are removed instead of the elements
+        whose class or id matches the boilerplate names; boilerplate tags and
+        hidden elements are removed either way.
+        """
+        scan = PageScan()
+        root = self.parse(html_content)
+        if root is None:
+            return scan
+
+        # Observations on the unmodified document
+        title = next(root.iter('title'), None)
+        if title is not None:
+            scan.title_text = self._text(title)
+        h1 = next(root.iter('h1'), None)
+        if h1 is not None:
+            scan.h1_text = self._text(h1)
+        scan.has_article_markup = next(root.iter('article', 'time'), None) is not None
+        forms = list(root.iter('form'))
+        scan.has_form_markup = bool(forms)
+
+        # Boilerplate removal applies to descendants of <body>, or to the
+        # whole document when there is no body
+        body = next(root.iter('body'), None)
+        if body is not None:
+            scope = body
+            attributed = self.attributed_xpath(body)
+            outside = self.outside_body_attributed_xpath(root)
+        else:
+            scope = root
+            attributed = self.outside_body_attributed_xpath(root)
+            outside = []
+        removed = set(scope.iter(*self.boilerplate_tags)) if self.boilerplate_tags else set()
+
+        # Class, id and style rules
+        rules = self.rules
+        media_classes = []
+        content_classes = []
+        content_ids = []
+        for element in outside:
+            classes = element.get('class')
+            if classes:
+                if rules.article_class_pattern.search(classes):
+                    scan.has_article_markup = True
+                if rules.media_class_pattern.search(classes):
+                    media_classes.append(element)
+        for element in attributed:
+            classes = element.get('class')
+            element_id = element.get('id')
+            style = element.get('style')
+            if classes:
+                if rules.article_class_pattern.search(classes):
+                    scan.has_article_markup = True
+                if rules.media_class_pattern.search(classes):
+                    media_classes.append(element)
+                if rules.content_container_pattern.search(classes):
+                    content_classes.append(element)
+                if template is None and rules.boilerplate_pattern.search(classes):
+                    removed.add(element)
+            if element_id:
+                if rules.content_container_pattern.search(element_id):
+                    content_ids.append(element)
+                if template is None and rules.boilerplate_pattern.search(element_id):
+                    removed.add(element)
+            if style and rules.hidden_style_pattern.search(style):
+                removed.add(element)
+        if template is not None:
+            removed.update(template.match(scope))
+
+        def kept(elements: Iterable[etree._Element]) -> List[etree._Element]:
+            return [element for element in elements if not self._is_removed(element, removed)]
+
+        def first_kept(elements: Iterable[etree._Element]) -> Optional[etree._Element]:
+            for element in elements:
+                if not self._is_removed(element, removed):
+                    return element
+            return None
+
+        # Main content falls back from <main> to <article> to content containers to the body
+        main = None
+        for candidates in [scope.iter('main'), scope.iter('article'), content_classes, content_ids]:
+            main = first_kept(candidates)
+            if main is not None:
+                break
+        if main is None:
+            main = scope
+        strings = self._strings(main, removed)
+        scan.main_text = ' '.join(s for s in (string.strip() for string in strings) if s)
+
+        scan.headings = [(HEADING_LEVELS[heading.tag], self._text(heading, removed))
+                         for heading in kept(root.iter(*self.heading_tags))]
+        media_tags = root.iter(*self.media_tags) if self.media_tags else []
+        scan.has_media = first_kept(media_tags) is not None or first_kept(media_classes) is not None
+        scan.has_form = first_kept(forms) is not None
+        scan.has_button = first_kept(self.button_xpath(root)) is not None
+        scan.links = [(self._text(link, removed), link.get('href', '')) for link in kept(root.iter('a'))]
+
+        scan.paragraphs = [self._text(paragraph, removed) for paragraph in kept(scope.iter('p'))]
+        scan.list_count = len(kept(scope.iter('ul', 'ol')))
+        scan.list_item_count = len(kept(scope.iter('li')))
+
+        return scan
+
+    @staticmethod
+    def _is_removed(element: etree._Element, removed: Set[etree._Element]) -> bool:
+        """Check whether an element sits inside a boilerplate subtree"""
+        if not removed:
+            return False
+        if element in removed:
+            return True
+        for ancestor in element.iterancestors():
+            if ancestor in removed:
+                return True
+        return False
+
+    def _text(self, element: etree._Element, removed: Set[etree._Element] = frozenset()) -> str:
+        """Equivalent of Tag.get_text() on the matching BeautifulSoup tag"""
+        return ''.join(self._strings(element, removed))
+
+    def _strings(self, element: etree._Element, removed: Set[etree._Element]) -> List[str]:
+        """Collect the strings BeautifulSoup would yield under element
+
+        A string's type comes from its innermost string container, and
+        get_text() yields the strings of the element's own type: those
+        outside any container for ordinary elements, and those whose
+        innermost container has the element's tag for a container itself.
+        """
+        strings = []
+        if element in removed:
+            return strings
+        wanted = element.tag if element.tag in STRING_CONTAINER_TAGS else None
+
+        # Text context inherited from the ancestors
+        containers = [None]
+        preserve = 0
+        for ancestor in element.iterancestors():
+            if ancestor.tag in STRING_CONTAINER_TAGS:
+                if containers[0] is None:
+                    containers[0] = ancestor.tag
+            elif ancestor.tag in PRESERVE_WHITESPACE_TAGS:
+                preserve += 1
+
+        def add(text: str):
+            if not preserve and not text.strip(ASCII_SPACES):
+                text = '\n' if '\n' in text else ' '
+            strings.append(text)
+
+        # Stack entries are (node, step): 0 enters an element, 1 leaves it and
+        # 2 only emits the tail of a skipped node
+        stack = [(element, 0)]
+        while stack:
+            node, step = stack.pop()
+            if step == 0:
+                tag = node.tag
+                if tag in STRING_CONTAINER_TAGS:
+                    containers.append(tag)
+                elif tag in PRESERVE_WHITESPACE_TAGS:
+                    preserve += 1
+                if node.text and containers[-1] == wanted:
+                    add(node.text)
+                stack.append((node, 1))
+                for child in reversed(node):
+                    if child in removed or not isinstance(child.tag, str):
+                        stack.append((child, 2))
+                    else:
+                        stack.append((child, 0))
+                continue
+
+            if step == 1:
+                tag = node.tag
+                if tag in STRING_CONTAINER_TAGS:
+                    containers.pop()
+                elif tag in PRESERVE_WHITESPACE_TAGS:
+                    preserve -= 1
+                if node is element:
+                    continue
+
+            if node.tail and containers[-1] == wanted:
+                add(node.tail)
+
+        return strings
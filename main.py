@@ -1,34 +1,151 @@
 from apify import Actor
-from seo_analyzer import SEOAnalyzer
+from typing import Dict, Any, AsyncIterator, Awaitable, Callable, Optional, Tuple, TYPE_CHECKING
+import asyncio
 import logging
+import os
+
+if TYPE_CHECKING:
+    from batch_analyzer import BatchAnalyzer
+
+# An input item and an optional callback run once its result is stored
+Work = Tuple[Any, Optional[Callable[[], Awaitable[None]]]]
+
+
+async def iter_work(data: Dict[str, Any]) -> AsyncIterator[Work]:
+    """
+    Yield the pages to analyze from the actor input
+
+    Pages come from, in order of precedence:
+        pages: List of items shaped like /api/analyze requests
+        datasetId: Dataset whose items are shaped like /api/analyze requests
+        requestQueueId: Request queue whose requests carry the item fields in
+            userData (the request URL is used when userData has no url)
+    """
+    if data.get("pages") is not None:
+        for item in data["pages"]:
+            yield item, None
+
+    elif data.get("datasetId"):
+        dataset = await Actor.open_dataset(id=data["datasetId"])
+        async for item in dataset.iterate_items():
+            yield item, None
+
+    elif data.get("requestQueueId"):
+        queue = await Actor.open_request_queue(id=data["requestQueueId"])
+        while True:
+            request = await queue.fetch_next_request()
+            if request is None:
+                break
+            item = dict(request.user_data)
+            item.setdefault("url", request.url)
+
+            # Bind this request, not the loop variable
+            async def mark_handled(request=request):
+                await queue.mark_request_as_handled(request)
+
+            yield item, mark_handled
+
+
+async def analyze_work(work: AsyncIterator[Work], batch_analyzer: 'BatchAnalyzer', defaults: Dict[str, Any],
+                       concurrency: int) -> Dict[str, int]:
+    """
+    Analyze pages on the process pool, pushing each result as soon as it is ready
+
+    At most `concurrency` pages are in flight, so large datasets and queues
+    are streamed instead of loaded up front. Results are pushed in completion
+    order. A page whose analysis raises (e.g. a broken process pool) is pushed
+    as an error item, and one whose result cannot be stored is logged; both
+    count as failed.
+    """
+    from batch_analyzer import analyze_item
+
+    loop = asyncio.get_running_loop()
+    executor = batch_analyzer.executor
+    slots = asyncio.Semaphore(concurrency)
+    pending = set()
+    counts = {"analyzed": 0, "failed": 0}
+
+    async def run(item: Any, done: Optional[Callable[[], Awaitable[None]]]):
+        try:
+            try:
+                result = await loop.run_in_executor(executor, analyze_item, item)
+            except Exception as e:
+                url = item.get("url", "") if isinstance(item, dict) else ""
+                result = {"url": url, "error": f"Analysis failed: {str(e)}"}
+            await Actor.push_data(result)
+            if done is not None:
+                await done()
+            counts["failed" if "error" in result else "analyzed"] += 1
+        except Exception:
+            logging.exception("Could not store the analysis of a page")
+            counts["failed"] += 1
+        finally:
+            slots.release()
+
+    async for item, done in work:
+        # Keywords given once in the input apply to every page without its own
+        if isinstance(item, dict):
+            item = {**defaults, **item}
+
+        await slots.acquire()
+        task = asyncio.create_task(run(item, done))
+        pending.add(task)
+        task.add_done_callback(pending.discard)
+
+    if pending:
+        await asyncio.gather(*pending)
+
+    return counts
+
+
+def import_analyzer():
+    """Load the analyzer modules and the default (bs4) backend"""
+    import batch_analyzer  # noqa: F401
+    import dom_walker  # noqa: F401
+
 
 async def main():
+    # Import the analyzer (rule tables, parser backend) on a thread while the
+    # actor starts up and fetches its input, instead of before it
+    analyzer_import = asyncio.ensure_future(asyncio.to_thread(import_analyzer))
+
     async with Actor:
         data = await Actor.get_input() or {}
+        await analyzer_import
+        from batch_analyzer import BatchAnalyzer, analyze_item
+        from seo_analyzer import SEOAnalyzer
+
+        # Inputs can carry megabytes of HTML, so only log their shape
+        logging.info(f"Received input with keys: {sorted(data)}")
 
-        logging.info(f"Received input: {data}")
+        concurrency = int(data.get("concurrency") or os.cpu_count() or 1)
+        backend = data.get("backend", "bs4")
+        if backend not in SEOAnalyzer.BACKENDS:
+            raise ValueError(f"Unknown backend '{backend}', expected one of {SEOAnalyzer.BACKENDS}")
 
-        html_content = data.get("html", "")
-        url = data.get("url", "")
-        primary_keyword = data.get("primaryKeyword", "")
-        related_keywords = data.get("relatedKeywords", [])
+        # Original single-page input: analyze in a thread (no pool start-up
+        # cost) and keep the result as the run's OUTPUT
+        if not any(data.get(key) is not None for key in ["pages", "datasetId", "requestQueueId"]):
+            if not data.get("html"):
+                logging.warning("No HTML content provided. Skipping analysis.")
+                await Actor.set_value("OUTPUT", {"error": "No HTML content provided"})
+                return
 
-        if not html_content:
-            logging.warning("No HTML content provided. Skipping analysis.")
-            await Actor.set_value("OUTPUT", {"error": "No HTML content provided"})
+            result = await asyncio.to_thread(analyze_item, data, SEOAnalyzer(backend=backend))
+            await Actor.push_data(result)
+            await Actor.set_value("OUTPUT", result)
             return
 
-        analyzer = SEOAnalyzer()
-        result = analyzer.analyze(
-            html_content=html_content,
-            url=url,
-            primary_keyword=primary_keyword,
-            related_keywords=related_keywords,
-        )
+        defaults = {key: data[key] for key in ["primaryKeyword", "relatedKeywords"] if key in data}
+
+        batch_analyzer = BatchAnalyzer(max_workers=concurrency, backend=backend)
+        try:
+            counts = await analyze_work(iter_work(data), batch_analyzer, defaults, concurrency)
+        finally:
+            batch_analyzer.shutdown()
 
-        logging.info(f"Analysis result: {result}")
-        await Actor.set_value("OUTPUT", result)
+        logging.info(f"Analyzed {counts['analyzed']} pages, {counts['failed']} failed")
+        await Actor.set_value("OUTPUT", counts)
 
 if __name__ == "__main__":
-    import asyncio
     asyncio.run(main())
@@ -0,0 +1,135 @@
+import threading
+from bisect import bisect_left
+from typing import Dict, List, Any, Tuple
+
+# Stage and request latencies, in seconds
+DURATION_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# HTML document sizes, in bytes
+SIZE_BUCKETS = (1024, 10240, 51200, 102400, 262144, 524288, 1048576, 2097152, 5242880, 10485760, 20971520)
+
+# Keywords per request
+KEYWORD_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200, 500)
+
+# Net memory blocks allocated by a stage (frees can make it negative)
+BLOCK_BUCKETS = (0, 10, 100, 1000, 10000, 100000, 1000000)
+
+
+def _labels(names: Tuple[str, ...], values: Tuple[str, ...], extra: str = '') -> str:
+    pairs = ['%s="%s"' % (name, str(value).replace('\\', '\\\\').replace('"', '\\"')) for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _number(value: float) -> str:
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Histogram:
+    """Prometheus-style cumulative histogram with optional labels"""
+
+    def __init__(self, name: str, documentation: str, buckets: Tuple[float, ...], label_names: Tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.buckets = tuple(buckets)
+        self.label_names = label_names
+        self.series: Dict[Tuple[str, ...], List[Any]] = {}
+
+    def observe(self, value: float, *label_values: str):
+        # Per series: one count per bucket plus +Inf, then the sum
+        series = self.series.get(label_values)
+        if series is None:
+            series = self.series[label_values] = [[0] * (len(self.buckets) + 1), 0.0]
+        series[0][bisect_left(self.buckets, value)] += 1
+        series[1] += value
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        for label_values, (counts, total) in sorted(self.series.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += count
+                le = 'le="%s"' % ('+Inf' if bound == float('inf') else _number(bound))
+                lines.append(f"{self.name}_bucket{_labels(self.label_names, label_values, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.label_names, label_values)} {_number(total)}")
+            lines.append(f"{self.name}_count{_labels(self.label_names, label_values)} {cumulative}")
+        return lines
+
+
+class Counter:
+    """Prometheus-style counter with optional labels"""
+
+    def __init__(self, name: str, documentation: str, label_names: Tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = label_names
+        self.series: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1, *label_values: str):
+        self.series[label_values] = self.series.get(label_values, 0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        for label_values, value in sorted(self.series.items()):
+            lines.append(f"{self.name}{_labels(self.label_names, label_values)} {_number(value)}")
+        return lines
+
+
+class Gauge:
+    """Prometheus-style gauge with optional labels"""
+
+    def __init__(self, name: str, documentation: str, label_names: Tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = label_names
+        self.series: Dict[Tuple[str, ...], float] = {}
+
+    def set(self, value: float, *label_values: str):
+        self.series[label_values] = value
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} gauge"]
+        for label_values, value in sorted(self.series.items()):
+            lines.append(f"{self.name}{_labels(self.label_names, label_values)} {_number(value)}")
+        return lines
+
+
+class AnalysisMetrics:
+    """Aggregates the `_timings` of profiled analyses for a /metrics endpoint
+
+    Metrics live in the process that observes them, so each gunicorn worker
+    exports its own series (scrape every worker, or sum them in Prometheus).
+    """
+
+    def __init__(self, prefix: str = 'seo_analyzer'):
+        self._lock = threading.Lock()
+        self.analyses = Counter(f"{prefix}_profiled_analyses_total", "Profiled analyses")
+        self.duration = Histogram(f"{prefix}_analysis_duration_seconds", "Wall time of profiled analyses", DURATION_BUCKETS)
+        self.stage_duration = Histogram(f"{prefix}_stage_duration_seconds", "Wall time per analyzer stage",
+                                        DURATION_BUCKETS, ('stage',))
+        self.stage_blocks = Histogram(f"{prefix}_stage_allocated_blocks", "Net memory blocks allocated per analyzer stage",
+                                      BLOCK_BUCKETS, ('stage',))
+        self.document_bytes = Histogram(f"{prefix}_document_bytes", "Size of analyzed HTML documents", SIZE_BUCKETS)
+        self.keywords = Histogram(f"{prefix}_keywords", "Keywords per analysis", KEYWORD_BUCKETS)
+
+    def observe(self, timings: Dict[str, Any]):
+        """Record one `_timings` summary"""
+        with self._lock:
+            self.analyses.inc()
+            self.duration.observe(timings["totalMs"] / 1000)
+            if timings.get("documentBytes") is not None:
+                self.document_bytes.observe(timings["documentBytes"])
+            if timings.get("keywordCount") is not None:
+                self.keywords.observe(timings["keywordCount"])
+            for stage, values in timings["stages"].items():
+                self.stage_duration.observe(values["ms"] / 1000, stage)
+                self.stage_blocks.observe(values["allocatedBlocks"], stage)
+
+    def render(self) -> str:
+        """Prometheus text exposition format"""
+        with self._lock:
+            lines = []
+            for metric in [self.analyses, self.duration, self.stage_duration, self.stage_blocks, self.document_bytes, self.keywords]:
+                lines.extend(metric.render())
+            return '\n'.join(lines) + '\n'
@@ -0,0 +1,25 @@
+from typing import List, Optional, Tuple
+
+HEADING_LEVELS = {'h1': 1, 'h2': 2, 'h3': 3, 'h4': 4, 'h5': 5, 'h6': 6}
+
+
+class PageScan:
+    """Observations gathered from a single traversal of a parsed page"""
+
+    def __init__(self):
+        # Gathered from the unmodified document
+        self.title_text: Optional[str] = None
+        self.h1_text: Optional[str] = None
+        self.has_article_markup = False
+        self.has_form_markup = False
+
+        # Gathered after boilerplate removal
+        self.main_text = ''
+        self.headings: List[Tuple[int, str]] = []
+        self.has_media = False
+        self.has_form = False
+        self.has_button = False
+        self.links: List[Tuple[str, str]] = []
+        self.paragraphs: List[str] = []
+        self.list_count = 0
+        self.list_item_count = 0
@@ -0,0 +1,100 @@
+from concurrent.futures import Executor
+from typing import Dict, List, Any, Callable, Tuple
+from profiling import StageProfiler, NULL_PROFILER
+
+
+class Stage:
+    """One analyzer step: a function of named values that produces a named value
+
+    Stages must not modify their inputs, so they can run in any order their
+    inputs allow, concurrently, or be skipped when their output is known.
+    """
+
+    def __init__(self, name: str, func: Callable, inputs: Tuple[str, ...], output: str):
+        """
+        Args:
+            name: Name the stage is profiled under
+            func: Called with the input values as positional arguments
+            inputs: Names of the values the stage reads
+            output: Name of the value it produces
+        """
+        self.name = name
+        self.func = func
+        self.inputs = tuple(inputs)
+        self.output = output
+
+
+class Pipeline:
+    """Stages run in dependency order, as determined by their declared inputs
+
+    Stages are grouped into waves: every stage in a wave only reads values
+    produced by earlier waves (or passed to run()), so the stages of one
+    wave are independent of each other and can run in parallel.
+    """
+
+    def __init__(self, stages: List[Stage]):
+        outputs = [stage.output for stage in stages]
+        if len(set(outputs)) != len(outputs):
+            raise ValueError("Pipeline stages must produce distinct outputs")
+        producers = {stage.output: stage for stage in stages}
+
+        # Values no stage produces must be passed to run()
+        self.stages = list(stages)
+        self.required = sorted({name for stage in stages for name in stage.inputs if name not in producers})
+
+        # A stage's wave is one more than the latest wave among its producers
+        waves: Dict[str, int] = {}
+
+        def wave_of(stage: Stage, visiting: Tuple[str, ...] = ()) -> int:
+            if stage.output in waves:
+                return waves[stage.output]
+            if stage.output in visiting:
+                raise ValueError(f"Pipeline stage '{stage.name}' depends on its own output")
+            wave = 0
+            for name in stage.inputs:
+                if name in producers:
+                    wave = max(wave, wave_of(producers[name], visiting + (stage.output,)) + 1)
+            waves[stage.output] = wave
+            return wave
+
+        self.waves: List[List[Stage]] = []
+        for stage in stages:
+            wave = wave_of(stage)
+            while len(self.waves) <= wave:
+                self.waves.append([])
+        for stage in stages:
+            self.waves[waves[stage.output]].append(stage)
+
+    def run(self, values: Dict[str, Any], profiler: StageProfiler = NULL_PROFILER, executor: Executor = None) -> Dict[str, Any]:
+        """
+        Run every stage whose output is not already in values
+
+        Args:
+            values: Required inputs, plus any stage outputs already known
+                (those stages are skipped, e.g. memoized or precomputed values)
+            profiler: Records each stage under its name
+            executor: Optional executor that runs the stages of a wave
+                concurrently; allocation deltas of concurrent stages overlap
+
+        Returns:
+            A new dictionary with the inputs and every stage output
+        """
+        missing = [name for name in self.required if name not in values]
+        if missing:
+            raise ValueError(f"Missing pipeline inputs: {missing}")
+
+        values = dict(values)
+        for wave in self.waves:
+            pending = [stage for stage in wave if stage.output not in values]
+            if executor is None or len(pending) < 2:
+                for stage in pending:
+                    values[stage.output] = profiler.call(stage.name, stage.func, *[values[name] for name in stage.inputs])
+                continue
+
+            futures = [
+                (stage, executor.submit(profiler.call, stage.name, stage.func, *[values[name] for name in stage.inputs]))
+                for stage in pending
+            ]
+            for stage, future in futures:
+                values[stage.output] = future.result()
+        return values
@@ -0,0 +1,58 @@
+import sys
+import time
+import tracemalloc
+from typing import Dict, Any, Callable
+
+
+class StageProfiler:
+    """Records wall time and allocation deltas for each analyzer stage
+
+    Allocations are measured as the change in allocated memory blocks, which
+    is cheap enough to leave on in production. When tracemalloc is tracing
+    (e.g. `python -X tracemalloc`), the change in traced bytes is recorded
+    too. Memory owned by libxml2 is invisible to both.
+    """
+
+    def __init__(self):
+        self.stages: Dict[str, Dict[str, float]] = {}
+        self.started = time.perf_counter()
+
+    def call(self, name: str, func: Callable, *args, **kwargs) -> Any:
+        """Run one stage and record its cost under name"""
+        tracing = tracemalloc.is_tracing()
+        traced_before = tracemalloc.get_traced_memory()[0] if tracing else 0
+        blocks_before = sys.getallocatedblocks()
+        start = time.perf_counter()
+
+        value = func(*args, **kwargs)
+
+        elapsed = time.perf_counter() - start
+        stage = self.stages.setdefault(name, {"ms": 0.0, "allocatedBlocks": 0})
+        stage["ms"] += elapsed * 1000
+        stage["allocatedBlocks"] += sys.getallocatedblocks() - blocks_before
+        if tracing:
+            stage["tracedBytes"] = stage.get("tracedBytes", 0) + tracemalloc.get_traced_memory()[0] - traced_before
+
+        return value
+
+    def to_dict(self, document_bytes: int = None, keyword_count: int = None) -> Dict[str, Any]:
+        """Summary attached to results under `_timings`"""
+        return {
+            "totalMs": round((time.perf_counter() - self.started) * 1000, 3),
+            "documentBytes": document_bytes,
+            "keywordCount": keyword_count,
+            "stages": {
+                name: {key: round(value, 3) if key == "ms" else value for key, value in stage.items()}
+                for name, stage in self.stages.items()
+            }
+        }
+
+
+class NullProfiler:
+    """Stand-in used when profiling is off; runs stages without measuring them"""
+
+    def call(self, name: str, func: Callable, *args, **kwargs) -> Any:
+        return func(*args, **kwargs)
+
+
+NULL_PROFILER = NullProfiler()
@@ -0,0 +1,177 @@
+import os
+import json
+import sqlite3
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Any, Optional
+
+
+class ResultCache:
+    """Content-addressed cache of analysis results
+
+    Results are keyed on a hash of the HTML, URL, keywords and analyzer
+    version (or of the HTML alone for parsed documents) and stored as JSON. A bounded in-memory LRU sits in front of an
+    optional sqlite file, which gunicorn workers on the same host can share.
+    """
+
+    # Remove the oldest disk entries after this many writes
+    PRUNE_INTERVAL = 100
+
+    def __init__(self, max_entries: int = 256, path: str = None, max_disk_entries: int = 10000):
+        """
+        Args:
+            max_entries: Maximum number of results kept in memory
+            path: Optional sqlite file for the shared disk tier
+            max_disk_entries: Approximate maximum number of results kept on disk
+        """
+        self.logger = logging.getLogger(__name__)
+        self.max_entries = max_entries
+        self.path = path
+        self.max_disk_entries = max_disk_entries
+
+        self._memory: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+        self._connection: Optional[sqlite3.Connection] = None
+        self._connection_pid: Optional[int] = None
+        self._writes = 0
+
+        self.hits = 0
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @property
+    def enabled(self) -> bool:
+        """Whether any tier can hold results"""
+        return self.max_entries > 0 or self.path is not None
+
+    @staticmethod
+    def make_key(html_content: str, url: str, primary_keyword: str, related_keywords: List[str], version: str) -> Optional[str]:
+        """Hash an analysis request, or return None if it cannot be cached"""
+        if not isinstance(html_content, str) or not all(isinstance(keyword, str) for keyword in related_keywords):
+            return None
+
+        digest = hashlib.blake2b(digest_size=20)
+        digest.update(json.dumps([version, url, primary_keyword, sorted(set(related_keywords))]).encode('utf-8'))
+        digest.update(b'\0')
+        digest.update(html_content.encode('utf-8', 'surrogatepass'))
+        return digest.hexdigest()
+
+    @staticmethod
+    def make_document_key(html_content: str, version: str) -> Optional[str]:
+        """Hash the HTML of a parsed document, or return None if it cannot be cached"""
+        if not isinstance(html_content, str):
+            return None
+
+        digest = hashlib.blake2b(digest_size=20, person=b'document')
+        digest.update(version.encode('utf-8'))
+        digest.update(b'\0')
+        digest.update(html_content.encode('utf-8', 'surrogatepass'))
+        return digest.hexdigest()
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Return the cached result for key, or None"""
+        with self._lock:
+            value = self._memory.get(key)
+            if value is not None:
+                self._memory.move_to_end(key)
+                self.hits += 1
+                self.memory_hits += 1
+                return json.loads(value)
+
+            value = self._disk_get(key)
+            if value is not None:
+                self._remember(key, value)
+                self.hits += 1
+                self.disk_hits += 1
+                return json.loads(value)
+
+            self.misses += 1
+            return None
+
+    def put(self, key: str, result: Dict[str, Any]):
+        """Store a result"""
+        value = json.dumps(result)
+        with self._lock:
+            self._remember(key, value)
+            self._disk_put(key, value)
+
+    def clear(self):
+        """Drop every cached result"""
+        with self._lock:
+            self._memory.clear()
+            connection = self._get_connection()
+            if connection is not None:
+                with connection:
+                    connection.execute("DELETE FROM results")
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters for this process"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "memoryHits": self.memory_hits,
+                "diskHits": self.disk_hits,
+                "misses": self.misses,
+                "hitRate": round(self.hits / lookups, 4) if lookups else 0,
+                "evictions": self.evictions,
+                "entries": len(self._memory),
+                "maxEntries": self.max_entries,
+                "diskEnabled": self.path is not None
+            }
+
+    def _remember(self, key: str, value: str):
+        if self.max_entries <= 0:
+            return
+        self._memory[key] = value
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+            self.evictions += 1
+
+    def _get_connection(self) -> Optional[sqlite3.Connection]:
+        """Open the disk tier lazily, once per process"""
+        if self.path is None:
+            return None
+
+        # Connections must not cross a fork
+        if self._connection is None or self._connection_pid != os.getpid():
+            connection = sqlite3.connect(self.path, timeout=5, check_same_thread=False)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            connection.execute("CREATE TABLE IF NOT EXISTS results (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+            self._connection = connection
+            self._connection_pid = os.getpid()
+        return self._connection
+
+    def _disk_get(self, key: str) -> Optional[str]:
+        try:
+            connection = self._get_connection()
+            if connection is None:
+                return None
+            row = connection.execute("SELECT value FROM results WHERE key = ?", (key,)).fetchone()
+            return row[0] if row else None
+        except sqlite3.Error as e:
+            self.logger.warning(f"Result cache read failed: {str(e)}")
+            return None
+
+    def _disk_put(self, key: str, value: str):
+        try:
+            connection = self._get_connection()
+            if connection is None:
+                return
+            with connection:
+                connection.execute("INSERT OR REPLACE INTO results (key, value) VALUES (?, ?)", (key, value))
+                self._writes += 1
+                if self._writes % self.PRUNE_INTERVAL == 0:
+                    # Rows are re-inserted on write, so the lowest rowids are the oldest
+                    connection.execute(
+                        "DELETE FROM results WHERE rowid <= (SELECT MAX(rowid) FROM results) - ?",
+                        (self.max_disk_entries,)
+                    )
+        except sqlite3.Error as e:
+            self.logger.warning(f"Result cache write failed: {str(e)}")
@@ -0,0 +1,129 @@
+import re
+import json
+import hashlib
+from typing import List
+
+# Runs of whitespace, collapsed to single spaces in extracted text
+WHITESPACE_PATTERN = re.compile(r'\s+')
+
+# Tags stripped from the body before text extraction
+DEFAULT_BOILERPLATE_TAGS = ['script', 'style', 'noscript', 'nav', 'header', 'footer', 'aside']
+
+# Class/id fragments that mark non-content elements
+DEFAULT_BOILERPLATE_NAMES = [
+    'nav', 'menu', 'sidebar', 'footer', 'header', 'ad', 'advertisement', 'banner',
+    'social', 'share', 'comment', 'related', 'breadcrumb'
+]
+
+# Inline styles used to hide elements
+DEFAULT_HIDDEN_STYLES = [r'display\s*:\s*none']
+
+# Class/id fragments of common main content containers. Every name contains
+# "content", so the first element matching any of them is the first match of
+# the whole alternation.
+DEFAULT_CONTENT_CONTAINER_NAMES = [
+    'content', 'main-content', 'post-content', 'entry-content', 'article-content', 'page-content'
+]
+
+# Class fragments that indicate blog/article pages
+DEFAULT_ARTICLE_CLASS_NAMES = ['blog', 'post', 'article']
+
+# Media element tags
+DEFAULT_MEDIA_TAGS = ['img', 'video', 'audio', 'iframe', 'embed', 'object']
+
+# Class fragments that indicate media containers
+DEFAULT_MEDIA_CLASS_NAMES = ['media', 'image', 'video', 'audio', 'gallery']
+
+# Common CTA phrases
+DEFAULT_CTA_PHRASES = [
+    r'buy\s+now', r'purchase', r'order\s+now', r'get\s+started', r'sign\s+up', r'subscribe', r'download',
+    r'learn\s+more', r'contact\s+us', r'call\s+now', r'book\s+now', r'try\s+free', r'free\s+trial', r'get\s+quote',
+    r'click\s+here', r'read\s+more', r'view\s+more', r'see\s+more', r'shop\s+now', r'add\s+to\s+cart',
+    r'checkout', r'register', r'join\s+now', r'apply\s+now'
+]
+
+# Sentences that look like navigation or metadata, skipped in the clean body sample
+DEFAULT_SKIP_PATTERNS = [
+    r'home\s*>\s*',  # breadcrumbs
+    r'posted\s+(on|by)',  # post metadata
+    r'share\s+(on|this)',  # social sharing
+    r'follow\s+us',  # social follow
+    r'subscribe\s+to',  # subscription
+    r'advertisement',  # ads
+    r'sponsored',  # sponsored content
+    r'continue\s+reading',  # read more links
+    r'related\s+(articles|posts)',  # related content
+    r'comment\s*\(',  # comment counts
+    r'tags?\s*:',  # tags
+    r'categories?\s*:',  # categories
+]
+
+
+def _alternation(patterns: List[str]) -> str:
+    """Join regex fragments into one alternation (that never matches if empty)"""
+    if not patterns:
+        return '(?!)'
+    return '|'.join('(?:%s)' % pattern for pattern in patterns)
+
+
+class RuleTable:
+    """Precompiled matching rules used by the analyzer
+
+    Each rule list is merged into a single compiled pattern when the table is
+    built, so analysis never compiles or looks up regexes per element, link or
+    sentence. Build one table at startup and share it between analyzers.
+    """
+
+    def __init__(self,
+                 boilerplate_tags: List[str] = None,
+                 boilerplate_names: List[str] = None,
+                 hidden_styles: List[str] = None,
+                 content_container_names: List[str] = None,
+                 article_class_names: List[str] = None,
+                 media_tags: List[str] = None,
+                 media_class_names: List[str] = None,
+                 cta_phrases: List[str] = None,
+                 skip_patterns: List[str] = None):
+        """
+        Args:
+            boilerplate_tags: Tags removed from the body before text extraction
+            boilerplate_names: Class/id fragments (regexes) of non-content elements
+            hidden_styles: Inline style regexes of hidden elements
+            content_container_names: Class/id fragments of main content containers
+            article_class_names: Class fragments indicating blog/article pages
+            media_tags: Media element tags
+            media_class_names: Class fragments indicating media containers
+            cta_phrases: Call-to-action phrase regexes, matched on word boundaries
+            skip_patterns: Regexes of sentences left out of the clean body sample
+        """
+        config = {
+            'boilerplate_tags': sorted(boilerplate_tags if boilerplate_tags is not None else DEFAULT_BOILERPLATE_TAGS),
+            'boilerplate_names': boilerplate_names if boilerplate_names is not None else DEFAULT_BOILERPLATE_NAMES,
+            'hidden_styles': hidden_styles if hidden_styles is not None else DEFAULT_HIDDEN_STYLES,
+            'content_container_names': content_container_names if content_container_names is not None else DEFAULT_CONTENT_CONTAINER_NAMES,
+            'article_class_names': article_class_names if article_class_names is not None else DEFAULT_ARTICLE_CLASS_NAMES,
+            'media_tags': media_tags if media_tags is not None else DEFAULT_MEDIA_TAGS,
+            'media_class_names': media_class_names if media_class_names is not None else DEFAULT_MEDIA_CLASS_NAMES,
+            'cta_phrases': cta_phrases if cta_phrases is not None else DEFAULT_CTA_PHRASES,
+            'skip_patterns': skip_patterns if skip_patterns is not None else DEFAULT_SKIP_PATTERNS,
+        }
+
+        # Short hash of the configuration, part of every result cache key
+        self.fingerprint = hashlib.blake2b(json.dumps(config, sort_keys=True).encode('utf-8'), digest_size=8).hexdigest()
+
+        self.boilerplate_tags = frozenset(config['boilerplate_tags'])
+        self.media_tags = list(config['media_tags'])
+
+        self.boilerplate_pattern = re.compile(_alternation(config['boilerplate_names']), re.I)
+        self.hidden_style_pattern = re.compile(_alternation(config['hidden_styles']), re.I)
+        self.content_container_pattern = re.compile(_alternation(config['content_container_names']), re.I)
+        self.article_class_pattern = re.compile(_alternation(config['article_class_names']), re.I)
+        self.media_class_pattern = re.compile(_alternation(config['media_class_names']), re.I)
+        self.cta_pattern = re.compile(r'\b(?:%s)\b' % _alternation(config['cta_phrases']), re.I)
+
+        # Sentences are lowercased before matching
+        self.skip_pattern = re.compile(_alternation(config['skip_patterns']))
+
+
+# Rules used when an analyzer is not given its own table
+DEFAULT_RULES = RuleTable()
@@ -1,25 +1,197 @@
-import re
 import logging
-from bs4 import BeautifulSoup, Comment
 from urllib.parse import urlparse, urljoin
-from typing import Dict, List, Any
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Dict, List, Any, Optional, Set, Tuple
+from page_scan import PageScan
+from keyword_index import KeywordIndex, compile_keyword_index, normalize_keyword
+from rules import RuleTable, DEFAULT_RULES, WHITESPACE_PATTERN
+from result_cache import ResultCache
+from profiling import StageProfiler, NULL_PROFILER
+from input_limits import AnalysisLimits
+from pipeline import Pipeline, Stage
+from site_template import SiteTemplate, Block, page_blocks
+from body_sample import BodySampler
+from text_model import TextModel
+
+# Bump whenever analysis output changes, so cached results are not reused
+ANALYZER_VERSION = "3"
+
+
+class ParsedDocument:
+    """Keyword-independent analysis of one HTML document"""
+    
+    def __init__(self, title: str, content_type: str, clean_text: str, word_count: int, headings: List[str],
+                 has_media: bool, has_cta: bool, clean_body: str, paragraph_style: Dict[str, Any], truncated: List[str] = None,
+                 paragraph_lengths: List[int] = None, clean_body_samples: Dict[str, str] = None):
+        self.title = title
+        self.content_type = content_type
+        self.clean_text = clean_text
+        self.word_count = word_count
+        self.headings = headings
+        self.has_media = has_media
+        self.has_cta = has_cta
+        self.clean_body = clean_body
+        self.paragraph_style = paragraph_style
+        # Limits that cut the document short ([] if none did, None without limits)
+        self.truncated = truncated
+        # Words in each non-empty paragraph, in document order
+        self.paragraph_lengths = paragraph_lengths
+        # Intro, middle and end samples (None unless the analyzer takes them)
+        self.clean_body_samples = clean_body_samples
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """Serialize for the document cache"""
+        return dict(self.__dict__)
+    
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'ParsedDocument':
+        """Rebuild a document serialized with to_dict"""
+        return cls(**data)
+
+@dataclass(slots=True)
+class AnalysisResult:
+    """Analysis of one page for one keyword set; to_dict() gives the API shape"""
+    
+    url: str
+    title: str
+    content_type: str
+    word_count: int
+    headings: List[str]
+    primary_kw_freq: int
+    related_kw_freq: Dict[str, int]
+    has_media: bool
+    has_cta: bool
+    clean_body: str
+    keyword_placement: Dict[str, Any]
+    paragraph_style: Dict[str, Any]
+    # Limits that cut the document short ([] if none did, None without limits)
+    truncated: Optional[List[str]] = None
+    # Intro, middle and end samples (None unless the analyzer takes them)
+    clean_body_samples: Optional[Dict[str, str]] = None
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """Result dictionary with the API's key names"""
+        result = {
+            "url": self.url,
+            "title": self.title,
+            "type": self.content_type,
+            "wordCount": self.word_count,
+            "headings": self.headings,
+            "primaryKWfreq": self.primary_kw_freq,
+            "relatedKWfreq": self.related_kw_freq,
+            "hasMedia": self.has_media,
+            "hasCTA": self.has_cta,
+            "cleanBody": self.clean_body,
+            "keywordPlacement": self.keyword_placement,
+            "paragraphStyle": self.paragraph_style
+        }
+        
+        if self.clean_body_samples is not None:
+            result["cleanBodySamples"] = dict(self.clean_body_samples)
+        
+        # Only analyzers with limits report truncation
+        if self.truncated is not None:
+            result["truncated"] = bool(self.truncated)
+            if self.truncated:
+                result["truncation"] = list(self.truncated)
+        
+        return result
+
 
 class SEOAnalyzer:
     """SEO and content marketing metrics analyzer"""
     
-    def __init__(self):
-        self.logger = logging.getLogger(__name__)
+    # Parsing backends that produce identical results
+    BACKENDS = ['bs4', 'lxml', 'stream']
+    
+    def __init__(self, backend: str = 'bs4', cache: ResultCache = None, document_cache: ResultCache = None,
+                 rules: RuleTable = None, profile: bool = False, limits: AnalysisLimits = None, stage_workers: int = 0,
+                 sample_length: int = 500, body_samples: bool = False):
+        """
+        Args:
+            backend: 'bs4' to walk a BeautifulSoup tree, 'lxml' to query
+                lxml directly with compiled XPath selectors, or 'stream' to
+                scan lxml parser events without building a tree
+            cache: Optional result cache consulted before parsing
+            document_cache: Optional cache of parsed documents, reused across
+                keyword sets for the same HTML
+            rules: Precompiled boilerplate, media, CTA and sample rules,
+                defaults to DEFAULT_RULES
+            profile: Attach per-stage timings to every result under `_timings`
+            limits: Optional size limits; results then carry a `truncated` flag
+            stage_workers: Threads that run independent stages concurrently
+                (0 runs them in turn on the calling thread)
+            sample_length: Maximum length of the clean body sample
+            body_samples: Also sample the middle and end of the text
+                (`cleanBodySamples`)
+        """
+        if backend not in self.BACKENDS:
+            raise ValueError(f"Unknown backend '{backend}', expected one of {self.BACKENDS}")
         
-        # Common CTA patterns
-        self.cta_patterns = [
-            r'\b(buy\s+now|purchase|order\s+now|get\s+started|sign\s+up|subscribe|download|learn\s+more|contact\s+us|call\s+now|book\s+now|try\s+free|free\s+trial|get\s+quote)\b',
-            r'\b(click\s+here|read\s+more|view\s+more|see\s+more|shop\s+now|add\s+to\s+cart|checkout|register|join\s+now|apply\s+now)\b'
+        self.logger = logging.getLogger(__name__)
+        self.backend = backend
+        self.cache = cache
+        self.document_cache = document_cache
+        self.rules = rules or DEFAULT_RULES
+        self.profile = profile
+        self.limits = limits
+        
+        # Cached results depend on the rules they were computed with
+        self.cache_version = f"{ANALYZER_VERSION}:{self.rules.fingerprint}"
+        if limits is not None:
+            self.cache_version += f":{limits.fingerprint}"
+        if sample_length != 500 or body_samples:
+            self.cache_version += f":sample-{sample_length}{'-multi' if body_samples else ''}"
+        
+        # Clean body samples stop reading the text once they are full
+        self.body_sampler = BodySampler(self.rules.skip_pattern, sample_length)
+        self.body_samples = body_samples
+        
+        # Single-pass scanner feeding the metric functions
+        self.scanner = self._create_scanner()
+        
+        # Site templates are matched on lxml trees, created on first use
+        self.site_scanner = self.scanner if backend == 'lxml' else None
+        
+        # Stages declare what they read, so independent ones can run concurrently
+        self.stage_executor = ThreadPoolExecutor(max_workers=stage_workers, thread_name_prefix='seo-stage') if stage_workers else None
+        
+        # Keyword-independent stages, fed with the HTML
+        clean_text = 'clean_text' if limits is None else 'extracted_text'
+        document_stages = [
+            Stage('_scan', self._scan, ('html', 'template'), 'scan'),
+            Stage('_extract_title', self._extract_title, ('scan',), 'title'),
+            Stage('_determine_content_type', self._determine_content_type, ('scan', 'title'), 'content_type'),
+            Stage('_extract_clean_text', self._extract_clean_text, ('scan',), clean_text),
+            Stage('_count_words', self._count_words, ('clean_text',), 'word_count'),
+            Stage('_extract_headings', self._extract_headings, ('scan',), 'headings'),
+            Stage('_detect_media', self._detect_media, ('scan',), 'has_media'),
+            Stage('_detect_cta', self._detect_cta, ('scan', 'clean_text'), 'has_cta'),
+            Stage('_generate_clean_body_sample', self._generate_clean_body_sample, ('clean_text',), 'clean_body'),
+            Stage('_measure_paragraphs', self._measure_paragraphs, ('scan',), 'paragraph_lengths'),
+            Stage('_analyze_paragraph_style', self._analyze_paragraph_style, ('scan', 'paragraph_lengths'), 'paragraph_style'),
         ]
-        
-        # Media element tags
-        self.media_tags = ['img', 'video', 'audio', 'iframe', 'embed', 'object']
+        if body_samples:
+            document_stages.append(Stage('_generate_clean_body_samples', self._generate_clean_body_samples,
+                                         ('clean_text', 'clean_body'), 'clean_body_samples'))
+        if limits is not None:
+            document_stages.append(Stage('limit_text', limits.limit_text, ('extracted_text',), 'clean_text'))
+        self.document_pipeline = Pipeline(document_stages)
+        
+        # Keyword stages, fed with the keywords and a parsed document; the
+        # text is lowercased once for counting and placement
+        self.keyword_pipeline = Pipeline([
+            Stage('text_model', TextModel, ('title', 'headings', 'clean_text'), 'text_model'),
+            Stage('compile_keyword_index', compile_keyword_index, ('keywords',), 'keyword_index'),
+            Stage('keyword_index', self._count_keywords, ('keyword_index', 'text_model'), 'keyword_counts'),
+            Stage('_count_keyword_frequency', self._count_keyword_frequency, ('keyword_counts', 'primary_keyword'), 'primary_kw_freq'),
+            Stage('_count_related_keywords', self._count_related_keywords, ('keyword_counts', 'related_keywords'), 'related_kw_freq'),
+            Stage('_analyze_keyword_placement', self._analyze_keyword_placement, ('primary_keyword', 'text_model'), 'keyword_placement'),
+        ])
     
-    def analyze(self, html_content: str, url: str = '', primary_keyword: str = '', related_keywords: List[str] = None) -> Dict[str, Any]:
+    def analyze(self, html_content: str, url: str = '', primary_keyword: str = '', related_keywords: List[str] = None,
+                profile: bool = None, template: SiteTemplate = None) -> Dict[str, Any]:
         """
         Analyze HTML content and return SEO metrics
         
@@ -28,60 +200,46 @@ class SEOAnalyzer:
             url: URL of the page (optional)
             primary_keyword: Primary keyword to search for
             related_keywords: List of related keywords to analyze
+            profile: Attach per-stage timings under `_timings`, defaults to
+                the analyzer's setting
+            template: Optional template of the page's site, whose blocks are
+                stripped instead of applying the class/id boilerplate rules
             
         Returns:
             Dictionary containing SEO analysis results
         """
         if related_keywords is None:
             related_keywords = []
+        if profile is None:
+            profile = self.profile
+        profiler = StageProfiler() if profile else NULL_PROFILER
+        
+        # Identical requests are served from the cache without parsing
+        cache_key = None
+        if self.cache is not None and self.cache.enabled:
+            cache_key = self.cache.make_key(html_content, url, primary_keyword, related_keywords, self._cache_version(template))
+            if cache_key is not None:
+                cached = profiler.call('cache_lookup', self.cache.get, cache_key)
+                if cached is not None:
+                    # The key ignores keyword order, so restore the caller's
+                    cached["relatedKWfreq"] = {keyword: cached["relatedKWfreq"][keyword] for keyword in related_keywords if keyword}
+                    if profile:
+                        cached["_timings"] = self._timings(profiler, html_content, primary_keyword, related_keywords)
+                    return cached
         
         try:
-            # Parse HTML with BeautifulSoup
-            soup = BeautifulSoup(html_content, 'lxml')
-            
-            # Extract basic information
-            title = self._extract_title(soup)
-            content_type = self._determine_content_type(soup, title)
+            # Keyword-independent stage (cached by content hash)
+            document = self.parse(html_content, profiler, template)
             
-            # Clean and extract text content
-            clean_text = self._extract_clean_text(soup)
-            word_count = self._count_words(clean_text)
+            # Keyword stage
+            result = self.analyze_document(document, url, primary_keyword, related_keywords, profiler)
             
-            # Extract headings
-            headings = self._extract_headings(soup)
+            if cache_key is not None:
+                self.cache.put(cache_key, result)
             
-            # Analyze keywords
-            primary_kw_freq = self._count_keyword_frequency(clean_text, primary_keyword)
-            related_kw_freq = self._count_related_keywords(clean_text, related_keywords)
-            
-            # Detect media and CTAs
-            has_media = self._detect_media(soup)
-            has_cta = self._detect_cta(soup, clean_text)
-            
-            # Generate clean body sample
-            clean_body = self._generate_clean_body_sample(clean_text)
-            
-            # Analyze keyword placement
-            keyword_placement = self._analyze_keyword_placement(soup, primary_keyword, title, headings, clean_text)
-            
-            # Analyze paragraph style
-            paragraph_style = self._analyze_paragraph_style(soup)
-            
-            # Build result
-            result = {
-                "url": url,
-                "title": title,
-                "type": content_type,
-                "wordCount": word_count,
-                "headings": headings,
-                "primaryKWfreq": primary_kw_freq,
-                "relatedKWfreq": related_kw_freq,
-                "hasMedia": has_media,
-                "hasCTA": has_cta,
-                "cleanBody": clean_body,
-                "keywordPlacement": keyword_placement,
-                "paragraphStyle": paragraph_style
-            }
+            # Timings describe this call only, so they are never cached
+            if profile:
+                result["_timings"] = self._timings(profiler, html_content, primary_keyword, related_keywords)
             
             return result
             
@@ -89,26 +247,200 @@ class SEOAnalyzer:
             self.logger.error(f"Error analyzing HTML: {str(e)}")
             raise
     
-    def _extract_title(self, soup: BeautifulSoup) -> str:
+    def analyze_keyword_sets(self, html_content: str, url: str, keyword_sets: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Analyze one HTML document against several keyword sets
+        
+        Args:
+            html_content: Raw HTML source code
+            url: URL of the page (optional)
+            keyword_sets: Dictionaries with primaryKeyword and relatedKeywords
+            
+        Returns:
+            One analysis result per keyword set, in order
+        """
+        document = self.parse(html_content)
+        
+        # Lowercase the text once for all keyword sets
+        text_model = TextModel(document.title, document.headings, document.clean_text)
+        
+        return [
+            self.analyze_document(
+                document,
+                url,
+                keyword_set.get('primaryKeyword', ''),
+                keyword_set.get('relatedKeywords') or [],
+                text_model=text_model
+            )
+            for keyword_set in keyword_sets
+        ]
+    
+    def parse(self, html_content: str, profiler: StageProfiler = NULL_PROFILER, template: SiteTemplate = None) -> ParsedDocument:
+        """Run the keyword-independent analysis stages on HTML (see analyze for template)"""
+        cache_key = None
+        if self.document_cache is not None and self.document_cache.enabled:
+            cache_key = self.document_cache.make_document_key(html_content, self._cache_version(template))
+            if cache_key is not None:
+                cached = profiler.call('document_cache_lookup', self.document_cache.get, cache_key)
+                if cached is not None:
+                    return ParsedDocument.from_dict(cached)
+        
+        document, _ = self.parse_values(html_content, profiler, template)
+        
+        if cache_key is not None:
+            self.document_cache.put(cache_key, document.to_dict())
+        
+        return document
+    
+    def parse_values(self, html_content: str, profiler: StageProfiler = NULL_PROFILER, template: SiteTemplate = None,
+                     pipeline: Pipeline = None, inputs: Dict[str, Any] = None) -> Tuple[ParsedDocument, Dict[str, Any]]:
+        """
+        Parse without the document cache, returning every pipeline value too
+        
+        Args:
+            pipeline: Replaces document_pipeline, e.g. with some of its stages
+                swapped for ones that reuse earlier work (IncrementalAnalyzer)
+            inputs: Extra inputs the replacement pipeline requires
+        """
+        # Enforce size limits before parsing (bounded mode cuts the HTML short)
+        truncated = None
+        if self.limits is not None:
+            html_content, truncated = profiler.call('limit_html', self.limits.limit_html, html_content)
+        
+        # Parse HTML once, then run every stage on the read-only scan
+        values = (pipeline or self.document_pipeline).run({'html': html_content, 'template': template, **(inputs or {})},
+                                                          profiler, self.stage_executor)
+        if self.limits is not None and len(values['clean_text']) < len(values['extracted_text']):
+            truncated.append("maxTextLength")
+        
+        document = ParsedDocument(
+            title=values['title'],
+            content_type=values['content_type'],
+            clean_text=values['clean_text'],
+            word_count=values['word_count'],
+            headings=values['headings'],
+            has_media=values['has_media'],
+            has_cta=values['has_cta'],
+            clean_body=values['clean_body'],
+            paragraph_style=values['paragraph_style'],
+            truncated=truncated,
+            paragraph_lengths=values['paragraph_lengths'],
+            clean_body_samples=values.get('clean_body_samples')
+        )
+        
+        return document, values
+    
+    def analyze_document(self, document: ParsedDocument, url: str = '', primary_keyword: str = '', related_keywords: List[str] = None,
+                         profiler: StageProfiler = NULL_PROFILER, keyword_counts: Dict[str, int] = None,
+                         text_model: TextModel = None) -> Dict[str, Any]:
+        """Run the keyword stage on a parsed document and build the result
+        
+        keyword_counts, keyed by normalized keyword, can be passed in when the
+        caller already counted the keywords in the document's clean text, and
+        text_model when it analyzes the same document for several keyword sets.
+        """
+        if related_keywords is None:
+            related_keywords = []
+        
+        # Analyze keywords (all counted in one pass over the text) and their placement
+        inputs = {
+            'keywords': (primary_keyword, *related_keywords),
+            'primary_keyword': primary_keyword,
+            'related_keywords': related_keywords,
+            'title': document.title,
+            'headings': document.headings,
+            'clean_text': document.clean_text
+        }
+        if keyword_counts is not None:
+            inputs['keyword_counts'] = keyword_counts
+        if text_model is not None:
+            inputs['text_model'] = text_model
+        values = self.keyword_pipeline.run(inputs, profiler, self.stage_executor)
+        
+        # Build result
+        result = AnalysisResult(
+            url=url,
+            title=document.title,
+            content_type=document.content_type,
+            word_count=document.word_count,
+            headings=list(document.headings),
+            primary_kw_freq=values['primary_kw_freq'],
+            related_kw_freq=values['related_kw_freq'],
+            has_media=document.has_media,
+            has_cta=document.has_cta,
+            clean_body=document.clean_body,
+            keyword_placement=values['keyword_placement'],
+            paragraph_style=dict(document.paragraph_style),
+            truncated=document.truncated,
+            clean_body_samples=document.clean_body_samples
+        )
+        
+        return result.to_dict()
+    
+    def page_blocks(self, html_content: str) -> Set[Block]:
+        """Candidate site template blocks of one page, for SiteTemplate.learn"""
+        if self.limits is not None:
+            html_content, _ = self.limits.limit_html(html_content)
+        root = self._get_site_scanner().parse(html_content)
+        return page_blocks(root) if root is not None else set()
+    
+    def _cache_version(self, template: Optional[SiteTemplate]) -> str:
+        """Cache version of results computed with a site template"""
+        if template is None:
+            return self.cache_version
+        return f"{self.cache_version}:site-{template.fingerprint}"
+    
+    def _timings(self, profiler: StageProfiler, html_content: str, primary_keyword: str, related_keywords: List[str]) -> Dict[str, Any]:
+        """Summarize a profiled call for the `_timings` key"""
+        document_bytes = len(html_content.encode('utf-8', 'surrogatepass')) if isinstance(html_content, str) else None
+        keyword_count = sum(1 for keyword in [primary_keyword, *related_keywords] if keyword)
+        return profiler.to_dict(document_bytes, keyword_count)
+    
+    def _create_scanner(self):
+        """Build the configured backend, importing only its modules
+        
+        BeautifulSoup alone takes longer to import than the rest of the
+        analyzer, and analyzers on the lxml or stream backend never need it.
+        """
+        if self.backend == 'lxml':
+            from lxml_backend import LXMLScanner
+            return LXMLScanner(rules=self.rules)
+        if self.backend == 'stream':
+            from stream_backend import StreamScanner
+            return StreamScanner(rules=self.rules)
+        from dom_walker import DOMWalker
+        return DOMWalker(rules=self.rules)
+    
+    def _get_site_scanner(self):
+        if self.site_scanner is None:
+            from lxml_backend import LXMLScanner
+            self.site_scanner = LXMLScanner(rules=self.rules)
+        return self.site_scanner
+    
+    def _scan(self, html_content: str, template: SiteTemplate = None) -> PageScan:
+        """Parse HTML with the configured backend, or with lxml to match a site template"""
+        if template is not None:
+            return self._get_site_scanner().scan(html_content, template)
+        return self.scanner.scan(html_content)
+    
+    def _extract_title(self, scan: PageScan) -> str:
         """Extract page title"""
-        title_tag = soup.find('title')
-        if title_tag:
-            return title_tag.get_text().strip()
+        if scan.title_text is not None:
+            return scan.title_text.strip()
         
         # Fallback to h1 if no title tag
-        h1_tag = soup.find('h1')
-        if h1_tag:
-            return h1_tag.get_text().strip()
+        if scan.h1_text is not None:
+            return scan.h1_text.strip()
         
         return "No title found"
     
-    def _determine_content_type(self, soup: BeautifulSoup, title: str) -> str:
+    def _determine_content_type(self, scan: PageScan, title: str) -> str:
         """Determine content type based on page structure and title"""
         # Check for common patterns in title and content
         title_lower = title.lower()
         
         # Check for blog/article indicators
-        if soup.find('article') or soup.find('time') or soup.find(attrs={'class': re.compile(r'blog|post|article', re.I)}):
+        if scan.has_article_markup:
             return "blog"
         
         # Check for product page indicators
@@ -120,74 +452,20 @@ class SEOAnalyzer:
             return "service"
         
         # Check for landing page indicators
-        if soup.find('form') and any(keyword in title_lower for keyword in ['signup', 'register', 'get started']):
+        if scan.has_form_markup and any(keyword in title_lower for keyword in ['signup', 'register', 'get started']):
             return "landing"
         
         # Default to informational
         return "informational"
     
-    def _extract_clean_text(self, soup: BeautifulSoup) -> str:
+    def _extract_clean_text(self, scan: PageScan) -> str:
         """Extract clean text content focusing on main article content"""
-        # Find the body tag, if it doesn't exist, use the whole document
-        body = soup.find('body')
-        if not body:
-            body = soup
-        
-        # Remove script and style elements from body
-        for script in body(["script", "style", "noscript"]):
-            script.decompose()
-        
-        # Remove comments from body
-        for comment in body.find_all(string=lambda text: isinstance(text, Comment)):
-            comment.extract()
-        
-        # Remove hidden elements from body
-        for hidden in body.find_all(attrs={'style': re.compile(r'display\s*:\s*none', re.I)}):
-            hidden.decompose()
-        
-        # Remove common navigation and non-content elements
-        for elem in body.find_all(['nav', 'header', 'footer', 'aside']):
-            elem.decompose()
-        
-        # Remove elements with common non-content class names
-        for elem in body.find_all(attrs={'class': re.compile(r'nav|menu|sidebar|footer|header|ad|advertisement|banner|social|share|comment|related|breadcrumb', re.I)}):
-            elem.decompose()
-        
-        # Remove elements with common non-content IDs
-        for elem in body.find_all(attrs={'id': re.compile(r'nav|menu|sidebar|footer|header|ad|advertisement|banner|social|share|comment|related|breadcrumb', re.I)}):
-            elem.decompose()
-        
-        # Try to find main content area first
-        main_content = None
-        
-        # Look for semantic HTML5 main content
-        main_content = body.find('main')
-        if not main_content:
-            main_content = body.find('article')
-        
-        # Look for common content container classes
-        if not main_content:
-            for class_name in ['content', 'main-content', 'post-content', 'entry-content', 'article-content', 'page-content']:
-                main_content = body.find(attrs={'class': re.compile(class_name, re.I)})
-                if main_content:
-                    break
-        
-        # Look for common content container IDs
-        if not main_content:
-            for id_name in ['content', 'main-content', 'post-content', 'entry-content', 'article-content', 'page-content']:
-                main_content = body.find(attrs={'id': re.compile(id_name, re.I)})
-                if main_content:
-                    break
-        
-        # If no main content found, use body but try to filter out obvious non-content
-        if not main_content:
-            main_content = body
-        
-        # Get text content with better spacing from main content area
-        text = main_content.get_text(separator=' ', strip=True)
+        # The walker already skipped scripts, hidden elements, navigation and
+        # other non-content blocks, and picked the main content area
+        text = scan.main_text
         
         # Clean up whitespace but preserve sentence structure
-        text = re.sub(r'\s+', ' ', text)
+        text = WHITESPACE_PATTERN.sub(' ', text)
         text = text.strip()
         
         return text
@@ -198,242 +476,109 @@ class SEOAnalyzer:
         words = [word for word in text.split() if word.strip()]
         return len(words)
     
-    def _extract_headings(self, soup: BeautifulSoup) -> List[str]:
+    def _extract_headings(self, scan: PageScan) -> List[str]:
         """Extract all headings from HTML"""
         headings = []
         
-        # Find all heading tags (h1-h6)
-        for i in range(1, 7):
-            heading_tags = soup.find_all(f'h{i}')
-            for tag in heading_tags:
-                heading_text = tag.get_text().strip()
-                if heading_text:
-                    headings.append(heading_text)
+        # Group headings by level (h1-h6), keeping document order within a level
+        for level, heading_text in sorted(scan.headings, key=lambda heading: heading[0]):
+            heading_text = heading_text.strip()
+            if heading_text:
+                headings.append(heading_text)
         
         return headings
     
-    def _count_keyword_frequency(self, text: str, keyword: str) -> int:
-        """Count frequency of primary keyword (case-insensitive)"""
+    def _count_keywords(self, keyword_index: KeywordIndex, text_model: TextModel) -> Dict[str, int]:
+        """Count all keywords in the lowercased clean text"""
+        return keyword_index.count_lowered(text_model.body)
+    
+    def _count_keyword_frequency(self, keyword_counts: Dict[str, int], keyword: str) -> int:
+        """Look up frequency of primary keyword (case-insensitive)"""
         if not keyword:
             return 0
         
-        keyword = keyword.strip().lower()
-        text = text.lower()
-        
-        # Handle multi-word keywords differently
-        if ' ' in keyword:
-            # For multi-word keywords, use simple substring matching
-            return text.count(keyword)
-        else:
-            # For single words, use word boundary matching
-            pattern = r'\b' + re.escape(keyword) + r'\b'
-            matches = re.findall(pattern, text)
-            return len(matches)
-    
-    def _count_related_keywords(self, text: str, keywords: List[str]) -> Dict[str, int]:
-        """Count frequency of related keywords"""
+        return keyword_counts[normalize_keyword(keyword)]
+    
+    def _count_related_keywords(self, keyword_counts: Dict[str, int], keywords: List[str]) -> Dict[str, int]:
+        """Look up frequency of related keywords"""
         result = {}
         
         for keyword in keywords:
             if keyword:
-                frequency = self._count_keyword_frequency(text, keyword)
-                result[keyword] = frequency
+                result[keyword] = keyword_counts[normalize_keyword(keyword)]
         
         return result
     
-    def _detect_media(self, soup: BeautifulSoup) -> bool:
+    def _detect_media(self, scan: PageScan) -> bool:
         """Detect presence of media elements"""
-        # Check for media tags
-        for tag in self.media_tags:
-            if soup.find(tag):
-                return True
-        
-        # Check for common media class names
-        media_classes = soup.find_all(attrs={'class': re.compile(r'media|image|video|audio|gallery', re.I)})
-        if media_classes:
-            return True
-        
-        return False
+        return scan.has_media
     
-    def _detect_cta(self, soup: BeautifulSoup, text: str) -> bool:
+    def _detect_cta(self, scan: PageScan, text: str) -> bool:
         """Detect presence of call-to-action elements"""
         # Check for forms
-        if soup.find('form'):
+        if scan.has_form:
             return True
         
         # Check for buttons
-        buttons = soup.find_all(['button', 'input'])
-        for button in buttons:
-            if button.get('type') in ['submit', 'button'] or button.name == 'button':
-                return True
+        if scan.has_button:
+            return True
         
-        # Check for links with CTA-like text
-        links = soup.find_all('a')
-        for link in links:
-            link_text = link.get_text().strip().lower()
-            href = link.get('href', '')
+        # Check for links with CTA-like text (all phrases in one pattern)
+        cta_pattern = self.rules.cta_pattern
+        for link_text, href in scan.links:
+            link_text = link_text.strip().lower()
             
             # Check for mailto links
             if href.startswith('mailto:'):
                 return True
             
             # Check for CTA patterns in link text
-            for pattern in self.cta_patterns:
-                if re.search(pattern, link_text, re.IGNORECASE):
-                    return True
-        
-        # Check for CTA patterns in general text
-        for pattern in self.cta_patterns:
-            if re.search(pattern, text, re.IGNORECASE):
+            if cta_pattern.search(link_text):
                 return True
         
-        return False
-    
-    def _generate_clean_body_sample(self, text: str, max_length: int = 500) -> str:
-        """Generate a clean body text sample for analysis, focusing on article content"""
-        # Remove extra whitespace and normalize
-        text = re.sub(r'\s+', ' ', text).strip()
-        
-        # Try to identify and skip common non-article content at the beginning
-        sentences = text.split('.')
-        filtered_sentences = []
-        
-        for sentence in sentences:
-            sentence = sentence.strip()
-            if not sentence:
-                continue
-                
-            # Skip very short sentences that might be navigation or metadata
-            if len(sentence) < 15:
-                continue
-                
-            # Skip sentences that look like navigation or metadata
-            skip_patterns = [
-                r'home\s*>\s*',  # breadcrumbs
-                r'posted\s+(on|by)',  # post metadata
-                r'share\s+(on|this)',  # social sharing
-                r'follow\s+us',  # social follow
-                r'subscribe\s+to',  # subscription
-                r'advertisement',  # ads
-                r'sponsored',  # sponsored content
-                r'continue\s+reading',  # read more links
-                r'related\s+(articles|posts)',  # related content
-                r'comment\s*\(',  # comment counts
-                r'tags?\s*:',  # tags
-                r'categories?\s*:',  # categories
-            ]
-            
-            sentence_lower = sentence.lower()
-            should_skip = any(re.search(pattern, sentence_lower) for pattern in skip_patterns)
-            
-            if not should_skip:
-                filtered_sentences.append(sentence)
-        
-        # Rejoin the filtered sentences
-        if filtered_sentences:
-            text = '. '.join(filtered_sentences)
-            if not text.endswith('.'):
-                text += '.'
-        
-        # Remove extra whitespace again
-        text = re.sub(r'\s+', ' ', text).strip()
-        
-        # If text is shorter than max_length, return complete text
-        if len(text) <= max_length:
-            return text
-        
-        # For longer text, find a good breaking point
-        truncated = text[:max_length]
-        
-        # Try to break at sentence end
-        last_period = truncated.rfind('.')
-        last_exclamation = truncated.rfind('!')
-        last_question = truncated.rfind('?')
-        
-        best_break = max(last_period, last_exclamation, last_question)
-        
-        # If we found a good sentence break point, use it
-        if best_break > max_length * 0.7:
-            return truncated[:best_break + 1].strip()
-        
-        # Otherwise, break at last space and add ellipsis
-        last_space = truncated.rfind(' ')
-        if last_space > 0:
-            return truncated[:last_space].strip() + "..."
+        # Check for CTA patterns in general text
+        return cta_pattern.search(text) is not None
+    
+    def _generate_clean_body_sample(self, text: str, max_length: int = None) -> str:
+        """Generate a clean body text sample for analysis, focusing on article content
         
-        return truncated + "..."
+        Sentences are read from the start of the text only until the sample
+        (sample_length characters unless max_length is given) is full.
+        """
+        sampler = self.body_sampler
+        if max_length is not None and max_length != sampler.max_length:
+            sampler = BodySampler(self.rules.skip_pattern, max_length)
+        return sampler.intro(text)
+    
+    def _generate_clean_body_samples(self, text: str, clean_body: str) -> Dict[str, str]:
+        """Sample the intro (the clean body), middle and end of the text"""
+        return self.body_sampler.samples(text, intro=clean_body)
     
-    def _analyze_keyword_placement(self, soup: BeautifulSoup, keyword: str, title: str, headings: List[str], text: str) -> Dict[str, Any]:
+    def _analyze_keyword_placement(self, keyword: str, text_model: TextModel) -> Dict[str, Any]:
         """Analyze keyword placement in different sections"""
-        if not keyword:
-            return {
-                "inTitle": False,
-                "inHeadings": False,
-                "inIntro": False,
-                "inBody": False,
-                "placement": []
-            }
-        
-        keyword_lower = keyword.lower()
-        placement = []
-        
-        # Check title
-        in_title = keyword_lower in title.lower()
-        if in_title:
-            placement.append("title")
-        
-        # Check headings
-        in_headings = any(keyword_lower in heading.lower() for heading in headings)
-        if in_headings:
-            placement.append("headings")
-        
-        # Check intro (first 200 characters of body text)
-        intro_text = text[:200].lower()
-        in_intro = keyword_lower in intro_text
-        if in_intro:
-            placement.append("intro")
-        
-        # Check body content
-        in_body = keyword_lower in text.lower()
-        if in_body and not in_intro:
-            placement.append("body")
-        
-        return {
-            "inTitle": in_title,
-            "inHeadings": in_headings,
-            "inIntro": in_intro,
-            "inBody": in_body,
-            "placement": placement
-        }
+        return text_model.placement(keyword)
     
-    def _analyze_paragraph_style(self, soup: BeautifulSoup) -> Dict[str, Any]:
-        """Analyze paragraph style and structure"""
-        # Find body tag
-        body = soup.find('body')
-        if not body:
-            body = soup
-        
-        # Find all paragraphs
-        paragraphs = body.find_all('p')
-        
-        # Calculate paragraph lengths
+    def _measure_paragraphs(self, scan: PageScan) -> List[int]:
+        """Count the words of each paragraph"""
         paragraph_lengths = []
-        for p in paragraphs:
-            text = p.get_text().strip()
+        for text in scan.paragraphs:
+            text = text.strip()
             if text:  # Only count non-empty paragraphs
                 words = len(text.split())
                 paragraph_lengths.append(words)
         
+        return paragraph_lengths
+    
+    def _analyze_paragraph_style(self, scan: PageScan, paragraph_lengths: List[int]) -> Dict[str, Any]:
+        """Analyze paragraph style and structure"""
         # Calculate average paragraph length
         avg_length = sum(paragraph_lengths) / len(paragraph_lengths) if paragraph_lengths else 0
         
         # Check for bullet points and lists
-        bullet_lists = body.find_all(['ul', 'ol'])
-        has_bullets = len(bullet_lists) > 0
+        has_bullets = scan.list_count > 0
         
         # Count list items
-        list_items = body.find_all('li')
-        bullet_count = len(list_items)
+        bullet_count = scan.list_item_count
         
         # Analyze paragraph distribution
         short_paragraphs = sum(1 for length in paragraph_lengths if length < 20)
@@ -448,5 +593,5 @@ class SEOAnalyzer:
             "longParagraphs": long_paragraphs,
             "hasBullets": has_bullets,
             "bulletCount": bullet_count,
-            "listTypes": len(bullet_lists)
+            "listTypes": scan.list_count
         }
@@ -0,0 +1,123 @@
+import gzip
+import json
+from typing import Dict, List, Any, Optional
+
+# Faster encoders and zstd compression are used when installed
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+JSON_TYPE = 'application/json'
+MSGPACK_TYPE = 'application/msgpack'
+COLUMNAR_TYPE = 'application/vnd.seo-analyzer.columnar+json'
+
+# Objects with fixed keys that become one column per key in the columnar format
+FLATTENED_FIELDS = ('keywordPlacement', 'paragraphStyle', 'cleanBodySamples')
+
+# Smaller bodies are sent uncompressed
+MIN_COMPRESS_BYTES = 1024
+
+GZIP_LEVEL = 5
+ZSTD_LEVEL = 3
+
+
+def response_types() -> List[str]:
+    """Media types the API can produce, in order of preference"""
+    types = [JSON_TYPE]
+    if msgpack is not None:
+        types.extend([MSGPACK_TYPE, 'application/x-msgpack'])
+    types.append(COLUMNAR_TYPE)
+    return types
+
+
+def response_encodings() -> List[str]:
+    """Content codings the API can produce, in order of preference"""
+    return ['zstd', 'gzip'] if zstandard is not None else ['gzip']
+
+
+def encode(payload: Any, media_type: str = JSON_TYPE) -> bytes:
+    """Encode a response payload as one of response_types()"""
+    if media_type == COLUMNAR_TYPE:
+        payload = to_columns(payload)
+    elif media_type in (MSGPACK_TYPE, 'application/x-msgpack'):
+        return msgpack.packb(payload, use_bin_type=True)
+    return encode_json(payload)
+
+
+def encode_json(payload: Any) -> bytes:
+    """Compact UTF-8 JSON, with orjson when it is installed"""
+    if orjson is not None:
+        try:
+            return orjson.dumps(payload)
+        except TypeError:
+            # Lone surrogates and integers over 64 bits, which json handles
+            pass
+    return json.dumps(payload, separators=(',', ':')).encode('ascii')
+
+
+def compress(body: bytes, encoding: Optional[str]) -> bytes:
+    """Apply a content coding from response_encodings() (None leaves the body as it is)"""
+    if encoding == 'zstd':
+        return zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(body)
+    if encoding == 'gzip':
+        return gzip.compress(body, compresslevel=GZIP_LEVEL)
+    return body
+
+
+def to_columns(payload: Any) -> Dict[str, Any]:
+    """Columnar form of analysis results: one array per field instead of one object per result
+
+    Takes a single result, a list of results or a {"results": [...]}
+    payload, whose other keys (e.g. the per-site summary under "sites") are
+    kept as they are next to the columns. Objects with fixed keys
+    (FLATTENED_FIELDS) are split into dotted columns such as
+    "paragraphStyle.avgParagraphLength", so key names appear once per
+    response rather than once per result. Fields a result lacks (errors,
+    optional flags) are null in its row.
+    """
+    extra = {}
+    if isinstance(payload, dict) and isinstance(payload.get('results'), list):
+        results = payload['results']
+        extra = {key: value for key, value in payload.items() if key != 'results'}
+    elif isinstance(payload, dict):
+        results = [payload]
+    else:
+        results = payload
+
+    columns: Dict[str, List[Any]] = {}
+    for row, result in enumerate(results):
+        if not isinstance(result, dict):
+            result = {"error": "Result is not an object"}
+        for key, value in result.items():
+            if key in FLATTENED_FIELDS and isinstance(value, dict):
+                for field, field_value in value.items():
+                    _column(columns, f"{key}.{field}", row).append(field_value)
+            else:
+                _column(columns, key, row).append(value)
+
+    # Pad the columns of fields missing from the last rows
+    for column in columns.values():
+        column.extend([None] * (len(results) - len(column)))
+
+    return {**extra, "count": len(results), "columns": columns}
+
+
+def _column(columns: Dict[str, List[Any]], name: str, row: int) -> List[Any]:
+    """The named column, padded with nulls up to row"""
+    column = columns.get(name)
+    if column is None:
+        column = columns[name] = []
+    if len(column) < row:
+        column.extend([None] * (row - len(column)))
+    return column
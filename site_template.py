@@ -0,0 +1,209 @@
+import hashlib
+from math import ceil
+from urllib.parse import urlparse
+from lxml import etree
+from typing import Dict, List, Iterable, Optional, Set, Tuple
+
+# Attributes that vary between otherwise identical template blocks (current
+# page highlighting, inline styling), left out of subtree hashes
+VOLATILE_ATTRIBUTES = frozenset(['class', 'style'])
+
+# Strings inside these tags are never page text; script nonces and cache
+# busters would otherwise make every copy of a block unique
+NON_TEXT_TAGS = frozenset(['script', 'style', 'template', 'rt', 'rp'])
+
+# Never treated as template blocks, even on sites whose pages are identical
+DOCUMENT_TAGS = frozenset(['html', 'head', 'body'])
+
+# A block must hold this many elements or this many text characters; smaller
+# repeats ("Conclusion" headings, "Read more" links) are ordinary content
+MIN_BLOCK_ELEMENTS = 3
+MIN_BLOCK_TEXT = 80
+
+# Element identity checked before hashing a subtree: tag, class and id
+Signature = Tuple[str, str, str]
+
+# A candidate block of one page: signature, subtree hash and the subtree hash
+# of its parent element
+Block = Tuple[Signature, bytes, Optional[bytes]]
+
+
+class _SubtreeHash:
+    """Content hash of an element and everything under it"""
+
+    __slots__ = ('digest', 'elements', 'text_length')
+
+    def __init__(self, digest: bytes, elements: int, text_length: int):
+        self.digest = digest
+        self.elements = elements
+        self.text_length = text_length
+
+
+def site_key(url: str) -> str:
+    """The site a page belongs to: its lowercased network location"""
+    return urlparse(url or '').netloc.lower()
+
+
+def signature(element: etree._Element) -> Signature:
+    return element.tag, element.get('class') or '', element.get('id') or ''
+
+
+def _normalized(text: Optional[str]) -> bytes:
+    return ' '.join(text.split()).encode('utf-8', 'surrogatepass') if text else b''
+
+
+def subtree_hashes(root: etree._Element, memo: Dict[etree._Element, _SubtreeHash] = None) -> Dict[etree._Element, _SubtreeHash]:
+    """
+    Hash every element under root (inclusive), children before parents
+
+    A hash covers the tag, the attributes other than VOLATILE_ATTRIBUTES and
+    the whitespace-normalized text and tails of the whole subtree, so the
+    same navigation, footer or sidebar markup hashes the same on every page
+    of a site. Elements already in memo are not hashed again.
+    """
+    if memo is None:
+        memo = {}
+
+    # In reversed document order every element comes after its descendants
+    for element in reversed(list(root.iter(tag=etree.Element))):
+        if element in memo:
+            continue
+
+        tag = element.tag
+        digest = hashlib.blake2b(digest_size=8)
+        digest.update(tag.encode('utf-8', 'surrogatepass'))
+        for name, value in sorted(element.attrib.items()):
+            if name not in VOLATILE_ATTRIBUTES:
+                digest.update(b'\0%s=%s' % (name.encode('utf-8', 'surrogatepass'), value.encode('utf-8', 'surrogatepass')))
+
+        elements = 1
+        text_length = 0
+        if tag not in NON_TEXT_TAGS:
+            text = _normalized(element.text)
+            digest.update(b'\1' + text)
+            text_length += len(text)
+
+        for child in element:
+            if isinstance(child.tag, str):
+                child_hash = memo[child]
+                digest.update(b'\2' + child_hash.digest)
+                elements += child_hash.elements
+                text_length += child_hash.text_length
+            if tag not in NON_TEXT_TAGS:
+                tail = _normalized(child.tail)
+                digest.update(b'\3' + tail)
+                text_length += len(tail)
+
+        memo[element] = _SubtreeHash(digest.digest(), elements, text_length)
+    return memo
+
+
+def page_blocks(root: etree._Element) -> Set[Block]:
+    """The candidate template blocks of one parsed page"""
+    blocks = set()
+    hashes = subtree_hashes(root)
+    for element, subtree in hashes.items():
+        if element.tag in DOCUMENT_TAGS or not subtree.text_length:
+            continue
+        if subtree.elements >= MIN_BLOCK_ELEMENTS or subtree.text_length >= MIN_BLOCK_TEXT:
+            parent = element.getparent()
+            blocks.add((signature(element), subtree.digest, hashes[parent].digest if parent is not None else None))
+    return blocks
+
+
+class SiteTemplate:
+    """Template blocks (navigation, footers, sidebars) repeated across the pages of one site
+
+    Blocks are learned once per site from the candidate blocks of some of its
+    pages (page_blocks), keeping only the outermost ones, and looked up per
+    page by element signature first, so only elements whose tag, class and id
+    match a learned block get their subtree hashed. Stripping them replaces
+    the per-element class/id regex rules, which both miss site-specific
+    template markup and catch content whose class merely contains a fragment
+    like "ad" ("header", "download").
+    """
+
+    def __init__(self, site: str, blocks: Iterable[Tuple[Signature, bytes]], pages: int = 0):
+        """
+        Args:
+            site: Network location the template was learned for
+            blocks: (signature, subtree hash) pairs of the template blocks
+            pages: Number of distinct pages the blocks were learned from
+        """
+        self.site = site
+        self.pages = pages
+        self.blocks: Dict[Signature, Set[bytes]] = {}
+        for block_signature, digest in blocks:
+            self.blocks.setdefault(block_signature, set()).add(digest)
+        self.tags = sorted({tag for tag, _, _ in self.blocks})
+
+        # Short hash of the blocks, part of cache keys of results that used them
+        fingerprint = hashlib.blake2b(digest_size=8)
+        for block_signature, digests in sorted(self.blocks.items()):
+            fingerprint.update(repr(block_signature).encode('utf-8', 'surrogatepass'))
+            for digest in sorted(digests):
+                fingerprint.update(digest)
+        self.fingerprint = fingerprint.hexdigest()
+
+    def __len__(self) -> int:
+        return sum(len(digests) for digests in self.blocks.values())
+
+    @classmethod
+    def learn(cls, site: str, pages: Iterable[Optional[Set[Block]]], min_pages: int = 2,
+              min_share: float = 0.6) -> 'SiteTemplate':
+        """
+        Keep the blocks found on enough of a site's pages
+
+        Args:
+            site: Network location of the pages
+            pages: page_blocks() of each page (None for pages that failed)
+            min_pages: Minimum number of distinct pages a block must appear on
+            min_share: Minimum share of the distinct pages a block must appear on
+
+        Returns:
+            The template, empty when fewer than min_pages distinct pages were given
+        """
+        counts: Dict[Tuple[Signature, bytes], int] = {}
+        parents: Dict[Tuple[Signature, bytes], Set[Optional[bytes]]] = {}
+        seen = set()
+        for blocks in pages:
+            if not blocks:
+                continue
+
+            # A page repeated in the input votes once
+            key = frozenset(blocks)
+            if key in seen:
+                continue
+            seen.add(key)
+
+            for block_signature, digest, parent in blocks:
+                block = (block_signature, digest)
+                counts[block] = counts.get(block, 0) + 1
+                parents.setdefault(block, set()).add(parent)
+
+        if len(seen) < min_pages:
+            return cls(site, [], len(seen))
+
+        threshold = max(min_pages, ceil(min_share * len(seen)))
+        frequent = [block for block, count in counts.items() if count >= threshold]
+
+        # Blocks only ever found inside other template blocks add nothing
+        digests = {digest for _, digest in frequent}
+        return cls(site, [block for block in frequent if not parents[block] <= digests], len(seen))
+
+    def match(self, scope: etree._Element) -> List[etree._Element]:
+        """The template blocks under scope (exclusive), in document order"""
+        matched = []
+        if not self.blocks:
+            return matched
+
+        # lxml filters by tag in C, so only elements sharing a block's tag
+        # reach Python and only signature matches get hashed
+        memo: Dict[etree._Element, _SubtreeHash] = {}
+        for element in scope.iter(*self.tags):
+            if element is scope:
+                continue
+            digests = self.blocks.get(signature(element))
+            if digests is not None and subtree_hashes(element, memo)[element].digest in digests:
+                matched.append(element)
+        return matched
@@ -0,0 +1,363 @@
+from lxml import etree
+from typing import Iterable, List, Any, Optional, Tuple
+from page_scan import PageScan, HEADING_LEVELS
+from lxml_backend import STRING_CONTAINER_TAGS, PRESERVE_WHITESPACE_TAGS, ASCII_SPACES
+from rules import RuleTable, DEFAULT_RULES
+
+# Characters of HTML handed to the parser per feed() call
+CHUNK_SIZE = 65536
+
+
+class _Element:
+    """Open element on the scanner stack; nothing is kept once it is closed"""
+
+    __slots__ = ('tag', 'removed', 'in_body', 'container', 'preserve', 'ranges', 'text')
+
+    def __init__(self, tag: str, removed: bool, in_body: bool, container: Optional[str], preserve: int):
+        self.tag = tag
+        self.removed = removed
+        self.in_body = in_body
+        # Innermost string container tag (see STRING_CONTAINER_TAGS), if any
+        self.container = container
+        self.preserve = preserve
+        # String ranges closed when the element ends
+        self.ranges: List[List[int]] = []
+        # Slot in a PageScan list (headings, links or paragraphs) that gets
+        # the element's text when it ends, and where that text starts
+        self.text: Optional[Tuple[List[Any], int, Any, int]] = None
+
+
+class _ScanTarget:
+    """lxml parser target that turns start/end/data events into a PageScan
+
+    Mirrors DOMWalker: a stack of open elements carries whether each one is
+    inside a removed (boilerplate) subtree, so suppressed text is dropped as
+    it arrives.
+    """
+
+    def __init__(self, scanner: 'StreamScanner'):
+        self.rules = scanner.rules
+        self.media_tags = scanner.media_tags
+        self.scan = PageScan()
+
+        # Text of every string that survives boilerplate removal, in document order
+        self.strings: List[str] = []
+        self.main: Optional[List[int]] = None
+        self.article: Optional[List[int]] = None
+        self.content_class: Optional[List[int]] = None
+        self.content_id: Optional[List[int]] = None
+        self.body_range: Optional[List[int]] = None
+        # Content containers that are string containers (e.g. <template>):
+        # range, tag and the strings of their own type, which get_text()
+        # yields on them instead of the document text
+        self.captures: List[Tuple[List[int], str, List[str]]] = []
+
+        self.stack: List[_Element] = []
+        self.pending: List[str] = []
+
+        # Unfiltered text of the first <title> and <h1>, while they are open
+        self.title: Optional[List[str]] = None
+        self.h1: Optional[List[str]] = None
+        self.title_depth = 0
+        self.h1_depth = 0
+
+        # Whether boilerplate removal applies before <body> depends on
+        # whether the document has a body at all, so events before it are
+        # held back (usually just the <head>)
+        self.prelude: Optional[List[Tuple[str, Any, Any]]] = []
+        self.document_in_body = False
+
+    # Parser target interface
+
+    def start(self, tag: str, attrib: Any):
+        if self.prelude is not None:
+            if tag != 'body':
+                self.prelude.append(('start', tag, dict(attrib)))
+                return
+            self._replay(in_body=False)
+        self._start(tag, attrib)
+
+    def end(self, tag: str):
+        if self.prelude is not None:
+            self.prelude.append(('end', tag, None))
+            return
+        self._end()
+
+    def data(self, text: str):
+        if self.prelude is not None:
+            self.prelude.append(('data', text, None))
+            return
+        self.pending.append(text)
+
+    def comment(self, text: str):
+        self._boundary()
+
+    def pi(self, target: str, data: str = None):
+        self._boundary()
+
+    def doctype(self, *args):
+        self._boundary()
+
+    def close(self) -> PageScan:
+        if self.prelude is not None:
+            self._replay(in_body=True)
+        self._flush()
+        while self.stack:
+            self._end()
+        self._resolve()
+        return self.scan
+
+    # Event handling
+
+    def _boundary(self):
+        """Comments and processing instructions end the current string"""
+        if self.prelude is not None:
+            self.prelude.append(('boundary', None, None))
+        else:
+            self._flush()
+
+    def _replay(self, in_body: bool):
+        """Process the held-back events once the body question is settled"""
+        prelude = self.prelude
+        self.prelude = None
+        self.document_in_body = in_body
+        for kind, value, attrib in prelude:
+            if kind == 'start':
+                self._start(value, attrib)
+            elif kind == 'end':
+                self._end()
+            elif kind == 'data':
+                self.pending.append(value)
+            else:
+                self._flush()
+
+    def _flush(self):
+        """Turn the buffered character data into one string of the open element"""
+        if not self.pending:
+            return
+        text = ''.join(self.pending)
+        self.pending = []
+
+        if self.stack:
+            parent = self.stack[-1]
+            removed = parent.removed
+            preserve = parent.preserve
+            container = parent.container
+        else:
+            removed = False
+            preserve = 0
+            container = None
+
+        # BeautifulSoup collapses whitespace-only strings outside <pre>
+        if not preserve and not text.strip(ASCII_SPACES):
+            text = '\n' if '\n' in text else ' '
+
+        if container is not None:
+            if not removed:
+                for rng, tag, captured in self.captures:
+                    if rng[1] is None and tag == container:
+                        captured.append(text)
+            return
+
+        if self.title is not None and self.title_depth:
+            self.title.append(text)
+        if self.h1 is not None and self.h1_depth:
+            self.h1.append(text)
+        if not removed:
+            self.strings.append(text)
+
+    def _start(self, tag: str, attrib: Any):
+        self._flush()
+        scan = self.scan
+        rules = self.rules
+
+        if self.stack:
+            parent = self.stack[-1]
+            removed, in_body, container, preserve = parent.removed, parent.in_body, parent.container, parent.preserve
+        else:
+            removed, in_body, container, preserve = False, self.document_in_body, None, 0
+        if tag in STRING_CONTAINER_TAGS:
+            container = tag
+        elif tag in PRESERVE_WHITESPACE_TAGS:
+            preserve += 1
+
+        classes = attrib.get('class')
+        element_id = attrib.get('id')
+
+        # Observations on the unmodified document
+        if tag == 'title':
+            if self.title is None:
+                self.title = []
+                self.title_depth = len(self.stack) + 1
+        elif tag == 'h1':
+            if self.h1 is None:
+                self.h1 = []
+                self.h1_depth = len(self.stack) + 1
+        elif tag == 'article' or tag == 'time':
+            scan.has_article_markup = True
+        elif tag == 'form':
+            scan.has_form_markup = True
+        if classes and not scan.has_article_markup and rules.article_class_pattern.search(classes):
+            scan.has_article_markup = True
+
+        if not removed and in_body and self._is_boilerplate(tag, attrib, classes, element_id):
+            removed = True
+
+        element = _Element(tag, removed, in_body, container, preserve)
+        start = len(self.strings)
+        if not removed:
+            if tag in HEADING_LEVELS:
+                element.text = self._reserve(scan.headings, HEADING_LEVELS[tag], start)
+            elif tag == 'a':
+                element.text = self._reserve(scan.links, attrib.get('href', ''), start)
+            elif tag == 'form':
+                scan.has_form = True
+            elif tag == 'button':
+                scan.has_button = True
+            elif tag == 'input':
+                if attrib.get('type') in ['submit', 'button']:
+                    scan.has_button = True
+
+            if in_body:
+                if tag == 'p':
+                    element.text = self._reserve(scan.paragraphs, None, start)
+                elif tag == 'ul' or tag == 'ol':
+                    scan.list_count += 1
+                elif tag == 'li':
+                    scan.list_item_count += 1
+                elif tag == 'main':
+                    if self.main is None:
+                        self.main = [start, None]
+                        element.ranges.append(self.main)
+                elif tag == 'article':
+                    if self.article is None:
+                        self.article = [start, None]
+                        element.ranges.append(self.article)
+
+                # The first elements whose class or id names a content container
+                if self.content_class is None and classes and rules.content_container_pattern.search(classes):
+                    self.content_class = [start, None]
+                    element.ranges.append(self.content_class)
+                    if tag in STRING_CONTAINER_TAGS:
+                        self.captures.append((self.content_class, tag, []))
+                if self.content_id is None and element_id and rules.content_container_pattern.search(element_id):
+                    self.content_id = [start, None]
+                    element.ranges.append(self.content_id)
+                    if tag in STRING_CONTAINER_TAGS:
+                        self.captures.append((self.content_id, tag, []))
+
+            if not scan.has_media:
+                scan.has_media = tag in self.media_tags or bool(classes and rules.media_class_pattern.search(classes))
+
+        if tag == 'body' and self.body_range is None:
+            self.body_range = [start, None]
+            element.ranges.append(self.body_range)
+            element.in_body = True
+
+        self.stack.append(element)
+
+    def _end(self):
+        self._flush()
+        depth = len(self.stack)
+        element = self.stack.pop()
+
+        end = len(self.strings)
+        for rng in element.ranges:
+            rng[1] = end
+
+        if element.text is not None:
+            items, index, value, start = element.text
+            text = ''.join(self.strings[start:end])
+            if items is self.scan.headings:
+                items[index] = (value, text)
+            elif items is self.scan.links:
+                items[index] = (text, value)
+            else:
+                items[index] = text
+
+        if depth == self.title_depth:
+            self.scan.title_text = ''.join(self.title)
+            self.title_depth = 0
+        if depth == self.h1_depth:
+            self.scan.h1_text = ''.join(self.h1)
+            self.h1_depth = 0
+
+    @staticmethod
+    def _reserve(items: List[Any], value: Any, start: int) -> Tuple[List[Any], int, Any, int]:
+        """Keep document order for elements nested in each other (filled in by _end)"""
+        items.append(None)
+        return items, len(items) - 1, value, start
+
+    def _is_boilerplate(self, tag: str, attrib: Any, classes: Optional[str], element_id: Optional[str]) -> bool:
+        """Check whether an element would be stripped as non-content"""
+        rules = self.rules
+        if tag in rules.boilerplate_tags:
+            return True
+
+        style = attrib.get('style')
+        if style and rules.hidden_style_pattern.search(style):
+            return True
+
+        if classes and rules.boilerplate_pattern.search(classes):
+            return True
+
+        return bool(element_id and rules.boilerplate_pattern.search(element_id))
+
+    def _resolve(self):
+        """Pick the main content region and join its text"""
+        strings = self.strings
+        body_range = self.body_range or [0, len(strings)]
+
+        # Main content falls back from <main> to <article> to content containers to the body
+        main = self.main or self.article or self.content_class or self.content_id or body_range
+        main_strings = strings[main[0]:main[1]]
+        for rng, _, captured in self.captures:
+            if rng is main:
+                main_strings = captured
+        self.scan.main_text = ' '.join(s for s in (string.strip() for string in main_strings) if s)
+
+
+class StreamScanner:
+    """Incremental scanner that builds a PageScan from lxml parser events
+
+    HTML is fed to lxml's HTMLParser in chunks with a parser target, so no
+    element tree is ever built: only the stack of open elements, the
+    surviving text and the text of the open title, heading, link and
+    paragraph are held, and memory grows with nesting depth and text rather
+    than with the number of nodes. Events before <body> are buffered until
+    it is known whether the document has one. The result matches DOMWalker
+    and LXMLScanner on the same markup.
+    """
+
+    def __init__(self, rules: RuleTable = None, chunk_size: int = CHUNK_SIZE):
+        self.rules = rules or DEFAULT_RULES
+        self.media_tags = frozenset(self.rules.media_tags)
+        self.chunk_size = chunk_size
+
+    def scan(self, html_content: str) -> PageScan:
+        """Parse HTML and collect the observations used by the analyzer"""
+        if not isinstance(html_content, str):
+            return self.scan_chunks([html_content])
+        return self.scan_chunks(html_content[start:start + self.chunk_size]
+                                for start in range(0, len(html_content), self.chunk_size))
+
+    def scan_chunks(self, chunks: Iterable[str]) -> PageScan:
+        """Scan HTML arriving in pieces, e.g. from a request stream"""
+        target = _ScanTarget(self)
+        parser = etree.HTMLParser(target=target, recover=True)
+
+        first = True
+        for chunk in chunks:
+            # BeautifulSoup drops a leading byte order mark from text input
+            if first and isinstance(chunk, str) and chunk[:1] == '\ufeff':
+                chunk = chunk[1:]
+            if chunk:
+                first = False
+                parser.feed(chunk)
+
+        if first:
+            return PageScan()
+        try:
+            return parser.close()
+        except etree.XMLSyntaxError:
+            return target.close()
@@ -0,0 +1,35 @@
+import unittest
+
+from input_limits import AnalysisLimits, DocumentTooLarge
+
+# Eight elements; the scripts, style and comment hold many more tag-like strings
+PAGE = (
+    '<html><head><script>var s = "<a href=x><div><b>";</script>'
+    '<script type="application/ld+json">{"x": "<a><a><a>"}</script><style>a<b {}</style></head>'
+    '<body><!-- <div><div><div> --><p>Hi <b>there</b></p></body></html>'
+)
+
+
+class NodeLimitTest(unittest.TestCase):
+
+    def test_tags_in_comments_and_scripts_are_not_counted(self):
+        html, truncated = AnalysisLimits(max_nodes=8).limit_html(PAGE)
+        self.assertEqual(html, PAGE)
+        self.assertEqual(truncated, [])
+
+    def test_strict_mode_rejects_more_elements(self):
+        with self.assertRaises(DocumentTooLarge):
+            AnalysisLimits(max_nodes=7).limit_html(PAGE)
+
+    def test_bounded_mode_cuts_before_the_first_extra_element(self):
+        html, truncated = AnalysisLimits(max_nodes=7, bounded=True).limit_html(PAGE)
+        self.assertEqual(truncated, ["maxNodes"])
+        self.assertTrue(html.endswith('<p>Hi '))
+
+    def test_unclosed_script_hides_the_rest(self):
+        html = '<p>one</p><SCRIPT>if (a <b) {' + '<i>' * 10
+        self.assertEqual(AnalysisLimits(max_nodes=2).limit_html(html)[0], html)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,121 @@
+import gzip
+import json
+import unittest
+
+import serialization
+from serialization import (JSON_TYPE, MSGPACK_TYPE, COLUMNAR_TYPE, MIN_COMPRESS_BYTES, encode, encode_json, compress,
+                           response_types, response_encodings, to_columns)
+
+PAGE = (
+    '<html><head><title>Trail running shoes</title></head><body><article>'
+    '<h1>Trail running shoes</h1>'
+    + '<p>Trail running shoes need grip, cushioning and a secure fit on rough ground.</p>' * 40 +
+    '</article></body></html>'
+)
+
+
+class EncodingTest(unittest.TestCase):
+    """Encoders and content codings, with and without the `fast` extra"""
+
+    payload = {"url": "u", "wordCount": 3, "relatedKWfreq": {"seo": 1}, "cleanBody": "Café — naïve"}
+
+    def test_json_round_trip(self):
+        self.assertEqual(json.loads(encode(self.payload)), self.payload)
+        self.assertNotIn(b' ', encode_json([1, 2]))
+
+    def test_json_falls_back_for_lone_surrogates(self):
+        payload = {"cleanBody": "broken \ud800 text"}
+        self.assertEqual(json.loads(encode_json(payload)), payload)
+
+    @unittest.skipUnless(serialization.orjson is not None, "orjson is not installed")
+    def test_orjson_matches_json(self):
+        self.assertEqual(json.loads(encode_json(self.payload)),
+                         json.loads(json.dumps(self.payload, separators=(',', ':'))))
+
+    @unittest.skipUnless(serialization.msgpack is not None, "msgpack is not installed")
+    def test_msgpack_round_trip(self):
+        self.assertIn(MSGPACK_TYPE, response_types())
+        body = encode(self.payload, MSGPACK_TYPE)
+        self.assertEqual(serialization.msgpack.unpackb(body), self.payload)
+
+    @unittest.skipIf(serialization.msgpack is not None, "msgpack is installed")
+    def test_msgpack_not_offered_without_package(self):
+        self.assertNotIn(MSGPACK_TYPE, response_types())
+
+    def test_gzip_round_trip(self):
+        body = encode_json(self.payload) * 50
+        self.assertEqual(gzip.decompress(compress(body, 'gzip')), body)
+        self.assertEqual(compress(body, None), body)
+
+    @unittest.skipUnless(serialization.zstandard is not None, "zstandard is not installed")
+    def test_zstd_round_trip(self):
+        self.assertEqual(response_encodings()[0], 'zstd')
+        body = encode_json(self.payload) * 50
+        compressed = compress(body, 'zstd')
+        self.assertEqual(serialization.zstandard.ZstdDecompressor().decompress(compressed), body)
+
+
+class ColumnsTest(unittest.TestCase):
+
+    def test_results_become_columns(self):
+        payload = {"results": [{"url": "a", "paragraphStyle": {"totalParagraphs": 2}}, {"url": "b", "error": "x"}]}
+        columns = to_columns(payload)
+        self.assertEqual(columns["count"], 2)
+        self.assertEqual(columns["columns"]["url"], ["a", "b"])
+        self.assertEqual(columns["columns"]["paragraphStyle.totalParagraphs"], [2, None])
+        self.assertEqual(columns["columns"]["error"], [None, "x"])
+
+    def test_other_top_level_keys_are_kept(self):
+        columns = to_columns({"results": [{"url": "a"}], "sites": {"a.com": {"pages": 1}}})
+        self.assertEqual(columns["sites"], {"a.com": {"pages": 1}})
+        self.assertEqual(columns["count"], 1)
+
+
+class NegotiationTest(unittest.TestCase):
+    """Formats and codings picked by the API from the request headers"""
+
+    @classmethod
+    def setUpClass(cls):
+        import app
+        cls.client = app.app.test_client()
+        cls.request = {"html": PAGE, "url": "u", "primaryKeyword": "trail running"}
+        cls.expected = json.loads(cls.client.post('/api/analyze', json=cls.request).data)
+        # Batch responses are large enough to be compressed
+        cls.batch = [dict(cls.request, url=f"u{index}") for index in range(4)]
+        cls.expected_batch = json.loads(cls.client.post('/api/analyze/batch', json=cls.batch).data)
+
+    def test_json_by_default(self):
+        response = self.client.post('/api/analyze', json=self.request)
+        self.assertEqual(response.mimetype, JSON_TYPE)
+        self.assertIsNone(response.headers.get('Content-Encoding'))
+        self.assertIn('Accept', response.headers['Vary'])
+
+    @unittest.skipUnless(serialization.msgpack is not None, "msgpack is not installed")
+    def test_msgpack_response(self):
+        response = self.client.post('/api/analyze', json=self.request, headers={'Accept': MSGPACK_TYPE})
+        self.assertEqual(response.mimetype, MSGPACK_TYPE)
+        self.assertEqual(serialization.msgpack.unpackb(response.data), self.expected)
+
+    def test_gzip_response(self):
+        response = self.client.post('/api/analyze/batch', json=self.batch, headers={'Accept-Encoding': 'gzip'})
+        self.assertEqual(response.headers['Content-Encoding'], 'gzip')
+        self.assertEqual(json.loads(gzip.decompress(response.data)), self.expected_batch)
+
+    @unittest.skipUnless(serialization.zstandard is not None, "zstandard is not installed")
+    def test_zstd_response(self):
+        response = self.client.post('/api/analyze/batch', json=self.batch, headers={'Accept-Encoding': 'gzip, zstd'})
+        self.assertEqual(response.headers['Content-Encoding'], 'zstd')
+        body = serialization.zstandard.ZstdDecompressor().decompress(response.data)
+        self.assertGreaterEqual(len(body), MIN_COMPRESS_BYTES)
+        self.assertEqual(json.loads(body), self.expected_batch)
+
+    def test_columnar_response(self):
+        response = self.client.post('/api/analyze/batch?format=columnar', json=[self.request, {"url": "x"}])
+        self.assertEqual(response.mimetype, COLUMNAR_TYPE)
+        columns = json.loads(response.data)
+        self.assertEqual(columns["count"], 2)
+        self.assertEqual(columns["columns"]["wordCount"][0], self.expected["wordCount"])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,123 @@
+from bisect import bisect_right
+from typing import Dict, List, Any
+
+# Characters at the start of the clean text that count as the intro
+INTRO_LENGTH = 200
+
+# The clean text is split into this many equal parts for keyword distribution
+DISTRIBUTION_PARTS = 10
+
+
+class TextModel:
+    """Lowercased page text with the character ranges of its regions
+
+    The clean text is lowercased once into `body`, whose first `intro_end`
+    characters are the intro. The title and headings are lowercased into
+    `outline`, one per line, with their ranges in `starts` and `ends`
+    (title first). Keywords are found with str.find over the two strings
+    and each hit is mapped to its region by binary search over the ranges,
+    so placement needs no per-region lowercased copies. KeywordIndex counts
+    on `body` too (KeywordIndex.count_lowered).
+    """
+
+    def __init__(self, title: str, headings: List[str], text: str, intro_length: int = INTRO_LENGTH):
+        self.body = text.lower()
+        if len(self.body) == len(text):
+            self.intro_end = min(intro_length, len(text))
+        else:
+            # Some characters lowercase to several (e.g. 'İ')
+            self.intro_end = len(text[:intro_length].lower())
+
+        regions = [region.lower() for region in [title, *headings]]
+        self.outline = '\n'.join(regions)
+        self.starts: List[int] = []
+        self.ends: List[int] = []
+        offset = 0
+        for region in regions:
+            self.starts.append(offset)
+            offset += len(region)
+            self.ends.append(offset)
+            offset += 1
+
+    def placement(self, keyword: str) -> Dict[str, Any]:
+        """
+        Where a keyword appears, as a case-insensitive substring
+
+        Returns:
+            inTitle, inHeadings, inIntro and inBody flags, the placement list,
+            firstOffset (offset of the first occurrence in the lowercased
+            clean text, None if it does not occur) and distribution (number
+            of non-overlapping occurrences in each tenth of the text)
+        """
+        placement = []
+        keyword = keyword.lower()
+        if not keyword:
+            return {
+                "inTitle": False,
+                "inHeadings": False,
+                "inIntro": False,
+                "inBody": False,
+                "placement": placement,
+                "firstOffset": None,
+                "distribution": [0] * DISTRIBUTION_PARTS
+            }
+
+        in_title, in_headings = self._outline_regions(keyword)
+        if in_title:
+            placement.append("title")
+        if in_headings:
+            placement.append("headings")
+
+        # The leftmost occurrence is the only one that can end inside the intro
+        body = self.body
+        first = body.find(keyword)
+        in_body = first >= 0
+        in_intro = in_body and first + len(keyword) <= self.intro_end
+        if in_intro:
+            placement.append("intro")
+        if in_body and not in_intro:
+            placement.append("body")
+
+        distribution = [0] * DISTRIBUTION_PARTS
+        if in_body:
+            hit = first
+            while hit >= 0:
+                distribution[hit * DISTRIBUTION_PARTS // len(body)] += 1
+                hit = body.find(keyword, hit + len(keyword))
+
+        return {
+            "inTitle": in_title,
+            "inHeadings": in_headings,
+            "inIntro": in_intro,
+            "inBody": in_body,
+            "placement": placement,
+            "firstOffset": first if in_body else None,
+            "distribution": distribution
+        }
+
+    def _outline_regions(self, keyword: str) -> List[bool]:
+        """Whether keyword occurs inside the title and inside any heading"""
+        found = [False, False]
+        outline = self.outline
+        starts = self.starts
+        position = 0
+        while True:
+            hit = outline.find(keyword, position)
+            if hit < 0:
+                return found
+
+            region = bisect_right(starts, hit) - 1
+            if hit + len(keyword) > self.ends[region]:
+                # Runs into the next region; a later start may still fit
+                position = hit + 1
+                continue
+
+            if region == 0:
+                found[0] = True
+                if len(starts) == 1:
+                    return found
+                position = starts[1]
+            else:
+                found[1] = True
+                return found
+
@@ -0,0 +1,52 @@
+import gc
+import time
+import logging
+from typing import Dict, Any
+from seo_analyzer import SEOAnalyzer
+
+# Small page touching every analyzer path: boilerplate, headings, media,
+# CTA links, paragraphs and lists
+WARMUP_HTML = """<!DOCTYPE html>
+<html><head><title>Warm-up article</title></head>
+<body>
+<nav class="main-nav"><a href="/">Home</a></nav>
+<main><article class="post-content">
+<h1>Warm-up article</h1>
+<p>This paragraph exercises text extraction, keyword counting and the clean body sample.</p>
+<h2>Section</h2>
+<img src="image.png" alt="">
+<ul><li>First</li><li>Second</li></ul>
+<p>Contact us today to learn more. <a href="mailto:team@example.com">Email us</a></p>
+</article></main>
+<footer>Footer</footer>
+</body></html>"""
+
+
+def warm_up(analyzer: SEOAnalyzer) -> Dict[str, Any]:
+    """
+    Load and exercise everything a first request would, without touching caches
+
+    Runs one analysis with a throwaway analyzer that shares the given
+    analyzer's backend, rules and limits but none of its caches or metrics,
+    so parser modules, tree builders, compiled patterns and keyword indexes
+    are loaded before traffic arrives.
+
+    Returns:
+        The backend and how long the warm-up took
+    """
+    started = time.perf_counter()
+    scratch = SEOAnalyzer(backend=analyzer.backend, rules=analyzer.rules, limits=analyzer.limits)
+    scratch.analyze(WARMUP_HTML, 'https://warmup.invalid/', 'warm-up', ['article', 'keyword counting'])
+    return {"backend": analyzer.backend, "ms": round((time.perf_counter() - started) * 1000, 3)}
+
+
+def freeze_for_fork():
+    """Move every object allocated so far out of the garbage collector's reach
+
+    Called in a preloading master right before workers are forked: frozen
+    objects are never traversed by collections in the workers, so the
+    pages holding them stay shared copy-on-write instead of being dirtied.
+    """
+    gc.collect()
+    gc.freeze()
+    logging.getLogger(__name__).info(f"Froze {gc.get_freeze_count()} objects before forking workers")